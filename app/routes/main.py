@@ -1,14 +1,33 @@
 """
 Main routes - Dashboard pages and API endpoints
 """
-from flask import Blueprint, render_template, jsonify, request
+from flask import Blueprint, Response, render_template, jsonify, request
 from datetime import datetime
-from app.utils import login_required
-from cluster_api import get_cluster_data, v1, apps_v1
+from app.utils import login_required, traced
+from app.utils.indexes import LabelIndex, ConfigReferenceIndex, EndpointIndex, RBACIndex, ResourceIndex, compile_selector
+from app.utils.resource_query import ContinueTokenExpired, ResourceQuery, ResourceSnapshot
+from app.utils.snapshot_cache import SnapshotCache
+from app.utils.responses import conditional_json, response_cache
+from app.utils.metrics import PhaseTimer, api_request, render_metrics
+from cluster_api import fetch_kinds, v1, apps_v1
+from cluster_stream import cluster_feed
+from config import Config
 from kubernetes import client
 
 main_bp = Blueprint('main', __name__)
-rbac_v1 = client.RbacAuthorizationV1Api()
+
+# Resource kinds listed by /api/resources
+RESOURCE_API_KINDS = [
+    'applications', 'applicationsnapshotrestores', 'applicationsnapshots', 'appprotectionplans',
+    'clusterrolebindings', 'clusterroles', 'configmaps', 'cronjobs', 'daemonsets', 'deployments',
+    'endpoints', 'endpointslices', 'horizontalpodautoscalers', 'ingresses', 'jobs', 'limitranges', 'namespaces',
+    'networkpolicies', 'poddisruptionbudgets', 'pods', 'pvcs', 'pvs', 'replicasets',
+    'resourcequotas', 'rolebindings', 'roles', 'secrets', 'serviceaccounts', 'services',
+    'statefulsets', 'storageclasses', 'volumesnapshotcontents', 'volumesnapshots'
+]
+
+# The snapshot version is per process, so like last_updated it stays out of the ETag
+CLUSTER_VOLATILE_KEYS = ('last_updated', 'version')
 
 
 def is_pending_deletion(resource_obj):
@@ -21,6 +40,12 @@ def is_pending_deletion(resource_obj):
     return False
 
 
+def with_snapshot_age(response, snapshot):
+    """Tell the client how old the snapshot behind a response is (last_updated has the build time)"""
+    response.headers['X-Snapshot-Age'] = str(int(snapshot.age))
+    return response
+
+
 @main_bp.route('/')
 # @login_required  # Temporarily disabled for testing
 def index():
@@ -29,17 +54,91 @@ def index():
 
 
 @main_bp.route('/api/cluster')
+@traced
 # @login_required  # Temporarily disabled for testing
 def cluster_api():
-    """Get cluster data"""
-    return jsonify(get_cluster_data())
+    """Get cluster data, or with ?since=<version> only what changed after that version"""
+    # An unknown or foreign version token (another worker or replica) gets the full snapshot
+    since = request.args.get('since')
+    
+    phases = PhaseTimer('cluster_api')
+    try:
+        snapshot = cluster_feed.current()
+    except Exception as e:
+        # No snapshot has been built yet and the API server can't be reached
+        return jsonify({'error': f'Failed to get cluster data: {e}'}), 503
+    version, data = snapshot.value
+    phases.mark('snapshot')
+    if since is not None:
+        changes = cluster_feed.changes_since(since)
+        phases.mark('delta')
+        if changes is not None:
+            response = conditional_json({
+                'version': version,
+                'since': since,
+                'delta': True,
+                'last_updated': data.get('last_updated'),
+                'added': [change for change in changes if change['op'] == 'add'],
+                'modified': [change for change in changes if change['op'] == 'update'],
+                'deleted': [{'kind': change['kind'], 'key': change['key']}
+                            for change in changes if change['op'] == 'remove']
+            }, name='cluster:delta')
+            phases.mark('encode')
+            return with_snapshot_age(response, snapshot)
+        # The version is older than the change log (or unknown) - send everything
+        encoded = response_cache.get('cluster:fallback', (version, data.get('last_updated')),
+                                     lambda: dict(data, version=version, delta=False), CLUSTER_VOLATILE_KEYS)
+    else:
+        encoded = response_cache.get('cluster', (version, data.get('last_updated')),
+                                     lambda: dict(data, version=version), CLUSTER_VOLATILE_KEYS)
+    response = encoded.response()
+    phases.mark('encode')
+    return with_snapshot_age(response, snapshot)
+
+
+@main_bp.route('/api/cluster/stream')
+# @login_required  # Temporarily disabled for testing
+def cluster_stream():
+    """Stream cluster data as Server-Sent Events: one snapshot, then deltas"""
+    if cluster_feed.subscriber_count >= Config.STREAM_MAX_CONNECTIONS:
+        # Every stream holds a worker thread; past the limit the dashboard polls /api/cluster
+        return jsonify({'error': 'Too many open cluster streams'}), 503, {'Retry-After': '60'}
+    
+    def generate():
+        # Subscribing here, not in the view, ties the subscription to the
+        # response being iterated; the finally below always releases it
+        subscription = cluster_feed.subscribe()
+        try:
+            # Subscribe before reading the snapshot so no later delta is missed;
+            # clients skip deltas whose version is not newer than the snapshot
+            try:
+                yield cluster_feed.snapshot_frame()
+            except Exception as e:
+                # No snapshot to start from - the client reconnects after its retry delay
+                print(f"Cluster stream has no snapshot to send: {e}")
+                return
+            while not subscription.closed:
+                frame = subscription.next_frame(Config.STREAM_KEEPALIVE_SECONDS)
+                if frame is None:
+                    yield b': keepalive\n\n'
+                elif frame:
+                    yield frame
+            # Too far behind or shutting down - end the stream so the client reconnects with a fresh snapshot
+        finally:
+            cluster_feed.unsubscribe(subscription)
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
 
 
 @main_bp.route('/api/health')
 def health_check():
     """Health check endpoint for Kubernetes probes"""
     try:
-        v1.list_node(limit=1)
+        with api_request('LIST', 'nodes'):
+            v1.list_node(limit=1)
         return jsonify({
             'status': 'healthy',
             'timestamp': datetime.now().isoformat(),
@@ -54,16 +153,31 @@ def health_check():
         }), 500
 
 
+@main_bp.route('/metrics')
+def metrics():
+    """Prometheus metrics: Kubernetes API calls, build phases, caches and responses"""
+    body, content_type = render_metrics()
+    return Response(body, content_type=content_type)
+
+
 @main_bp.route('/api/refresh', methods=['POST'])
 # @login_required  # Temporarily disabled for testing
 def refresh_data():
-    """Force refresh cluster data"""
+    """Force refresh cluster data.
+
+    With a shared SNAPSHOT_STORE only the leader lists the cluster again; on
+    any other replica this reloads the document the leader last published.
+    """
     try:
-        data = get_cluster_data()
+        # Drop the cached snapshots; the cluster one is rebuilt now, resources in the background
+        resources_cache.invalidate()
+        cluster_feed.invalidate()
+        version, data = cluster_feed.refresh().value
         return jsonify({
             'status': 'success',
             'message': 'Data refreshed successfully',
             'timestamp': data.get('last_updated'),
+            'version': version,
             'nodes': data.get('total_nodes', 0),
             'pods': data.get('total_pods', 0)
         })
@@ -76,6 +190,7 @@ def refresh_data():
 
 
 @main_bp.route('/api/deployments/<namespace>/<deployment_name>/scale', methods=['POST'])
+@traced
 # @login_required  # Temporarily disabled for testing
 def scale_deployment(namespace, deployment_name):
     """Scale a deployment or statefulset to the specified number of replicas"""
@@ -91,37 +206,41 @@ def scale_deployment(namespace, deployment_name):
         # Try to find as a deployment first
         resource_type = 'Deployment'
         try:
-            deployment = apps_v1.read_namespaced_deployment(
-                name=deployment_name,
-                namespace=namespace
-            )
+            with api_request('GET', 'deployments'):
+                deployment = apps_v1.read_namespaced_deployment(
+                    name=deployment_name,
+                    namespace=namespace
+                )
             # Update the replica count
             deployment.spec.replicas = replicas
             
             # Apply the update
-            apps_v1.patch_namespaced_deployment(
-                name=deployment_name,
-                namespace=namespace,
-                body=deployment
-            )
+            with api_request('PATCH', 'deployments'):
+                apps_v1.patch_namespaced_deployment(
+                    name=deployment_name,
+                    namespace=namespace,
+                    body=deployment
+                )
         except client.exceptions.ApiException as e:
             if e.status == 404:
                 # Not a deployment, try as a statefulset
                 resource_type = 'StatefulSet'
                 try:
-                    statefulset = apps_v1.read_namespaced_stateful_set(
-                        name=deployment_name,
-                        namespace=namespace
-                    )
+                    with api_request('GET', 'statefulsets'):
+                        statefulset = apps_v1.read_namespaced_stateful_set(
+                            name=deployment_name,
+                            namespace=namespace
+                        )
                     # Update the replica count
                     statefulset.spec.replicas = replicas
                     
                     # Apply the update
-                    apps_v1.patch_namespaced_stateful_set(
-                        name=deployment_name,
-                        namespace=namespace,
-                        body=statefulset
-                    )
+                    with api_request('PATCH', 'statefulsets'):
+                        apps_v1.patch_namespaced_stateful_set(
+                            name=deployment_name,
+                            namespace=namespace,
+                            body=statefulset
+                        )
                 except client.exceptions.ApiException as e2:
                     if e2.status == 404:
                         return jsonify({'error': f'Deployment or StatefulSet {deployment_name} not found in namespace {namespace}'}), 404
@@ -130,6 +249,9 @@ def scale_deployment(namespace, deployment_name):
                 raise
         
         print(f"Successfully scaled {resource_type} {namespace}/{deployment_name} to {replicas} replicas")
+        # Don't serve the pre-scale replica counts for the rest of the snapshot TTL
+        cluster_feed.invalidate()
+        resources_cache.invalidate()
         return jsonify({
             'success': True,
             'message': f'Successfully scaled {resource_type} {namespace}/{deployment_name} to {replicas} replicas',
@@ -146,6 +268,7 @@ def scale_deployment(namespace, deployment_name):
 
 
 @main_bp.route('/api/deployments/<namespace>/<deployment_name>/replicas', methods=['GET'])
+@traced
 @login_required
 def get_deployment_replicas(namespace, deployment_name):
     """Get current replica information for a deployment or statefulset"""
@@ -153,10 +276,11 @@ def get_deployment_replicas(namespace, deployment_name):
         # Try to find as a deployment first
         resource_type = 'Deployment'
         try:
-            deployment = apps_v1.read_namespaced_deployment(
-                name=deployment_name,
-                namespace=namespace
-            )
+            with api_request('GET', 'deployments'):
+                deployment = apps_v1.read_namespaced_deployment(
+                    name=deployment_name,
+                    namespace=namespace
+                )
             
             return jsonify({
                 'deployment': deployment_name,
@@ -172,10 +296,11 @@ def get_deployment_replicas(namespace, deployment_name):
             if e.status == 404:
                 # Not a deployment, try as a statefulset
                 resource_type = 'StatefulSet'
-                statefulset = apps_v1.read_namespaced_stateful_set(
-                    name=deployment_name,
-                    namespace=namespace
-                )
+                with api_request('GET', 'statefulsets'):
+                    statefulset = apps_v1.read_namespaced_stateful_set(
+                        name=deployment_name,
+                        namespace=namespace
+                    )
                 
                 return jsonify({
                     'deployment': deployment_name,
@@ -206,139 +331,87 @@ def resources():
     return render_template('resources.html')
 
 
-@main_bp.route('/api/resources')
-# @login_required  # Temporarily disabled for testing
-def resources_api():
-    """Get all Kubernetes resources"""
+def build_resources():
+    """List every resource kind and build the /api/resources rows with orphan flags"""
     try:
-        # Get all resource types
-        batch_v1 = client.BatchV1Api()
-        networking_v1 = client.NetworkingV1Api()
-        rbac_v1 = client.RbacAuthorizationV1Api()
-        storage_v1 = client.StorageV1Api()
+        phases = PhaseTimer('resources')
+        
+        # Fetch every resource kind concurrently; each kind keeps its own result and error
+        fetched, fetch_errors = fetch_kinds(RESOURCE_API_KINDS)
+        phases.mark('fetch')
         
-        configmaps = v1.list_config_map_for_all_namespaces()
-        cronjobs = batch_v1.list_cron_job_for_all_namespaces()
-        daemonsets = apps_v1.list_daemon_set_for_all_namespaces()
-        deployments = apps_v1.list_deployment_for_all_namespaces()
-        ingresses = networking_v1.list_ingress_for_all_namespaces()
-        jobs = batch_v1.list_job_for_all_namespaces()
-        networkpolicies = networking_v1.list_network_policy_for_all_namespaces()
-        pods = v1.list_pod_for_all_namespaces()
-        pvcs = v1.list_persistent_volume_claim_for_all_namespaces()
-        pvs = v1.list_persistent_volume()
-        replicasets = apps_v1.list_replica_set_for_all_namespaces()
-        rolebindings = rbac_v1.list_role_binding_for_all_namespaces()
-        roles = rbac_v1.list_role_for_all_namespaces()
-        secrets = v1.list_secret_for_all_namespaces()
-        service_accounts = v1.list_service_account_for_all_namespaces()
-        services = v1.list_service_for_all_namespaces()
-        statefulsets = apps_v1.list_stateful_set_for_all_namespaces()
-        storageclasses = storage_v1.list_storage_class()
+        configmaps = fetched['configmaps']
+        cronjobs = fetched['cronjobs']
+        daemonsets = fetched['daemonsets']
+        deployments = fetched['deployments']
+        ingresses = fetched['ingresses']
+        jobs = fetched['jobs']
+        networkpolicies = fetched['networkpolicies']
+        pods = fetched['pods']
+        pvcs = fetched['pvcs']
+        pvs = fetched['pvs']
+        replicasets = fetched['replicasets']
+        rolebindings = fetched['rolebindings']
+        roles = fetched['roles']
+        secrets = fetched['secrets']
+        service_accounts = fetched['serviceaccounts']
+        services = fetched['services']
+        statefulsets = fetched['statefulsets']
+        storageclasses = fetched['storageclasses']
         
         # Additional resources
-        limitranges = v1.list_limit_range_for_all_namespaces()
-        resourcequotas = v1.list_resource_quota_for_all_namespaces()
+        limitranges = fetched['limitranges']
+        resourcequotas = fetched['resourcequotas']
         
         # Autoscaling and Policy resources
-        autoscaling_v1 = client.AutoscalingV1Api()
-        policy_v1 = client.PolicyV1Api()
-        
-        endpoints = v1.list_endpoints_for_all_namespaces()
-        horizontalpodautoscalers = autoscaling_v1.list_horizontal_pod_autoscaler_for_all_namespaces()
-        namespaces = v1.list_namespace()
-        poddisruptionbudgets = policy_v1.list_pod_disruption_budget_for_all_namespaces()
+        endpoints = fetched['endpoints']
+        endpoint_slices = fetched['endpointslices']
+        horizontalpodautoscalers = fetched['horizontalpodautoscalers']
+        namespaces = fetched['namespaces']
+        poddisruptionbudgets = fetched['poddisruptionbudgets']
         
         # VolumeSnapshots (requires snapshot.storage.k8s.io API)
-        volumesnapshots = []
-        volumesnapshotcontents = []
-        try:
-            snapshot_v1 = client.CustomObjectsApi()
-            vs_result = snapshot_v1.list_cluster_custom_object(
-                group='snapshot.storage.k8s.io',
-                version='v1',
-                plural='volumesnapshots'
-            )
-            volumesnapshots = vs_result.get('items', [])
-        except:
-            pass
+        volumesnapshots = fetched['volumesnapshots']
+        volumesnapshotcontents = fetched['volumesnapshotcontents']
         
-        try:
-            vsc_result = snapshot_v1.list_cluster_custom_object(
-                group='snapshot.storage.k8s.io',
-                version='v1',
-                plural='volumesnapshotcontents'
-            )
-            volumesnapshotcontents = vsc_result.get('items', [])
-        except:
-            pass
-        
-        # Get NDK custom resources
-        custom_api = client.CustomObjectsApi()
-        applications = []
-        snapshots = []
-        protection_plans = []
+        # NDK custom resources
+        applications = fetched['applications']
+        snapshots = fetched['applicationsnapshots']
+        protection_plans = fetched['appprotectionplans']
+        snapshot_restores = fetched['applicationsnapshotrestores']
         
-        try:
-            apps_result = custom_api.list_cluster_custom_object(
-                group='dataservices.nutanix.com',
-                version='v1alpha1',
-                plural='applications'
-            )
-            applications = apps_result.get('items', [])
-        except:
-            pass
+        # Index all pods once: by (namespace, label) for selector matching and
+        # by the ConfigMaps/Secrets/PVCs they reference for orphan detection
+        pod_label_index = LabelIndex()
+        config_references = ConfigReferenceIndex()
+        for pod in pods:
+            pod_label_index.add(pod.metadata.namespace, pod.metadata.labels, pod)
+            config_references.add_pod(pod)
         
-        try:
-            snapshots_result = custom_api.list_cluster_custom_object(
-                group='dataservices.nutanix.com',
-                version='v1alpha1',
-                plural='applicationsnapshots'
-            )
-            snapshots = snapshots_result.get('items', [])
-        except:
-            pass
+        # Index imagePullSecrets from the already-listed service accounts and workloads
+        for sa in service_accounts:
+            config_references.add_service_account(sa)
+        for workload in deployments + statefulsets + daemonsets:
+            config_references.add_workload(workload)
         
-        try:
-            plans_result = custom_api.list_cluster_custom_object(
-                group='dataservices.nutanix.com',
-                version='v1alpha1',
-                plural='appprotectionplans'
-            )
-            protection_plans = plans_result.get('items', [])
-        except:
-            pass
+        # Index object existence and per-namespace counts for the cross-resource checks
+        resource_index = ResourceIndex()
+        for kind, objects in (('Pod', pods), ('Deployment', deployments), ('StatefulSet', statefulsets),
+                              ('DaemonSet', daemonsets), ('ReplicaSet', replicasets), ('ConfigMap', configmaps),
+                              ('Secret', secrets), ('Service', services)):
+            resource_index.add_all(kind, objects)
         
-        try:
-            restores_result = custom_api.list_cluster_custom_object(
-                group='dataservices.nutanix.com',
-                version='v1alpha1',
-                plural='applicationsnapshotrestores'
-            )
-            snapshot_restores = restores_result.get('items', [])
-        except:
-            snapshot_restores = []
+        # Index services with ready addresses from the already-listed Endpoints/EndpointSlices
+        endpoint_index = EndpointIndex(endpoints, endpoint_slices)
+        phases.mark('index')
         
         # Helper function to check if PVC is orphaned (not used by any pod)
         def is_pvc_orphaned(pvc_name, pvc_namespace):
-            for pod in pods.items:
-                if pod.metadata.namespace == pvc_namespace and pod.spec.volumes:
-                    for volume in pod.spec.volumes:
-                        if volume.persistent_volume_claim and volume.persistent_volume_claim.claim_name == pvc_name:
-                            return False
-            return True
+            return not config_references.is_claim_used(pvc_namespace, pvc_name)
         
         # Helper function to check if service is orphaned (no endpoints)
         def is_service_orphaned(svc_name, svc_namespace):
-            try:
-                endpoints = v1.read_namespaced_endpoints(name=svc_name, namespace=svc_namespace)
-                if endpoints.subsets:
-                    for subset in endpoints.subsets:
-                        if subset.addresses:
-                            return False
-                return True
-            except:
-                return True
+            return not endpoint_index.has_ready_endpoints(svc_namespace, svc_name)
         
         # Helper function to check if configmap/secret is orphaned (not used by any pod)
         def is_config_orphaned(resource_name, resource_namespace, resource_type='configmap', resource_obj=None):
@@ -399,46 +472,9 @@ def resources_api():
                             return False
                         # Image pull secrets
                         if secret_type == 'kubernetes.io/dockerconfigjson':
-                            # Check if used by any service account in the same namespace
-                            try:
-                                svc_accounts = v1.list_namespaced_service_account(resource_namespace)
-                                for sa in svc_accounts.items:
-                                    if sa.image_pull_secrets:
-                                        for ips in sa.image_pull_secrets:
-                                            if ips.name == resource_name:
-                                                return False
-                            except:
-                                pass
-                            # Check if used by any deployment's imagePullSecrets in the same namespace
-                            try:
-                                deployments = apps_v1.list_namespaced_deployment(resource_namespace)
-                                for dep in deployments.items:
-                                    if dep.spec.template.spec.image_pull_secrets:
-                                        for ips in dep.spec.template.spec.image_pull_secrets:
-                                            if ips.name == resource_name:
-                                                return False
-                            except:
-                                pass
-                            # Check if used by any statefulset's imagePullSecrets in the same namespace
-                            try:
-                                statefulsets = apps_v1.list_namespaced_stateful_set(resource_namespace)
-                                for sts in statefulsets.items:
-                                    if sts.spec.template.spec.image_pull_secrets:
-                                        for ips in sts.spec.template.spec.image_pull_secrets:
-                                            if ips.name == resource_name:
-                                                return False
-                            except:
-                                pass
-                            # Check if used by any daemonset's imagePullSecrets in the same namespace
-                            try:
-                                daemonsets = apps_v1.list_namespaced_daemon_set(resource_namespace)
-                                for ds in daemonsets.items:
-                                    if ds.spec.template.spec.image_pull_secrets:
-                                        for ips in ds.spec.template.spec.image_pull_secrets:
-                                            if ips.name == resource_name:
-                                                return False
-                            except:
-                                pass
+                            # Check if used by any service account or workload in the same namespace
+                            if config_references.is_pull_secret_referenced(resource_namespace, resource_name):
+                                return False
                     
                     # Check for special annotations
                     annotations = resource_obj.metadata.annotations if resource_obj.metadata.annotations else {}
@@ -454,57 +490,8 @@ def resources_api():
                             return False
             
             # Check if used by pods
-            for pod in pods.items:
-                if pod.metadata.namespace == resource_namespace:
-                    # Check volumes
-                    if pod.spec.volumes:
-                        for volume in pod.spec.volumes:
-                            if resource_type == 'configmap' and volume.config_map and volume.config_map.name == resource_name:
-                                return False
-                            if resource_type == 'secret' and volume.secret and volume.secret.secret_name == resource_name:
-                                return False
-                    # Check env vars in containers
-                    if pod.spec.containers:
-                        for container in pod.spec.containers:
-                            # Check envFrom (entire configmap/secret as env vars)
-                            if container.env_from:
-                                for env_from in container.env_from:
-                                    if resource_type == 'configmap' and env_from.config_map_ref and env_from.config_map_ref.name == resource_name:
-                                        return False
-                                    if resource_type == 'secret' and env_from.secret_ref and env_from.secret_ref.name == resource_name:
-                                        return False
-                            # Check individual env vars with valueFrom
-                            if container.env:
-                                for env_var in container.env:
-                                    if env_var.value_from:
-                                        if resource_type == 'configmap' and env_var.value_from.config_map_key_ref and env_var.value_from.config_map_key_ref.name == resource_name:
-                                            return False
-                                        if resource_type == 'secret' and env_var.value_from.secret_key_ref and env_var.value_from.secret_key_ref.name == resource_name:
-                                            return False
-                                    # Check plain env var values (e.g., CSI driver configmap names)
-                                    elif env_var.value and env_var.value == resource_name:
-                                        return False
-                    # Check init containers as well
-                    if pod.spec.init_containers:
-                        for container in pod.spec.init_containers:
-                            # Check envFrom
-                            if container.env_from:
-                                for env_from in container.env_from:
-                                    if resource_type == 'configmap' and env_from.config_map_ref and env_from.config_map_ref.name == resource_name:
-                                        return False
-                                    if resource_type == 'secret' and env_from.secret_ref and env_from.secret_ref.name == resource_name:
-                                        return False
-                            # Check individual env vars with valueFrom
-                            if container.env:
-                                for env_var in container.env:
-                                    if env_var.value_from:
-                                        if resource_type == 'configmap' and env_var.value_from.config_map_key_ref and env_var.value_from.config_map_key_ref.name == resource_name:
-                                            return False
-                                        if resource_type == 'secret' and env_var.value_from.secret_key_ref and env_var.value_from.secret_key_ref.name == resource_name:
-                                            return False
-                                    # Check plain env var values
-                                    elif env_var.value and env_var.value == resource_name:
-                                        return False
+            if config_references.is_referenced(resource_type, resource_namespace, resource_name):
+                return False
             return True
         
         # Helper function to check if resource is pending deletion
@@ -519,7 +506,7 @@ def resources_api():
         
         # Format deployments
         deployment_list = []
-        for dep in deployments.items:
+        for dep in deployments:
             is_orphaned = (dep.spec.replicas or 0) == 0
             pending_deletion = is_pending_deletion(dep)
             deployment_list.append({
@@ -534,10 +521,11 @@ def resources_api():
                 'deletionTimestamp': dep.metadata.deletion_timestamp.isoformat() if pending_deletion and dep.metadata.deletion_timestamp else None,
                 'finalizers': dep.metadata.finalizers if pending_deletion and dep.metadata.finalizers else []
             })
+        phases.mark('deployments', group='rows')
         
         # Format statefulsets
         statefulset_list = []
-        for sts in statefulsets.items:
+        for sts in statefulsets:
             is_orphaned = (sts.spec.replicas or 0) == 0
             pending_deletion = is_pending_deletion(sts)
             statefulset_list.append({
@@ -552,10 +540,11 @@ def resources_api():
                 'deletionTimestamp': sts.metadata.deletion_timestamp.isoformat() if pending_deletion and sts.metadata.deletion_timestamp else None,
                 'finalizers': sts.metadata.finalizers if pending_deletion and sts.metadata.finalizers else []
             })
+        phases.mark('statefulsets', group='rows')
         
         # Format PVCs
         pvc_list = []
-        for pvc in pvcs.items:
+        for pvc in pvcs:
             is_orphaned = is_pvc_orphaned(pvc.metadata.name, pvc.metadata.namespace)
             pending_deletion = is_pending_deletion(pvc)
             pvc_list.append({
@@ -571,10 +560,11 @@ def resources_api():
                 'deletionTimestamp': pvc.metadata.deletion_timestamp.isoformat() if pending_deletion and pvc.metadata.deletion_timestamp else None,
                 'finalizers': pvc.metadata.finalizers if pending_deletion and pvc.metadata.finalizers else []
             })
+        phases.mark('pvcs', group='rows')
         
         # Format ConfigMaps
         configmap_list = []
-        for cm in configmaps.items:
+        for cm in configmaps:
             # Skip system configmaps
             is_system = cm.metadata.namespace in ['kube-system', 'kube-public', 'kube-node-lease']
             is_orphaned = False if is_system else is_config_orphaned(cm.metadata.name, cm.metadata.namespace, 'configmap', cm)
@@ -589,10 +579,11 @@ def resources_api():
                 'deletionTimestamp': cm.metadata.deletion_timestamp.isoformat() if pending_deletion and cm.metadata.deletion_timestamp else None,
                 'finalizers': cm.metadata.finalizers if pending_deletion and cm.metadata.finalizers else []
             })
+        phases.mark('configmaps', group='rows')
         
         # Format Secrets
         secret_list = []
-        for secret in secrets.items:
+        for secret in secrets:
             # Skip system secrets and service account tokens
             is_system = secret.metadata.namespace in ['kube-system', 'kube-public', 'kube-node-lease'] or secret.type == 'kubernetes.io/service-account-token'
             is_orphaned = False if is_system else is_config_orphaned(secret.metadata.name, secret.metadata.namespace, 'secret', secret)
@@ -608,10 +599,11 @@ def resources_api():
                 'deletionTimestamp': secret.metadata.deletion_timestamp.isoformat() if pending_deletion and secret.metadata.deletion_timestamp else None,
                 'finalizers': secret.metadata.finalizers if pending_deletion and secret.metadata.finalizers else []
             })
+        phases.mark('secrets', group='rows')
         
         # Format Services
         service_list = []
-        for svc in services.items:
+        for svc in services:
             is_orphaned = is_service_orphaned(svc.metadata.name, svc.metadata.namespace)
             pending_deletion = is_pending_deletion(svc)
             service_list.append({
@@ -627,6 +619,7 @@ def resources_api():
                 'deletionTimestamp': svc.metadata.deletion_timestamp.isoformat() if pending_deletion and svc.metadata.deletion_timestamp else None,
                 'finalizers': svc.metadata.finalizers if pending_deletion and svc.metadata.finalizers else []
             })
+        phases.mark('services', group='rows')
         
         # Format Applications
         application_list = []
@@ -656,6 +649,7 @@ def resources_api():
                 'deletionTimestamp': metadata.get('deletionTimestamp'),
                 'finalizers': metadata.get('finalizers', []) if pending_deletion else []
             })
+        phases.mark('applications', group='rows')
         
         # Format Snapshots
         snapshot_list = []
@@ -683,6 +677,7 @@ def resources_api():
                 'deletionTimestamp': metadata.get('deletionTimestamp'),
                 'finalizers': metadata.get('finalizers', []) if pending_deletion else []
             })
+        phases.mark('applicationsnapshots', group='rows')
         
         # Format Protection Plans
         plan_list = []
@@ -701,6 +696,7 @@ def resources_api():
                 'deletionTimestamp': metadata.get('deletionTimestamp'),
                 'finalizers': metadata.get('finalizers', []) if pending_deletion else []
             })
+        phases.mark('appprotectionplans', group='rows')
         
         # Format ApplicationSnapshotRestores
         restore_list = []
@@ -755,10 +751,11 @@ def resources_api():
                 'deletionTimestamp': metadata.get('deletionTimestamp'),
                 'finalizers': metadata.get('finalizers', []) if pending_deletion else []
             })
+        phases.mark('applicationsnapshotrestores', group='rows')
         
         # Format Pods
         pod_list = []
-        for pod in pods.items:
+        for pod in pods:
             # Determine pod status
             phase = pod.status.phase
             # Check for container statuses for more detailed status
@@ -794,10 +791,11 @@ def resources_api():
                 'ownerName': owner_name,
                 'ownerKind': owner_kind
             })
+        phases.mark('pods', group='rows')
         
         # Format ReplicaSets
         replicaset_list = []
-        for rs in replicasets.items:
+        for rs in replicasets:
             # Check if orphaned (no owner references, typically deployments)
             is_orphaned = not rs.metadata.owner_references
             pending_deletion = is_pending_deletion(rs)
@@ -814,10 +812,11 @@ def resources_api():
                 'deletionTimestamp': rs.metadata.deletion_timestamp.isoformat() if pending_deletion and rs.metadata.deletion_timestamp else None,
                 'finalizers': rs.metadata.finalizers if pending_deletion and rs.metadata.finalizers else []
             })
+        phases.mark('replicasets', group='rows')
         
         # Format PersistentVolumes
         pv_list = []
-        for pv in pvs.items:
+        for pv in pvs:
             # Check if orphaned (not bound to any PVC)
             is_orphaned = pv.status.phase != 'Bound'
             pending_deletion = is_pending_deletion(pv)
@@ -837,58 +836,25 @@ def resources_api():
                 'deletionTimestamp': pv.metadata.deletion_timestamp.isoformat() if pending_deletion and pv.metadata.deletion_timestamp else None,
                 'finalizers': pv.metadata.finalizers if pending_deletion and pv.metadata.finalizers else []
             })
+        phases.mark('pvs', group='rows')
         
         # Format ServiceAccounts
         serviceaccount_list = []
         
         # Get all RoleBindings and ClusterRoleBindings to check for RBAC usage
-        rbac_v1 = client.RbacAuthorizationV1Api()
-        role_bindings = []
-        cluster_role_bindings = []
-        try:
-            role_bindings = rbac_v1.list_role_binding_for_all_namespaces().items
-            cluster_role_bindings = rbac_v1.list_cluster_role_binding().items
-        except:
-            pass
+        role_bindings = rolebindings
+        cluster_role_bindings = fetched['clusterrolebindings']
+        cluster_roles = fetched['clusterroles']
+        rbac_index = RBACIndex(role_bindings, cluster_role_bindings, roles, cluster_roles, pods)
         
-        for sa in service_accounts.items:
+        for sa in service_accounts:
             # Skip system service accounts
             is_system = sa.metadata.namespace in ['kube-system', 'kube-public', 'kube-node-lease'] or sa.metadata.name == 'default'
             # Check if orphaned (not used by any pod or RBAC binding)
             is_orphaned = True
             if not is_system:
-                # Check if used by any pod
-                for pod in pods.items:
-                    if pod.metadata.namespace == sa.metadata.namespace and pod.spec.service_account_name == sa.metadata.name:
-                        is_orphaned = False
-                        break
-                
-                # If not used by pods, check if used in RoleBindings or ClusterRoleBindings
-                if is_orphaned:
-                    # Check RoleBindings
-                    for rb in role_bindings:
-                        if rb.subjects:
-                            for subject in rb.subjects:
-                                if (subject.kind == 'ServiceAccount' and 
-                                    subject.name == sa.metadata.name and 
-                                    subject.namespace == sa.metadata.namespace):
-                                    is_orphaned = False
-                                    break
-                        if not is_orphaned:
-                            break
-                    
-                    # Check ClusterRoleBindings
-                    if is_orphaned:
-                        for crb in cluster_role_bindings:
-                            if crb.subjects:
-                                for subject in crb.subjects:
-                                    if (subject.kind == 'ServiceAccount' and 
-                                        subject.name == sa.metadata.name and 
-                                        subject.namespace == sa.metadata.namespace):
-                                        is_orphaned = False
-                                        break
-                            if not is_orphaned:
-                                break
+                # Check if used by any pod, RoleBinding or ClusterRoleBinding
+                is_orphaned = not rbac_index.is_service_account_used(sa.metadata.namespace, sa.metadata.name)
             else:
                 is_orphaned = False
             
@@ -904,32 +870,15 @@ def resources_api():
                 'deletionTimestamp': sa.metadata.deletion_timestamp.isoformat() if pending_deletion and sa.metadata.deletion_timestamp else None,
                 'finalizers': sa.metadata.finalizers if pending_deletion and sa.metadata.finalizers else []
             })
+        phases.mark('serviceaccounts', group='rows')
         
         
         # Format ClusterRoles
         clusterrole_list = []
-        cluster_roles = []
-        try:
-            cluster_roles = rbac_v1.list_cluster_role().items
-        except:
-            pass
         
         for cr in cluster_roles:
             # Check if orphaned (not referenced by any ClusterRoleBinding or RoleBinding)
-            is_orphaned = True
-            
-            # Check ClusterRoleBindings
-            for crb in cluster_role_bindings:
-                if crb.role_ref and crb.role_ref.kind == 'ClusterRole' and crb.role_ref.name == cr.metadata.name:
-                    is_orphaned = False
-                    break
-            
-            # Check RoleBindings (can also reference ClusterRoles)
-            if is_orphaned:
-                for rb in role_bindings:
-                    if rb.role_ref and rb.role_ref.kind == 'ClusterRole' and rb.role_ref.name == cr.metadata.name:
-                        is_orphaned = False
-                        break
+            is_orphaned = not rbac_index.is_cluster_role_bound(cr.metadata.name)
             
             # System ClusterRoles and aggregated roles are not orphaned
             is_system = (cr.metadata.name.startswith('system:') or 
@@ -973,6 +922,7 @@ def resources_api():
                 'deletionTimestamp': cr.metadata.deletion_timestamp.isoformat() if pending_deletion and cr.metadata.deletion_timestamp else None,
                 'finalizers': cr.metadata.finalizers if pending_deletion and cr.metadata.finalizers else []
             })
+        phases.mark('clusterroles', group='rows')
         
         # Format ClusterRoleBindings
         clusterrolebinding_list = []
@@ -982,8 +932,7 @@ def resources_api():
             
             # Check if the referenced ClusterRole exists
             if not is_orphaned and crb.role_ref:
-                role_exists = any(cr.metadata.name == crb.role_ref.name for cr in cluster_roles)
-                if not role_exists:
+                if not rbac_index.cluster_role_exists(crb.role_ref.name):
                     is_orphaned = True
             
             pending_deletion = is_pending_deletion(crb)
@@ -1014,10 +963,11 @@ def resources_api():
                 'deletionTimestamp': crb.metadata.deletion_timestamp.isoformat() if pending_deletion and crb.metadata.deletion_timestamp else None,
                 'finalizers': crb.metadata.finalizers if pending_deletion and crb.metadata.finalizers else []
             })
+        phases.mark('clusterrolebindings', group='rows')
 
         # Format CronJobs
         cronjob_list = []
-        for cj in cronjobs.items:
+        for cj in cronjobs:
             is_orphaned = False
             pending_deletion = is_pending_deletion(cj)
             
@@ -1037,10 +987,11 @@ def resources_api():
                 'deletionTimestamp': cj.metadata.deletion_timestamp.isoformat() if pending_deletion and cj.metadata.deletion_timestamp else None,
                 'finalizers': cj.metadata.finalizers if pending_deletion and cj.metadata.finalizers else []
             })
+        phases.mark('cronjobs', group='rows')
         
         # Format DaemonSets
         daemonset_list = []
-        for ds in daemonsets.items:
+        for ds in daemonsets:
             is_orphaned = False
             pending_deletion = is_pending_deletion(ds)
             
@@ -1060,15 +1011,12 @@ def resources_api():
                 'deletionTimestamp': ds.metadata.deletion_timestamp.isoformat() if pending_deletion and ds.metadata.deletion_timestamp else None,
                 'finalizers': ds.metadata.finalizers if pending_deletion and ds.metadata.finalizers else []
             })
+        phases.mark('daemonsets', group='rows')
         
         # Format Endpoints
         endpoint_list = []
-        for ep in endpoints.items:
-            is_orphaned = not any(
-                svc.metadata.name == ep.metadata.name and 
-                svc.metadata.namespace == ep.metadata.namespace 
-                for svc in services.items
-            )
+        for ep in endpoints:
+            is_orphaned = not resource_index.exists('Service', ep.metadata.namespace, ep.metadata.name)
             pending_deletion = is_pending_deletion(ep)
             
             # Count subsets and addresses
@@ -1090,10 +1038,11 @@ def resources_api():
                 'deletionTimestamp': ep.metadata.deletion_timestamp.isoformat() if pending_deletion and ep.metadata.deletion_timestamp else None,
                 'finalizers': ep.metadata.finalizers if pending_deletion and ep.metadata.finalizers else []
             })
+        phases.mark('endpoints', group='rows')
 
         # Format HorizontalPodAutoscalers
         hpa_list = []
-        for hpa in horizontalpodautoscalers.items:
+        for hpa in horizontalpodautoscalers:
             # Check if orphaned (target doesn't exist)
             is_orphaned = False
             target_ref = hpa.spec.scale_target_ref
@@ -1104,15 +1053,8 @@ def resources_api():
                 target_namespace = hpa.metadata.namespace
                 
                 # Check if target exists
-                if target_kind == 'Deployment':
-                    target_exists = any(d.metadata.name == target_name and d.metadata.namespace == target_namespace for d in deployments.items)
-                    is_orphaned = not target_exists
-                elif target_kind == 'StatefulSet':
-                    target_exists = any(s.metadata.name == target_name and s.metadata.namespace == target_namespace for s in statefulsets.items)
-                    is_orphaned = not target_exists
-                elif target_kind == 'ReplicaSet':
-                    target_exists = any(r.metadata.name == target_name and r.metadata.namespace == target_namespace for r in replicasets.items)
-                    is_orphaned = not target_exists
+                if target_kind in ('Deployment', 'StatefulSet', 'ReplicaSet'):
+                    is_orphaned = not resource_index.exists(target_kind, target_namespace, target_name)
             
             pending_deletion = is_pending_deletion(hpa)
             
@@ -1137,22 +1079,17 @@ def resources_api():
                 'deletionTimestamp': hpa.metadata.deletion_timestamp.isoformat() if pending_deletion and hpa.metadata.deletion_timestamp else None,
                 'finalizers': hpa.metadata.finalizers if pending_deletion and hpa.metadata.finalizers else []
             })
+        phases.mark('horizontalpodautoscalers', group='rows')
 
         # Format Namespaces
         namespace_list = []
-        for ns in namespaces.items:
+        for ns in namespaces:
             # Check if orphaned (empty namespace with no resources)
             is_orphaned = False
             
             # Count resources in this namespace
-            resource_count = 0
-            resource_count += sum(1 for p in pods.items if p.metadata.namespace == ns.metadata.name)
-            resource_count += sum(1 for d in deployments.items if d.metadata.namespace == ns.metadata.name)
-            resource_count += sum(1 for s in statefulsets.items if s.metadata.namespace == ns.metadata.name)
-            resource_count += sum(1 for ds in daemonsets.items if ds.metadata.namespace == ns.metadata.name)
-            resource_count += sum(1 for cm in configmaps.items if cm.metadata.namespace == ns.metadata.name)
-            resource_count += sum(1 for sec in secrets.items if sec.metadata.namespace == ns.metadata.name)
-            resource_count += sum(1 for svc in services.items if svc.metadata.namespace == ns.metadata.name)
+            resource_count = resource_index.namespace_count(
+                ns.metadata.name, ('Pod', 'Deployment', 'StatefulSet', 'DaemonSet', 'ConfigMap', 'Secret', 'Service'))
             
             # Namespace is orphaned if it's empty and not a system namespace
             system_namespaces = ['default', 'kube-system', 'kube-public', 'kube-node-lease']
@@ -1174,29 +1111,17 @@ def resources_api():
                 'deletionTimestamp': ns.metadata.deletion_timestamp.isoformat() if pending_deletion and ns.metadata.deletion_timestamp else None,
                 'finalizers': ns.metadata.finalizers if pending_deletion and ns.metadata.finalizers else []
             })
+        phases.mark('namespaces', group='rows')
 
         # Format PodDisruptionBudgets
         pdb_list = []
-        for pdb in poddisruptionbudgets.items:
+        for pdb in poddisruptionbudgets:
             # Check if orphaned (no matching pods via label selector)
             is_orphaned = False
             
-            if pdb.spec.selector and pdb.spec.selector.match_labels:
+            if compile_selector(pdb.spec.selector):
                 # Check if any pods match the selector in the same namespace
-                matching_pods = False
-                for pod in pods.items:
-                    if pod.metadata.namespace == pdb.metadata.namespace:
-                        if pod.metadata.labels:
-                            # Check if all selector labels match
-                            all_match = all(
-                                pod.metadata.labels.get(k) == v 
-                                for k, v in pdb.spec.selector.match_labels.items()
-                            )
-                            if all_match:
-                                matching_pods = True
-                                break
-                
-                is_orphaned = not matching_pods
+                is_orphaned = not pod_label_index.has_match(pdb.metadata.namespace, pdb.spec.selector)
             
             pending_deletion = is_pending_deletion(pdb)
             
@@ -1219,10 +1144,11 @@ def resources_api():
                 'deletionTimestamp': pdb.metadata.deletion_timestamp.isoformat() if pending_deletion and pdb.metadata.deletion_timestamp else None,
                 'finalizers': pdb.metadata.finalizers if pending_deletion and pdb.metadata.finalizers else []
             })
+        phases.mark('poddisruptionbudgets', group='rows')
 
         # Format Ingresses
         ingress_list = []
-        for ing in ingresses.items:
+        for ing in ingresses:
             is_orphaned = not ing.metadata.owner_references
             pending_deletion = is_pending_deletion(ing)
             
@@ -1246,10 +1172,11 @@ def resources_api():
                 'deletionTimestamp': ing.metadata.deletion_timestamp.isoformat() if pending_deletion and ing.metadata.deletion_timestamp else None,
                 'finalizers': ing.metadata.finalizers if pending_deletion and ing.metadata.finalizers else []
             })
+        phases.mark('ingresses', group='rows')
         
         # Format Jobs
         job_list = []
-        for job in jobs.items:
+        for job in jobs:
             is_orphaned = not job.metadata.owner_references
             pending_deletion = is_pending_deletion(job)
             
@@ -1268,21 +1195,14 @@ def resources_api():
                 'deletionTimestamp': job.metadata.deletion_timestamp.isoformat() if pending_deletion and job.metadata.deletion_timestamp else None,
                 'finalizers': job.metadata.finalizers if pending_deletion and job.metadata.finalizers else []
             })
+        phases.mark('jobs', group='rows')
         
         # Format NetworkPolicies
         networkpolicy_list = []
-        for np in networkpolicies.items:
+        for np in networkpolicies:
             is_orphaned = False
-            if np.spec.pod_selector:
-                match_labels = np.spec.pod_selector.match_labels if np.spec.pod_selector.match_labels else {}
-                if match_labels:
-                    has_matching_pods = any(
-                        pod.metadata.namespace == np.metadata.namespace and
-                        pod.metadata.labels and
-                        all(pod.metadata.labels.get(k) == v for k, v in match_labels.items())
-                        for pod in pods.items
-                    )
-                    is_orphaned = not has_matching_pods
+            if compile_selector(np.spec.pod_selector):
+                is_orphaned = not pod_label_index.has_match(np.metadata.namespace, np.spec.pod_selector)
             pending_deletion = is_pending_deletion(np)
             
             ingress_count = len(np.spec.ingress) if np.spec.ingress else 0
@@ -1299,15 +1219,12 @@ def resources_api():
                 'deletionTimestamp': np.metadata.deletion_timestamp.isoformat() if pending_deletion and np.metadata.deletion_timestamp else None,
                 'finalizers': np.metadata.finalizers if pending_deletion and np.metadata.finalizers else []
             })
+        phases.mark('networkpolicies', group='rows')
         
         # Format Roles
         role_list = []
-        for role in roles.items:
-            is_orphaned = True
-            for rb in rolebindings.items:
-                if rb.role_ref and rb.role_ref.kind == 'Role' and rb.role_ref.name == role.metadata.name and rb.metadata.namespace == role.metadata.namespace:
-                    is_orphaned = False
-                    break
+        for role in roles:
+            is_orphaned = not rbac_index.is_role_bound(role.metadata.namespace, role.metadata.name)
             
             pending_deletion = is_pending_deletion(role)
             rules_count = len(role.rules) if role.rules else 0
@@ -1322,16 +1239,16 @@ def resources_api():
                 'deletionTimestamp': role.metadata.deletion_timestamp.isoformat() if pending_deletion and role.metadata.deletion_timestamp else None,
                 'finalizers': role.metadata.finalizers if pending_deletion and role.metadata.finalizers else []
             })
+        phases.mark('roles', group='rows')
         
         # Format RoleBindings
         rolebinding_list = []
-        for rb in rolebindings.items:
+        for rb in rolebindings:
             is_orphaned = not rb.subjects or len(rb.subjects) == 0
             
             if not is_orphaned and rb.role_ref:
                 if rb.role_ref.kind == 'Role':
-                    role_exists = any(r.metadata.name == rb.role_ref.name and r.metadata.namespace == rb.metadata.namespace for r in roles.items)
-                    if not role_exists:
+                    if not rbac_index.role_exists(rb.metadata.namespace, rb.role_ref.name):
                         is_orphaned = True
             
             pending_deletion = is_pending_deletion(rb)
@@ -1363,10 +1280,11 @@ def resources_api():
                 'deletionTimestamp': rb.metadata.deletion_timestamp.isoformat() if pending_deletion and rb.metadata.deletion_timestamp else None,
                 'finalizers': rb.metadata.finalizers if pending_deletion and rb.metadata.finalizers else []
             })
+        phases.mark('rolebindings', group='rows')
         
         # Format StorageClasses
         storageclass_list = []
-        for sc in storageclasses.items:
+        for sc in storageclasses:
             is_orphaned = False
             pending_deletion = is_pending_deletion(sc)
             
@@ -1385,11 +1303,12 @@ def resources_api():
                 'deletionTimestamp': sc.metadata.deletion_timestamp.isoformat() if pending_deletion and sc.metadata.deletion_timestamp else None,
                 'finalizers': sc.metadata.finalizers if pending_deletion and sc.metadata.finalizers else []
             })
+        phases.mark('storageclasses', group='rows')
 
 
         # Format LimitRanges
         limitrange_list = []
-        for lr in limitranges.items:
+        for lr in limitranges:
             is_orphaned = not lr.metadata.owner_references
             pending_deletion = is_pending_deletion(lr)
             
@@ -1405,10 +1324,11 @@ def resources_api():
                 'deletionTimestamp': lr.metadata.deletion_timestamp.isoformat() if pending_deletion and lr.metadata.deletion_timestamp else None,
                 'finalizers': lr.metadata.finalizers if pending_deletion and lr.metadata.finalizers else []
             })
+        phases.mark('limitranges', group='rows')
         
         # Format ResourceQuotas
         resourcequota_list = []
-        for rq in resourcequotas.items:
+        for rq in resourcequotas:
             is_orphaned = not rq.metadata.owner_references
             pending_deletion = is_pending_deletion(rq)
             
@@ -1424,6 +1344,7 @@ def resources_api():
                 'deletionTimestamp': rq.metadata.deletion_timestamp.isoformat() if pending_deletion and rq.metadata.deletion_timestamp else None,
                 'finalizers': rq.metadata.finalizers if pending_deletion and rq.metadata.finalizers else []
             })
+        phases.mark('resourcequotas', group='rows')
         
         # Format VolumeSnapshots
         volumesnapshot_list = []
@@ -1449,6 +1370,7 @@ def resources_api():
                 'deletionTimestamp': metadata.get('deletionTimestamp'),
                 'finalizers': metadata.get('finalizers', []) if pending_deletion else []
             })
+        phases.mark('volumesnapshots', group='rows')
         
         # Format VolumeSnapshotContents
         volumesnapshotcontent_list = []
@@ -1473,8 +1395,10 @@ def resources_api():
                 'deletionTimestamp': metadata.get('deletionTimestamp'),
                 'finalizers': metadata.get('finalizers', []) if pending_deletion else []
             })
+        phases.mark('volumesnapshotcontents', group='rows')
+        phases.finish()
 
-        return jsonify({
+        resources = {
             'applications': application_list,
             'applicationsnapshotrestores': restore_list,
             'clusterrolebindings': clusterrolebinding_list,
@@ -1507,11 +1431,52 @@ def resources_api():
             'storageclasses': storageclass_list,
             'volumesnapshotcontents': volumesnapshotcontent_list,
             'volumesnapshots': volumesnapshot_list,
+            'errors': fetch_errors,
             'last_updated': datetime.now().isoformat()
-        })
+        }
+        return resources
         
     except Exception as e:
         print(f"Error getting resources: {e}")
         import traceback
         traceback.print_exc()
+        raise
+
+
+# Replicas share the built document; each wraps it in a ResourceSnapshot whose
+# lazily built query indexes are kept with the cached snapshot
+resources_cache = SnapshotCache('resources', build_resources, Config.SNAPSHOT_TTL_SECONDS, wrap=ResourceSnapshot)
+
+
+@main_bp.route('/api/resources')
+@traced
+# @login_required  # Temporarily disabled for testing
+def resources_api():
+    """Get all Kubernetes resources, optionally filtered, sorted and paginated per kind"""
+    try:
+        query = ResourceQuery.from_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    phases = PhaseTimer('resources_api')
+    try:
+        snapshot = resources_cache.get()
+    except Exception as e:
         return jsonify({'error': str(e)}), 500
+    phases.mark('snapshot')
+    
+    if not query.active:
+        response = response_cache.get('resources', snapshot.version, lambda: snapshot.value.resources).response()
+        phases.mark('encode')
+        return with_snapshot_age(response, snapshot)
+    try:
+        result = snapshot.value.query(query)
+    except ContinueTokenExpired as e:
+        # As the Kubernetes API does: the client restarts the listing from the first page
+        return jsonify({'error': str(e)}), 410
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    phases.mark('query')
+    response = conditional_json(result, name='resources:query')
+    phases.mark('encode')
+    return with_snapshot_age(response, snapshot)
@@ -1,6 +1,18 @@
 """
 Utility functions and decorators
 """
-from app.utils.decorators import login_required
+from app.utils.decorators import login_required, traced
+from app.utils.indexes import LabelIndex, ConfigReferenceIndex, EndpointIndex, RBACIndex, ResourceIndex, compile_selector
+from app.utils.resource_query import ResourceQuery, ResourceSnapshot
+from app.utils.snapshot_cache import Snapshot, SnapshotCache
+from app.utils.snapshot_store import SnapshotStore, MemorySnapshotStore, FileSnapshotStore, RedisSnapshotStore, get_snapshot_store
+from app.utils.responses import EncodedJSON, ResponseCache, conditional_json, response_cache
+from app.utils.metrics import PhaseTimer, api_request, render_metrics
+from app.utils.tracing import Span, FileSpanExporter, span, record_span, server_timing
+from app.utils.cluster_records import Node, NodePod, Workload, WorkloadPod, Service, ServicePort, load_cluster
 
-__all__ = ['login_required']
\ No newline at end of file
+__all__ = ['login_required', 'traced', 'LabelIndex', 'ConfigReferenceIndex', 'EndpointIndex', 'RBACIndex', 'ResourceIndex', 'compile_selector',
+           'ResourceQuery', 'ResourceSnapshot', 'Snapshot', 'SnapshotCache',
+           'SnapshotStore', 'MemorySnapshotStore', 'FileSnapshotStore', 'RedisSnapshotStore', 'get_snapshot_store', 'EncodedJSON', 'ResponseCache', 'conditional_json', 'response_cache',
+           'PhaseTimer', 'api_request', 'render_metrics', 'Span', 'FileSpanExporter', 'span', 'record_span', 'server_timing',
+           'Node', 'NodePod', 'Workload', 'WorkloadPod', 'Service', 'ServicePort', 'load_cluster']
\ No newline at end of file
@@ -0,0 +1,174 @@
+"""
+Compact records for the nodes, pods, workloads and services of the /api/cluster snapshot
+
+Slotted dataclasses instead of one dict per object: orjson serializes them
+directly (in field order), and the JSON fallbacks use json_default.
+Strings repeated across many objects (namespaces, node names, phases,
+types) are interned, and pods with identical labels share one dict.
+Records and their label dicts are never modified once the snapshot is
+built, so the same record may appear in several places.
+"""
+import sys
+from dataclasses import dataclass, fields
+
+
+def intern(value):
+    """Return the shared copy of a repeated string; other values pass through"""
+    return sys.intern(value) if type(value) is str else value
+
+
+class LabelSets:
+    """Hands out one shared dict per distinct label set, with interned keys and values"""
+
+    def __init__(self):
+        self._sets = {}
+
+    def get(self, labels):
+        key = tuple(labels.items()) if labels else ()
+        shared = self._sets.get(key)
+        if shared is None:
+            shared = {intern(name): intern(value) for name, value in key}
+            self._sets[key] = shared
+        return shared
+
+
+@dataclass(slots=True)
+class NodePod:
+    """A pod as listed under the node it runs on"""
+    name: str
+    namespace: str
+    status: str
+    cpu_request: str
+    memory_request: str
+    labels: dict
+
+
+@dataclass(slots=True)
+class WorkloadPod:
+    """A pod as listed under the workloads and services that select it"""
+    name: str
+    namespace: str
+    status: str
+    node: str
+    ip: str
+
+
+@dataclass(slots=True)
+class Node:
+    name: str
+    status: str
+    roles: list
+    version: str
+    os: str
+    container_runtime: str
+    cpu_capacity: str
+    memory_capacity: str
+    pods: list
+    internal_ip: str
+    external_ip: str
+
+
+@dataclass(slots=True)
+class Workload:
+    """A Deployment or StatefulSet with the pods its selector matches"""
+    name: str
+    namespace: str
+    replicas: int
+    ready_replicas: int
+    available_replicas: int
+    labels: dict
+    selector: dict
+    type: str
+    pods: list
+
+
+@dataclass(slots=True)
+class ServicePort:
+    name: str
+    port: int
+    target_port: object
+    node_port: int
+    protocol: str
+
+
+@dataclass(slots=True)
+class Service:
+    name: str
+    namespace: str
+    type: str
+    cluster_ip: str
+    external_ips: list
+    ports: list
+    selector: dict
+    load_balancer_ip: str
+    node_ips: list
+
+
+@dataclass(slots=True)
+class PlacedPod:
+    """A pod entity of the cluster feed: the pod and the node it runs on"""
+    node: str
+    pod: NodePod
+
+
+def record_fields(record, exclude=()):
+    """Return a record's fields as a dict, without the excluded ones"""
+    return {field.name: getattr(record, field.name) for field in fields(record) if field.name not in exclude}
+
+
+def json_default(value):
+    """default= hook for json.dumps: records become objects, anything else its str()"""
+    if hasattr(value, '__dataclass_fields__'):
+        return record_fields(value)
+    return str(value)
+
+
+def _node(node, label_sets):
+    pods = [NodePod(**dict(pod, namespace=intern(pod['namespace']), status=intern(pod['status']),
+                           labels=label_sets.get(pod['labels'])))
+            for pod in node['pods']]
+    return Node(**dict(node, name=intern(node['name']), pods=pods))
+
+
+def _holds_records(data):
+    for key in ('master_nodes', 'deployments', 'services'):
+        items = data.get(key)
+        if items:
+            return not isinstance(items[0], dict)
+    for nodes in (data.get('worker_pools') or {}).values():
+        if nodes:
+            return not isinstance(nodes[0], dict)
+    return True
+
+
+def load_cluster(data):
+    """Turn a cluster document read back from JSON (a shared snapshot store) into records.
+
+    Documents already holding records are returned unchanged.
+    """
+    if _holds_records(data):
+        return data
+    label_sets = LabelSets()
+    workload_pods = {}
+
+    def workload_pod(pod):
+        # A pod selected by several workloads is one record, as when built
+        key = (pod['namespace'], pod['name'])
+        record = workload_pods.get(key)
+        if record is None:
+            record = WorkloadPod(pod['name'], intern(pod['namespace']), intern(pod['status']), intern(pod['node']), pod['ip'])
+            workload_pods[key] = record
+        return record
+
+    return dict(
+        data,
+        master_nodes=[_node(node, label_sets) for node in data.get('master_nodes', [])],
+        worker_pools={pool: [_node(node, label_sets) for node in nodes]
+                      for pool, nodes in data.get('worker_pools', {}).items()},
+        deployments=[Workload(**dict(workload, namespace=intern(workload['namespace']),
+                                     pods=[workload_pod(pod) for pod in workload['pods']]))
+                     for workload in data.get('deployments', [])],
+        services=[Service(**dict(service, namespace=intern(service['namespace']),
+                                 ports=[ServicePort(**port) for port in service['ports']]))
+                  for service in data.get('services', [])],
+    )
@@ -2,7 +2,9 @@
 Custom decorators for the application
 """
 from functools import wraps
-from flask import session, redirect, url_for, request, jsonify
+from flask import session, redirect, url_for, request, jsonify, make_response
+from config import Config
+from app.utils.tracing import SPAN_KIND_SERVER, server_timing, span
 
 
 def login_required(f):
@@ -15,4 +17,21 @@ def login_required(f):
                 return jsonify({'error': 'Authentication required'}), 401
             return redirect(url_for('auth.login'))
         return f(*args, **kwargs)
-    return decorated_function
\ No newline at end of file
+    return decorated_function
+
+
+def traced(f):
+    """Decorator to trace a route as one request span with a Server-Timing header"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        route = request.url_rule.rule if request.url_rule else request.path
+        with span(f'{request.method} {route}', SPAN_KIND_SERVER,
+                  **{'http.method': request.method, 'http.route': route, 'http.target': request.full_path}) as root:
+            response = make_response(f(*args, **kwargs))
+            root.attributes['http.status_code'] = response.status_code
+            if response.status_code >= 500:
+                root.error = f'HTTP {response.status_code}'
+            if Config.SERVER_TIMING_ENABLED:
+                response.headers['Server-Timing'] = server_timing(root, Config.SERVER_TIMING_PHASES)
+            return response
+    return decorated_function
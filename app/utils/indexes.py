@@ -0,0 +1,284 @@
+"""
+In-memory indexes for answering cross-resource questions without nested scans
+"""
+from collections import Counter, defaultdict
+from functools import lru_cache
+
+
+def selector_requirements(selector):
+    """Return the canonical (key, operator, values) requirements of a label selector.
+
+    Accepts a plain {key: value} dict (Service selectors) or a LabelSelector
+    object with match_labels / match_expressions.
+    """
+    if not selector:
+        return ()
+    if isinstance(selector, dict):
+        match_labels, match_expressions = selector, None
+    else:
+        match_labels, match_expressions = selector.match_labels, selector.match_expressions
+    requirements = [(key, 'In', (value,)) for key, value in sorted((match_labels or {}).items())]
+    for expression in match_expressions or []:
+        requirements.append((expression.key, expression.operator, tuple(sorted(expression.values or []))))
+    return tuple(requirements)
+
+
+@lru_cache(maxsize=4096)
+def _compile(requirements):
+    return tuple((key, operator, frozenset(values)) for key, operator, values in requirements)
+
+
+def compile_selector(selector):
+    """Compile a label selector into a hashable, memoized requirement tuple"""
+    return _compile(selector_requirements(selector))
+
+
+class LabelIndex:
+    """Inverted index of labelled objects keyed by (namespace, label key, label value).
+
+    A selector query intersects the posting sets of its requirements instead
+    of testing every object, so matching cost follows the size of the result.
+    """
+
+    def __init__(self):
+        self.items = []
+        self._by_value = defaultdict(set)
+        self._by_key = defaultdict(set)
+        self._by_namespace = defaultdict(set)
+
+    def add(self, namespace, labels, item):
+        """Index an item under its namespace and labels"""
+        item_id = len(self.items)
+        self.items.append(item)
+        self._by_namespace[namespace].add(item_id)
+        for key, value in (labels or {}).items():
+            self._by_value[(namespace, key, value)].add(item_id)
+            self._by_key[(namespace, key)].add(item_id)
+        return item_id
+
+    def _match_ids(self, namespace, selector):
+        requirements = compile_selector(selector)
+        in_namespace = self._by_namespace.get(namespace, set())
+        included = []
+        excluded = []
+        for key, operator, values in requirements:
+            if operator == 'In':
+                ids = set()
+                for value in values:
+                    ids |= self._by_value.get((namespace, key, value), set())
+                included.append(ids)
+            elif operator == 'NotIn':
+                for value in values:
+                    excluded.append(self._by_value.get((namespace, key, value), set()))
+            elif operator == 'Exists':
+                included.append(self._by_key.get((namespace, key), set()))
+            elif operator == 'DoesNotExist':
+                excluded.append(self._by_key.get((namespace, key), set()))
+            else:
+                # Unknown operators are rejected by the API server - match nothing
+                return set()
+        if included:
+            included.sort(key=len)
+            result = set(included[0])
+            for ids in included[1:]:
+                result &= ids
+                if not result:
+                    return result
+        else:
+            result = set(in_namespace)
+        for ids in excluded:
+            result -= ids
+        return result
+
+    def match(self, namespace, selector):
+        """Return the items in a namespace matched by a selector, in insertion order"""
+        return [self.items[item_id] for item_id in sorted(self._match_ids(namespace, selector))]
+
+    def has_match(self, namespace, selector):
+        """Return whether any item in a namespace is matched by a selector"""
+        return bool(self._match_ids(namespace, selector))
+
+
+class ResourceIndex:
+    """Existence set keyed by (kind, namespace, name) plus per-namespace object counts"""
+
+    def __init__(self):
+        self._keys = set()
+        self._counts = Counter()
+
+    def add_all(self, kind, objects):
+        """Index every object of a kind"""
+        for obj in objects:
+            namespace = obj.metadata.namespace
+            self._keys.add((kind, namespace, obj.metadata.name))
+            self._counts[(kind, namespace)] += 1
+
+    def exists(self, kind, namespace, name):
+        """Return whether an object of the kind exists"""
+        return (kind, namespace, name) in self._keys
+
+    def namespace_count(self, namespace, kinds):
+        """Return the number of objects of the given kinds in a namespace"""
+        return sum(self._counts[(kind, namespace)] for kind in kinds)
+
+
+class EndpointIndex:
+    """Services with at least one ready address, keyed by (namespace, service name).
+
+    Built from Endpoints subsets and, where available, EndpointSlices (which
+    name their Service through the kubernetes.io/service-name label).
+    """
+
+    SERVICE_NAME_LABEL = 'kubernetes.io/service-name'
+
+    def __init__(self, endpoints=(), endpoint_slices=()):
+        self.ready = set()
+        for ep in endpoints:
+            self.add_endpoints(ep)
+        for endpoint_slice in endpoint_slices:
+            self.add_endpoint_slice(endpoint_slice)
+
+    def add_endpoints(self, ep):
+        """Record an Endpoints object if any subset has a ready address"""
+        if any(subset.addresses for subset in ep.subsets or []):
+            self.ready.add((ep.metadata.namespace, ep.metadata.name))
+
+    def add_endpoint_slice(self, endpoint_slice):
+        """Record the owning Service of an EndpointSlice if any endpoint is ready"""
+        service_name = (endpoint_slice.metadata.labels or {}).get(self.SERVICE_NAME_LABEL)
+        if not service_name:
+            return
+        for endpoint in endpoint_slice.endpoints or []:
+            # A missing ready condition means ready, per the EndpointSlice API
+            if endpoint.addresses and not (endpoint.conditions and endpoint.conditions.ready is False):
+                self.ready.add((endpoint_slice.metadata.namespace, service_name))
+                return
+
+    def has_ready_endpoints(self, namespace, name):
+        """Return whether a Service has at least one ready address"""
+        return (namespace, name) in self.ready
+
+
+class RBACIndex:
+    """RBAC relationships between subjects, bindings and roles, built once per refresh.
+
+    Subjects and role references are keyed as (kind, namespace, name); a
+    ClusterRole reference has no namespace, a Role reference takes the
+    namespace of its RoleBinding.
+    """
+
+    def __init__(self, role_bindings=(), cluster_role_bindings=(), roles=(), cluster_roles=(), pods=()):
+        self.subject_bindings = defaultdict(list)
+        self.role_ref_bindings = defaultdict(list)
+        self.roles = {(role.metadata.namespace, role.metadata.name) for role in roles}
+        self.cluster_roles = {cr.metadata.name for cr in cluster_roles}
+        self.service_account_usage = set()
+        for rb in role_bindings:
+            self.add_binding(rb, rb.metadata.namespace)
+        for crb in cluster_role_bindings:
+            self.add_binding(crb, None)
+        for pod in pods:
+            self.service_account_usage.add((pod.metadata.namespace, pod.spec.service_account_name))
+
+    def add_binding(self, binding, namespace):
+        """Index a RoleBinding (namespace set) or ClusterRoleBinding (namespace None)"""
+        for subject in binding.subjects or []:
+            self.subject_bindings[(subject.kind, subject.namespace, subject.name)].append(binding)
+        if binding.role_ref:
+            ref_namespace = namespace if binding.role_ref.kind == 'Role' else None
+            self.role_ref_bindings[(binding.role_ref.kind, ref_namespace, binding.role_ref.name)].append(binding)
+
+    def is_service_account_used(self, namespace, name):
+        """Return whether a pod runs as the service account or a binding names it as a subject"""
+        return ((namespace, name) in self.service_account_usage
+                or ('ServiceAccount', namespace, name) in self.subject_bindings)
+
+    def is_role_bound(self, namespace, name):
+        """Return whether any RoleBinding in the namespace references the Role"""
+        return ('Role', namespace, name) in self.role_ref_bindings
+
+    def is_cluster_role_bound(self, name):
+        """Return whether any ClusterRoleBinding or RoleBinding references the ClusterRole"""
+        return ('ClusterRole', None, name) in self.role_ref_bindings
+
+    def role_exists(self, namespace, name):
+        """Return whether a Role exists in the namespace"""
+        return (namespace, name) in self.roles
+
+    def cluster_role_exists(self, name):
+        """Return whether a ClusterRole exists"""
+        return name in self.cluster_roles
+
+
+class ConfigReferenceIndex:
+    """ConfigMap and Secret references made by pods, collected in one pass.
+
+    Holds the (namespace, name) pairs referenced through volumes, envFrom and
+    env valueFrom for each kind, plus the (namespace, value) pairs of plain
+    env values, which count as a reference to a resource of either kind.
+    imagePullSecrets named by service accounts and workload pod templates
+    are tracked separately, as are the PersistentVolumeClaims pods mount.
+    """
+
+    def __init__(self, pods=()):
+        self.configmaps = set()
+        self.secrets = set()
+        self.claims = set()
+        self.plain_values = set()
+        self.image_pull_secrets = set()
+        for pod in pods:
+            self.add_pod(pod)
+
+    def add_pod(self, pod):
+        """Record every ConfigMap/Secret reference and PersistentVolumeClaim made by a pod"""
+        namespace = pod.metadata.namespace
+        if pod.spec.volumes:
+            for volume in pod.spec.volumes:
+                if volume.persistent_volume_claim:
+                    self.claims.add((namespace, volume.persistent_volume_claim.claim_name))
+                if volume.config_map and volume.config_map.name:
+                    self.configmaps.add((namespace, volume.config_map.name))
+                if volume.secret and volume.secret.secret_name:
+                    self.secrets.add((namespace, volume.secret.secret_name))
+        for containers in (pod.spec.containers, pod.spec.init_containers):
+            for container in containers or []:
+                for env_from in container.env_from or []:
+                    if env_from.config_map_ref:
+                        self.configmaps.add((namespace, env_from.config_map_ref.name))
+                    if env_from.secret_ref:
+                        self.secrets.add((namespace, env_from.secret_ref.name))
+                for env_var in container.env or []:
+                    if env_var.value_from:
+                        if env_var.value_from.config_map_key_ref:
+                            self.configmaps.add((namespace, env_var.value_from.config_map_key_ref.name))
+                        if env_var.value_from.secret_key_ref:
+                            self.secrets.add((namespace, env_var.value_from.secret_key_ref.name))
+                    elif env_var.value:
+                        # Plain values (e.g. CSI driver configmap names) may name either kind
+                        self.plain_values.add((namespace, env_var.value))
+
+    def add_service_account(self, service_account):
+        """Record the imagePullSecrets of a service account"""
+        for pull_secret in service_account.image_pull_secrets or []:
+            self.image_pull_secrets.add((service_account.metadata.namespace, pull_secret.name))
+
+    def add_workload(self, workload):
+        """Record the imagePullSecrets of a Deployment/StatefulSet/DaemonSet pod template"""
+        template_spec = workload.spec.template.spec if workload.spec and workload.spec.template else None
+        if template_spec:
+            for pull_secret in template_spec.image_pull_secrets or []:
+                self.image_pull_secrets.add((workload.metadata.namespace, pull_secret.name))
+
+    def is_pull_secret_referenced(self, namespace, name):
+        """Return whether a service account or workload uses the secret as an imagePullSecret"""
+        return (namespace, name) in self.image_pull_secrets
+
+    def is_claim_used(self, namespace, name):
+        """Return whether any pod mounts the PersistentVolumeClaim"""
+        return (namespace, name) in self.claims
+
+    def is_referenced(self, resource_type, namespace, name):
+        """Return whether any pod references the configmap or secret"""
+        key = (namespace, name)
+        references = self.configmaps if resource_type == 'configmap' else self.secrets
+        return key in references or key in self.plain_values
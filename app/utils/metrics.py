@@ -0,0 +1,188 @@
+"""
+Prometheus metrics for Kubernetes API calls, snapshot builds and API responses
+
+With PROMETHEUS_MULTIPROC_DIR set (several gunicorn workers), every worker
+writes its samples to files in that directory and a scrape of any worker
+reports the sum over all of them.
+"""
+import os
+import time
+from contextlib import contextmanager
+from prometheus_client import (CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess)
+from prometheus_client.core import GaugeMetricFamily
+from app.utils.tracing import SPAN_KIND_CLIENT, child_count, record_span
+
+NAMESPACE = 'nkp_visualizer'
+
+# Cluster-wide LISTs and full builds on large clusters take tens of seconds
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+OBJECT_BUCKETS = (1, 10, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+BYTE_BUCKETS = tuple(1024 * 4 ** i for i in range(10))  # 1 KiB .. 256 MiB
+
+API_REQUEST_SECONDS = Histogram(
+    'k8s_request_duration_seconds', 'Kubernetes API request latency, including reading the response body',
+    ['verb', 'kind'], namespace=NAMESPACE, buckets=DURATION_BUCKETS)
+API_RESPONSE_OBJECTS = Histogram(
+    'k8s_response_objects', 'Objects per Kubernetes API response (one page for LISTs)',
+    ['verb', 'kind'], namespace=NAMESPACE, buckets=OBJECT_BUCKETS)
+API_RESPONSE_BYTES = Histogram(
+    'k8s_response_bytes', 'Kubernetes API response body size (LISTs fetched as raw JSON)',
+    ['verb', 'kind'], namespace=NAMESPACE, buckets=BYTE_BUCKETS)
+# Not per kind: decode time follows response size, which k8s_response_bytes has per kind
+DECODE_SECONDS = Histogram(
+    'k8s_decode_duration_seconds', 'Time decoding raw JSON LIST pages',
+    namespace=NAMESPACE, buckets=DURATION_BUCKETS)
+WATCH_EVENTS = Counter(
+    'k8s_watch_events', 'Watch events received by the informers',
+    ['kind', 'type'], namespace=NAMESPACE)
+PHASE_SECONDS = Histogram(
+    'phase_duration_seconds', 'Duration of each processing phase of a snapshot build or request',
+    ['target', 'phase'], namespace=NAMESPACE, buckets=DURATION_BUCKETS)
+SNAPSHOT_BUILD_SECONDS = Histogram(
+    'snapshot_build_duration_seconds', 'Time to build or load a snapshot, including its LIST calls',
+    ['snapshot'], namespace=NAMESPACE, buckets=DURATION_BUCKETS)
+SNAPSHOT_AGE = Gauge(
+    'snapshot_age_seconds', 'Age of the snapshot currently served',
+    ['snapshot'], namespace=NAMESPACE)
+# The oldest snapshot any live worker serves; the multiprocess collector
+# derives snapshot_age_seconds from it at scrape time
+SNAPSHOT_BUILT = Gauge(
+    'snapshot_built_timestamp_seconds', 'Unix time the snapshot currently served was built',
+    ['snapshot'], namespace=NAMESPACE, multiprocess_mode='livemin')
+CACHE_REQUESTS = Counter(
+    'cache_requests', 'Cache lookups: snapshot (hit, stale or miss), encoded (hit or miss) and etag (hit is a 304)',
+    ['cache', 'name', 'result'], namespace=NAMESPACE)
+SERIALIZE_SECONDS = Histogram(
+    'serialization_duration_seconds', 'Time serializing (identity) or compressing a response body',
+    ['name', 'encoding'], namespace=NAMESPACE, buckets=DURATION_BUCKETS)
+RESPONSE_BYTES = Histogram(
+    'response_size_bytes', 'Size of the response bodies sent',
+    ['name', 'encoding'], namespace=NAMESPACE, buckets=BYTE_BUCKETS)
+
+
+def observe_api_request(verb, kind, seconds, objects=None, size=None, started=None, error=None):
+    """Record one Kubernetes API response, and a client span when a trace is active.
+
+    started is the time.perf_counter() reading the call began at; by
+    default the call is taken to have ended just now.
+    """
+    kind = kind or 'unknown'
+    API_REQUEST_SECONDS.labels(verb, kind).observe(seconds)
+    started = time.perf_counter() - seconds if started is None else started
+    recorded = record_span(f'k8s.{verb.lower()}.{kind}', started, started + seconds, SPAN_KIND_CLIENT,
+                           **{'k8s.verb': verb, 'k8s.kind': kind, 'k8s.objects': objects, 'k8s.response_bytes': size})
+    if recorded is not None and error is not None:
+        # ApiException's str() carries the whole response; the status line is enough
+        status = getattr(error, 'status', None)
+        recorded.error = f'{status} {error.reason}' if status else str(error)
+    if objects is not None:
+        API_RESPONSE_OBJECTS.labels(verb, kind).observe(objects)
+    if size is not None:
+        API_RESPONSE_BYTES.labels(verb, kind).observe(size)
+
+
+@contextmanager
+def api_request(verb, kind):
+    """Time the Kubernetes API call made in the block, whether or not it succeeds"""
+    started = time.perf_counter()
+    error = None
+    try:
+        yield
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        observe_api_request(verb, kind, time.perf_counter() - started, objects=1 if verb != 'LIST' else None,
+                            started=started, error=error)
+
+
+class PhaseTimer:
+    """Records the time between consecutive mark() calls as the phases of one build or request.
+
+    Within a trace each phase is also a span, holding the spans started
+    during it (Kubernetes API calls, snapshot builds). Consecutive phases
+    marked with the same group are one phase_duration_seconds observation
+    under the group's name, which keeps the histogram's labels bounded;
+    finish() records a group still open at the end.
+    """
+
+    def __init__(self, target):
+        self.target = target
+        self._last = time.perf_counter()
+        self._first_child = child_count()
+        self._group = None
+        self._group_started = None
+
+    def mark(self, phase, group=None):
+        now = time.perf_counter()
+        if group != self._group:
+            self.finish()
+        if group is None:
+            PHASE_SECONDS.labels(self.target, phase).observe(now - self._last)
+        elif self._group is None:
+            self._group, self._group_started = group, self._last
+        record_span(f'{self.target}.{phase}', self._last, now, adopt_from=self._first_child)
+        self._last = now
+        self._first_child = child_count()
+
+    def finish(self):
+        """Record the open group of phases, if any"""
+        if self._group is not None:
+            PHASE_SECONDS.labels(self.target, self._group).observe(self._last - self._group_started)
+            self._group = None
+
+
+def record_cache(cache, name, result):
+    """Count one cache lookup"""
+    CACHE_REQUESTS.labels(cache, name, result).inc()
+
+
+def multiprocess_dir():
+    """The directory shared by the worker processes' metrics, or None in single-process mode"""
+    return os.environ.get('PROMETHEUS_MULTIPROC_DIR') or None
+
+
+def track_snapshot_age(name, peek):
+    """Report the age of the snapshot peek() returns at every scrape"""
+    if multiprocess_dir():
+        # Callbacks only run in the scraped worker; see SnapshotAgeCollector
+        return
+
+    def age():
+        snapshot = peek()
+        return snapshot.age if snapshot is not None else float('nan')
+    SNAPSHOT_AGE.labels(name).set_function(age)
+
+
+def record_snapshot_built(name, built_at):
+    """Record the time.time() at which the snapshot now served was built"""
+    SNAPSHOT_BUILT.labels(name).set(built_at)
+
+
+class SnapshotAgeCollector:
+    """snapshot_age_seconds computed at scrape time from the workers' build timestamps"""
+
+    def __init__(self, source):
+        self.source = source
+
+    def collect(self):
+        age = GaugeMetricFamily(f'{NAMESPACE}_snapshot_age_seconds', 'Age of the snapshot currently served',
+                                labels=['snapshot'])
+        now = time.time()
+        for metric in self.source.collect():
+            if metric.name == f'{NAMESPACE}_snapshot_built_timestamp_seconds':
+                for sample in metric.samples:
+                    age.add_metric([sample.labels['snapshot']], now - sample.value)
+            yield metric
+        yield age
+
+
+def render_metrics():
+    """Return the Prometheus text exposition and its content type"""
+    if not multiprocess_dir():
+        return generate_latest(), CONTENT_TYPE_LATEST
+    registry = CollectorRegistry()
+    registry.register(SnapshotAgeCollector(multiprocess.MultiProcessCollector(None)))
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
@@ -0,0 +1,275 @@
+"""
+Server-side filtering, sorting and pagination for /api/resources
+"""
+import base64
+import hashlib
+import json
+import re
+from bisect import bisect_left
+
+_TRUE_VALUES = ('true', '1', 'yes')
+_FALSE_VALUES = ('false', '0', 'no')
+_SORT_PATTERN = re.compile(r'^-?[A-Za-z_][A-Za-z0-9_]*$')
+_KIND_PARAMS = ('namespace', 'orphaned', 'pendingDeletion', 'prefix', 'search', 'sort', 'limit')
+
+
+class ContinueTokenExpired(ValueError):
+    """A continue token issued for an older snapshot; the listing has to start over"""
+
+
+def _parse_bool(args, name):
+    value = args.get(name)
+    if value is None or value == '':
+        return None
+    value = value.lower()
+    if value in _TRUE_VALUES:
+        return True
+    if value in _FALSE_VALUES:
+        return False
+    raise ValueError(f"'{name}' must be true or false")
+
+
+class ResourceQuery:
+    """Query parameters accepted by /api/resources.
+
+    kind            comma-separated response keys to return (default: all)
+    namespace       exact namespace match
+    orphaned        true/false; when both orphaned and pendingDeletion are
+    pendingDeletion true a row matching either is returned, as the page's
+                    Orphaned toggle does
+    prefix          name prefix
+    search          case-insensitive substring of name or namespace
+    sort            row field to order by, '-' prefix for descending
+    limit           maximum rows per kind
+    continue        token returned in 'pagination' for the next page of a kind
+
+    Every parameter except kind and continue can be overridden for a single
+    kind as <kind>.<param>, e.g. pods.orphaned=true.
+    """
+
+    def __init__(self, kinds=None, namespace=None, orphaned=None, pending_deletion=None, prefix=None,
+                 search=None, sort=None, limit=None, continue_token=None):
+        self.kinds = kinds
+        self.namespace = namespace
+        self.orphaned = orphaned
+        self.pending_deletion = pending_deletion
+        self.prefix = prefix
+        self.search = search.lower() if search else None
+        self.sort = sort
+        self.limit = limit
+        self.continue_token = continue_token
+        self.overrides = {}
+
+    @classmethod
+    def from_args(cls, args):
+        """Build a query from request args, raising ValueError on invalid values"""
+        query = cls._parse(args)
+        overrides = {}
+        for key in args:
+            kind, _, param = key.partition('.')
+            if param:
+                if param not in _KIND_PARAMS:
+                    raise ValueError(f"Unknown parameter '{key}'")
+                overrides.setdefault(kind, {})[param] = args.get(key)
+        for kind, params in overrides.items():
+            merged = {param: args.get(param) for param in _KIND_PARAMS}
+            merged.update(params)
+            query.overrides[kind] = cls._parse(merged)
+        return query
+
+    @classmethod
+    def _parse(cls, args):
+        kinds = [kind for kind in (args.get('kind') or '').split(',') if kind] or None
+        sort = args.get('sort') or None
+        if sort and not _SORT_PATTERN.match(sort):
+            raise ValueError(f"Invalid sort field '{sort}'")
+        limit = args.get('limit') or None
+        if limit is not None:
+            try:
+                limit = int(limit)
+            except ValueError:
+                raise ValueError("'limit' must be a positive integer")
+            if limit < 1:
+                raise ValueError("'limit' must be a positive integer")
+        return cls(
+            kinds=kinds,
+            namespace=args.get('namespace') or None,
+            orphaned=_parse_bool(args, 'orphaned'),
+            pending_deletion=_parse_bool(args, 'pendingDeletion'),
+            prefix=args.get('prefix') or None,
+            search=args.get('search') or None,
+            sort=sort,
+            limit=limit,
+            continue_token=args.get('continue') or None
+        )
+
+    @property
+    def active(self):
+        """Whether any parameter was given; an empty query returns the full document"""
+        return any(value is not None for value in (
+            self.kinds, self.namespace, self.orphaned, self.pending_deletion, self.prefix,
+            self.search, self.sort, self.limit, self.continue_token)) or bool(self.overrides)
+
+    def for_kind(self, kind):
+        """Return the query that applies to one kind, with its overrides"""
+        return self.overrides.get(kind, self)
+
+    def fingerprint(self, kind):
+        """Identify the filters and order a continue token was issued for"""
+        key = json.dumps([kind, self.namespace, self.orphaned, self.pending_deletion,
+                          self.prefix, self.search, self.sort])
+        return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+    def encode_continue(self, kind, offset, snapshot):
+        payload = json.dumps({'kind': kind, 'offset': offset, 'query': self.fingerprint(kind), 'snapshot': snapshot})
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_continue(self, snapshot):
+        """Return the (kind, offset) of the continue token, raising ValueError if it is invalid.
+
+        The offset only means something in the snapshot the token was issued
+        for; a token from another one raises ContinueTokenExpired.
+        """
+        try:
+            padded = self.continue_token + '=' * (-len(self.continue_token) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            kind, offset, fingerprint = payload['kind'], int(payload['offset']), payload['query']
+        except (ValueError, KeyError, TypeError):
+            raise ValueError('Invalid continue token')
+        if offset < 0 or fingerprint != self.for_kind(kind).fingerprint(kind):
+            raise ValueError('Continue token does not match the query parameters')
+        if payload.get('snapshot') != snapshot:
+            raise ContinueTokenExpired('Continue token has expired; the resources were refreshed since the first page')
+        return kind, offset
+
+
+def _sort_key(value):
+    # Numbers before strings before anything else, missing values last
+    if value is None:
+        return (3, 0, '')
+    if isinstance(value, (int, float)):
+        return (0, value, '')
+    if isinstance(value, str):
+        return (1, 0, value.lower())
+    return (2, 0, json.dumps(value, sort_keys=True, default=str))
+
+
+class ResourceSnapshot:
+    """Formatted /api/resources rows with per-kind namespace, name and sort indexes.
+
+    Indexes are built lazily on first use, so a snapshot that is reused across
+    requests only pays for the lookups its queries actually need.
+    """
+
+    def __init__(self, resources):
+        self.resources = resources
+        # Continue tokens are bound to the build; every replica loading a
+        # shared document sees the same value
+        self.built = resources.get('last_updated')
+        self._by_namespace = {}
+        self._by_name = {}
+        self._sorted = {}
+
+    def kinds(self):
+        """Response keys holding row lists"""
+        return [key for key, value in self.resources.items() if isinstance(value, list)]
+
+    def _namespace_positions(self, kind, namespace):
+        if kind not in self._by_namespace:
+            index = {}
+            for position, row in enumerate(self.resources[kind]):
+                index.setdefault(row.get('namespace'), []).append(position)
+            self._by_namespace[kind] = index
+        return self._by_namespace[kind].get(namespace, [])
+
+    def _prefix_positions(self, kind, prefix):
+        if kind not in self._by_name:
+            self._by_name[kind] = sorted((row.get('name') or '', position)
+                                         for position, row in enumerate(self.resources[kind]))
+        names = self._by_name[kind]
+        start = bisect_left(names, (prefix, -1))
+        positions = set()
+        for name, position in names[start:]:
+            if not name.startswith(prefix):
+                break
+            positions.add(position)
+        return positions
+
+    def _sorted_positions(self, kind, sort):
+        if (kind, sort) not in self._sorted:
+            field = sort.lstrip('-')
+            rows = self.resources[kind]
+            self._sorted[(kind, sort)] = sorted(
+                range(len(rows)), key=lambda position: _sort_key(rows[position].get(field)),
+                reverse=sort.startswith('-'))
+        return self._sorted[(kind, sort)]
+
+    def _matches(self, row, query):
+        if query.orphaned and query.pending_deletion:
+            if not (row.get('orphaned') or row.get('pendingDeletion')):
+                return False
+        else:
+            if query.orphaned is not None and bool(row.get('orphaned')) != query.orphaned:
+                return False
+            if query.pending_deletion is not None and bool(row.get('pendingDeletion')) != query.pending_deletion:
+                return False
+        if query.search:
+            name = (row.get('name') or '').lower()
+            namespace = (row.get('namespace') or '').lower()
+            if query.search not in name and query.search not in namespace:
+                return False
+        return True
+
+    def select(self, kind, query, offset=0):
+        """Return (rows, total, next_offset) for one kind; next_offset is None on the last page"""
+        rows = self.resources[kind]
+        if query.namespace is not None:
+            candidates = self._namespace_positions(kind, query.namespace)
+        else:
+            candidates = range(len(rows))
+        if query.prefix:
+            prefixed = self._prefix_positions(kind, query.prefix)
+            candidates = [position for position in candidates if position in prefixed]
+        if query.sort:
+            candidate_set = set(candidates)
+            candidates = [position for position in self._sorted_positions(kind, query.sort) if position in candidate_set]
+        matched = [rows[position] for position in candidates if self._matches(rows[position], query)]
+        total = len(matched)
+        if query.limit is None:
+            return matched[offset:], total, None
+        end = offset + query.limit
+        return matched[offset:end], total, end if end < total else None
+
+    def query(self, query):
+        """Evaluate a query, returning the response document with a 'pagination' section.
+
+        pagination[kind] holds the number of matching rows ('total'), the number
+        of rows of the kind before filtering ('unfiltered') and the continue
+        token for the next page, or None on the last page. A token from an
+        earlier snapshot raises ContinueTokenExpired.
+        """
+        offsets = {}
+        if query.continue_token:
+            kind, offset = query.decode_continue(self.built)
+            kinds = [kind]
+            offsets[kind] = offset
+        else:
+            kinds = query.kinds or self.kinds()
+        unknown = [kind for kind in list(kinds) + list(query.overrides)
+                   if not isinstance(self.resources.get(kind), list)]
+        if unknown:
+            raise ValueError(f"Unknown resource kind(s): {', '.join(unknown)}")
+
+        response = {key: value for key, value in self.resources.items() if not isinstance(value, list)}
+        pagination = {}
+        for kind in kinds:
+            kind_query = query.for_kind(kind)
+            rows, total, next_offset = self.select(kind, kind_query, offsets.get(kind, 0))
+            response[kind] = rows
+            pagination[kind] = {
+                'total': total,
+                'unfiltered': len(self.resources[kind]),
+                'continue': kind_query.encode_continue(kind, next_offset, self.built) if next_offset is not None else None
+            }
+        response['pagination'] = pagination
+        return response
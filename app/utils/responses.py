@@ -0,0 +1,162 @@
+"""
+JSON responses with strong ETags, If-None-Match handling and precompressed bodies
+"""
+import gzip
+import hashlib
+import json
+import threading
+import time
+from flask import Response, request
+from app.utils.metrics import RESPONSE_BYTES, SERIALIZE_SECONDS, record_cache
+from app.utils.cluster_records import json_default
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+# Keys that change on every call without the data changing; left out of the ETag
+VOLATILE_KEYS = ('last_updated',)
+
+# Bodies smaller than this are always sent uncompressed
+MIN_COMPRESS_BYTES = 1024
+
+# Moderate levels: the payloads are large and compressed once per snapshot,
+# but on the request path of whoever asks first
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+_COMPRESSORS = {'gzip': lambda body: gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)}
+if brotli is not None:
+    _COMPRESSORS['br'] = lambda body: brotli.compress(body, quality=BROTLI_QUALITY)
+
+# Server preference when the client accepts several encodings equally
+_ENCODINGS = [encoding for encoding in ('br', 'gzip') if encoding in _COMPRESSORS] + ['identity']
+
+
+def _dumps(payload):
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS, default=str)
+    return json.dumps(payload, sort_keys=True, separators=(',', ':'), default=json_default).encode()
+
+
+def compute_etag(body):
+    """Strong ETag for a serialized body"""
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+class EncodedJSON:
+    """A JSON document serialized once, with lazily built compressed variants.
+
+    The ETag covers everything except volatile_keys, which are spliced into
+    the body after hashing so the stable part is serialized exactly once.
+    Each content encoding is produced at most once, however many requests
+    are served from the same instance. name labels the metrics.
+    """
+
+    def __init__(self, payload, volatile_keys=VOLATILE_KEYS, name='other'):
+        self.name = name
+        stable = {key: value for key, value in payload.items() if key not in volatile_keys}
+        started = time.perf_counter()
+        self._stable_body = _dumps(stable)
+        SERIALIZE_SECONDS.labels(name, 'identity').observe(time.perf_counter() - started)
+        self._volatile = {key: payload[key] for key in volatile_keys if key in payload}
+        self.etag = compute_etag(self._stable_body)
+        self._bodies = {}
+        self._lock = threading.Lock()
+
+    def _raw_body(self):
+        body = self._stable_body
+        if self._volatile:
+            extra = _dumps(self._volatile)[1:-1]
+            body = body[:-1] + (b',' if body != b'{}' else b'') + extra + b'}'
+        return body
+
+    def body(self, encoding='identity'):
+        """Return the body in a content encoding, encoding it on first use"""
+        with self._lock:
+            if encoding not in self._bodies:
+                raw = self._bodies.get('identity') or self._raw_body()
+                self._bodies['identity'] = raw
+                if encoding != 'identity':
+                    started = time.perf_counter()
+                    self._bodies[encoding] = _COMPRESSORS[encoding](raw)
+                    SERIALIZE_SECONDS.labels(self.name, encoding).observe(time.perf_counter() - started)
+            return self._bodies[encoding]
+
+    def variant_etag(self, encoding):
+        # Each representation gets its own strong validator
+        return self.etag if encoding == 'identity' else f'{self.etag}-{encoding}'
+
+    def response(self):
+        """Return the document for the current request, or 304 if the client already has it"""
+        encoding = request.accept_encodings.best_match(_ENCODINGS, default='identity')
+        if encoding != 'identity' and len(self._stable_body) < MIN_COMPRESS_BYTES:
+            encoding = 'identity'
+
+        if any(request.if_none_match.contains(self.variant_etag(candidate)) for candidate in _ENCODINGS):
+            record_cache('etag', self.name, 'hit')
+            response = Response(status=304)
+        else:
+            record_cache('etag', self.name, 'miss')
+            body = self.body(encoding)
+            RESPONSE_BYTES.labels(self.name, encoding).observe(len(body))
+            response = Response(body, mimetype='application/json')
+            if encoding != 'identity':
+                response.headers['Content-Encoding'] = encoding
+
+        response.set_etag(self.variant_etag(encoding))
+        response.vary.add('Accept-Encoding')
+        # Let browsers store the response but always revalidate it
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+
+def conditional_json(payload, volatile_keys=VOLATILE_KEYS, name='other'):
+    """Return payload as JSON with a content-derived ETag, or 304 if the client already has it"""
+    return EncodedJSON(payload, volatile_keys, name).response()
+
+
+class ResponseCache:
+    """Latest encoded document per name, reused while its key is unchanged.
+
+    Callers key a document by the snapshot it was built from (e.g. its
+    version), so concurrent requests for the same snapshot share a single
+    serialization and compression instead of each encoding it again.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def get(self, name, key, build_payload, volatile_keys=VOLATILE_KEYS):
+        """Return the EncodedJSON for (name, key), building it from build_payload() on a miss"""
+        with self._lock:
+            name_lock = self._locks.setdefault(name, threading.Lock())
+        # One builder per name; requests arriving meanwhile wait and reuse its result
+        with name_lock:
+            entry = self._entries.get(name)
+            if entry is None or entry[0] != key:
+                record_cache('encoded', name, 'miss')
+                entry = (key, EncodedJSON(build_payload(), volatile_keys, name))
+                self._entries[name] = entry
+            else:
+                record_cache('encoded', name, 'hit')
+            return entry[1]
+
+    def invalidate(self, name=None):
+        """Drop one cached document, or all of them"""
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(name, None)
+
+
+response_cache = ResponseCache()
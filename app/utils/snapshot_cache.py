@@ -0,0 +1,176 @@
+"""
+Snapshot cache with single-flight rebuilds and stale-while-revalidate serving
+"""
+import threading
+import time
+from config import Config
+from app.utils.snapshot_store import get_snapshot_store
+from app.utils.metrics import SNAPSHOT_BUILD_SECONDS, record_cache, record_snapshot_built, track_snapshot_age
+from app.utils.tracing import span
+
+
+class Snapshot:
+    """One built value with its cache version, build time and the start of the load that last returned it"""
+
+    __slots__ = ('version', 'value', 'built_at', 'loaded_at')
+
+    def __init__(self, version, value, built_at, loaded_at=None):
+        self.version = version
+        self.value = value
+        self.built_at = built_at
+        self.loaded_at = built_at if loaded_at is None else loaded_at
+
+    @property
+    def age(self):
+        """Seconds since the value was built"""
+        return time.monotonic() - self.built_at
+
+
+class SnapshotCache:
+    """Holds the latest successful result of build().
+
+    A snapshot is fresh for ttl seconds. Concurrent rebuilds coalesce: the
+    first caller runs build() and everyone who was waiting meanwhile gets the
+    same snapshot. Versions increase with every new document, so they can
+    key encoded responses.
+
+    build() returns a plain document that the store shares between
+    replicas: only the replica holding the store's lease runs it, the others
+    use the document it published. wrap(document), if given, turns the
+    document into the cached value in every process.
+
+    With SNAPSHOT_BACKGROUND_REFRESH, a background thread rebuilds the
+    snapshot every ttl seconds while it is being read, and get() answers
+    immediately from the last good snapshot however old it is; only the
+    very first get() waits for a build. The refresh interval stretches when
+    builds are slow and backs off exponentially when they fail.
+    """
+
+    def __init__(self, name, build, ttl, wrap=None, store=None):
+        self.name = name
+        self.ttl = ttl
+        self._build = build
+        self._wrap = wrap
+        self._store = store or get_snapshot_store()
+        self._snapshot = None
+        self._published_at = None
+        # Snapshots loaded before this moment count as expired
+        self._not_before = 0.0
+        self._version = 0
+        self._generation = 0
+        self._build_lock = threading.Lock()
+        self._last_read = time.monotonic()
+        self._wake = threading.Event()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        track_snapshot_age(name, self.peek)
+
+    def peek(self):
+        """Return the current snapshot without building, or None"""
+        return self._snapshot
+
+    @property
+    def background(self):
+        """Whether expired snapshots are served while a background thread rebuilds them"""
+        return Config.SNAPSHOT_BACKGROUND_REFRESH and self.ttl > 0
+
+    def _is_fresh(self, snapshot):
+        return snapshot is not None and snapshot.loaded_at > self._not_before and snapshot.age < self.ttl
+
+    def get(self):
+        """Return the current snapshot, building or revalidating it when it has expired"""
+        self._last_read = time.monotonic()
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot):
+            record_cache('snapshot', self.name, 'hit')
+            return snapshot
+        if snapshot is not None and self.background:
+            # Serve the last good snapshot; the refresher brings it up to date
+            record_cache('snapshot', self.name, 'stale')
+            self._ensure_refresher()
+            return snapshot
+        record_cache('snapshot', self.name, 'miss')
+        with self._build_lock:
+            # Another caller may have finished a build while we waited for the lock
+            snapshot = self._snapshot
+            if not self._is_fresh(snapshot):
+                snapshot = self._rebuild()
+        if self.background:
+            self._ensure_refresher()
+        return snapshot
+
+    def refresh(self):
+        """Rebuild the snapshot now; callers arriving during a rebuild share its result"""
+        generation = self._generation
+        with self._build_lock:
+            snapshot = self._snapshot
+            if self._generation != generation and snapshot.loaded_at > self._not_before:
+                return snapshot
+            return self._rebuild()
+
+    def _rebuild(self):
+        # A rebuild from the background refresher is a trace of its own
+        with span(f'snapshot.build.{self.name}', snapshot=self.name):
+            return self._load()
+
+    def _load(self):
+        loaded_at = time.monotonic()
+        started = time.perf_counter()
+        document, published_at = self._store.fetch(self.name, self._build)
+        SNAPSHOT_BUILD_SECONDS.labels(self.name).observe(time.perf_counter() - started)
+        self._generation += 1
+        if self._snapshot is not None and published_at == self._published_at:
+            # Nothing newer has been published since the last load. A follower
+            # reloading after invalidate() gets the same document, which is
+            # still the latest one: it satisfies the invalidation
+            self._snapshot.loaded_at = loaded_at
+            return self._snapshot
+        value = self._wrap(document) if self._wrap else document
+        self._version += 1
+        # Age counts from when the document was built, possibly by another replica
+        built_at = time.monotonic() - max(0.0, time.time() - published_at)
+        snapshot = Snapshot(self._version, value, built_at, loaded_at)
+        self._snapshot = snapshot
+        self._published_at = published_at
+        record_snapshot_built(self.name, published_at)
+        return snapshot
+
+    def invalidate(self):
+        """Expire the snapshot, including one whose build is already in progress"""
+        self._not_before = time.monotonic()
+        # A running refresher rebuilds right away instead of at its next interval
+        self._wake.set()
+
+    def _ensure_refresher(self):
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=f'snapshot-{self.name}', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        # Start with an immediate rebuild when the snapshot has already expired
+        delay = self.ttl if self._is_fresh(self._snapshot) else 0
+        failures = 0
+        while True:
+            self._wake.wait(delay)
+            self._wake.clear()
+            with self._thread_lock:
+                if time.monotonic() - self._last_read > Config.SNAPSHOT_IDLE_SECONDS:
+                    # Nobody is reading - stop until the next get()
+                    self._thread = None
+                    return
+            started = time.monotonic()
+            try:
+                self.refresh()
+            except Exception as e:
+                failures += 1
+                delay = min(self.ttl * 2 ** failures, Config.SNAPSHOT_MAX_REFRESH_SECONDS)
+                print(f"Snapshot '{self.name}' refresh failed ({e}); serving the last snapshot, retrying in {delay:.0f}s")
+                continue
+            failures = 0
+            duration = time.monotonic() - started
+            # Slow builds mean a loaded API server - refresh less often
+            delay = min(max(self.ttl, duration * Config.SNAPSHOT_REFRESH_DURATION_FACTOR),
+                        Config.SNAPSHOT_MAX_REFRESH_SECONDS)
+            if delay > self.ttl:
+                print(f"Snapshot '{self.name}' took {duration:.1f}s to build; next refresh in {delay:.0f}s")
@@ -0,0 +1,325 @@
+"""
+Stores that share built snapshots between replicas, with a lease electing the one that builds them
+"""
+import json
+import os
+from abc import ABC, abstractmethod
+import socket
+import threading
+import time
+from config import Config
+from app.utils.cluster_records import json_default
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+
+def _encode(payload):
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS, default=str)
+    return json.dumps(payload, separators=(',', ':'), default=json_default).encode()
+
+
+def _decode(body):
+    return orjson.loads(body) if orjson is not None else json.loads(body)
+
+
+def default_holder():
+    """Identify this replica and worker process, e.g. <pod name>:<pid>"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class SnapshotStore(ABC):
+    """Where snapshot documents are published and the refresh lease is held.
+
+    fetch() is called for every rebuild: the holder of the lease for a
+    snapshot builds and publishes it, every other replica loads the latest
+    published document. A lease that is not renewed expires after
+    lease_seconds, so another replica takes over from a leader that died.
+    Before anything is published, a follower waits up to
+    SNAPSHOT_FOLLOWER_WAIT_SECONDS for the leader's first document and
+    only then builds one itself.
+
+    Subclasses implement acquire_lease, release_lease, publish and load,
+    and list in errors the exceptions their backend raises when unavailable.
+    """
+
+    def __init__(self, holder=None, lease_seconds=None):
+        self.holder = holder or default_holder()
+        self.lease_seconds = lease_seconds if lease_seconds is not None else Config.SNAPSHOT_LEASE_SECONDS
+        self._held = set()
+        self._released = False
+
+    poll_interval = 0.5
+    # Failures of the backend; a store that raises one is treated as unavailable
+    errors = (OSError,)
+
+    def fetch(self, name, build):
+        """Return (document, built_at) with built_at as a time.time() timestamp.
+
+        When the store itself fails, the snapshot is built locally: requests
+        keep being answered while the shared backend is down.
+        """
+        try:
+            leader, published = self._lease_or_load(name)
+        except self.errors as e:
+            print(f"Snapshot store unavailable ({e}); building {name} locally")
+            self._held.discard(name)
+            leader, published = False, None
+        if published is not None:
+            return published
+        built_at = time.time()
+        document = build()
+        if leader:
+            try:
+                self.publish(name, document, built_at)
+            except self.errors as e:
+                print(f"Failed to publish the {name} snapshot: {e}")
+        return document, built_at
+
+    def _lease_or_load(self, name):
+        """Return (True, None) when this replica holds the lease, else (False, the published document).
+
+        Before anything is published, wait up to SNAPSHOT_FOLLOWER_WAIT_SECONDS
+        for it; (False, None) means build locally.
+        """
+        wait = Config.SNAPSHOT_FOLLOWER_WAIT_SECONDS
+        deadline = time.monotonic() + wait
+        while True:
+            if not self._released and self.acquire_lease(name):
+                self._held.add(name)
+                return True, None
+            self._held.discard(name)
+            published = self.load(name)
+            if published is not None:
+                return False, published
+            if time.monotonic() >= deadline:
+                print(f"No published {name} snapshot after {wait:g}s; building it locally")
+                return False, None
+            # The leader is still building its first document; retrying the
+            # lease as well takes over if it died before publishing
+            time.sleep(self.poll_interval)
+
+    def release_all(self):
+        """Give up every lease this replica holds and stop taking new ones, e.g. on shutdown"""
+        self._released = True
+        for name in list(self._held):
+            try:
+                self.release_lease(name)
+            except Exception as e:
+                print(f"Failed to release snapshot lease {name}: {e}")
+        self._held.clear()
+
+    @abstractmethod
+    def acquire_lease(self, name):
+        """Take or renew the lease on a snapshot; return whether this replica holds it"""
+
+    @abstractmethod
+    def release_lease(self, name):
+        """Give up the lease on a snapshot if this replica holds it"""
+
+    @abstractmethod
+    def publish(self, name, document, built_at):
+        """Make a built document the latest one of the snapshot"""
+
+    @abstractmethod
+    def load(self, name):
+        """Return the latest published (document, built_at), or None"""
+
+
+class MemorySnapshotStore(SnapshotStore):
+    """In-process store; the default for a single replica.
+
+    replica() returns a store sharing the same state under another holder,
+    which stands in for a shared backend when exercising leader election
+    within one process.
+    """
+
+    def __init__(self, holder=None, lease_seconds=None, _state=None):
+        super().__init__(holder, lease_seconds)
+        self._state = _state or {'leases': {}, 'snapshots': {}, 'lock': threading.Lock()}
+
+    def replica(self, holder):
+        """Return a store for another replica sharing this one's leases and snapshots"""
+        return MemorySnapshotStore(holder, self.lease_seconds, self._state)
+
+    def acquire_lease(self, name):
+        now = time.time()
+        with self._state['lock']:
+            holder, expires = self._state['leases'].get(name, (None, 0))
+            if holder not in (None, self.holder) and expires > now:
+                return False
+            self._state['leases'][name] = (self.holder, now + self.lease_seconds)
+            return True
+
+    def release_lease(self, name):
+        with self._state['lock']:
+            if self._state['leases'].get(name, (None, 0))[0] == self.holder:
+                del self._state['leases'][name]
+
+    def publish(self, name, document, built_at):
+        with self._state['lock']:
+            self._state['snapshots'][name] = (document, built_at)
+
+    def load(self, name):
+        with self._state['lock']:
+            return self._state['snapshots'].get(name)
+
+
+class FileSnapshotStore(SnapshotStore):
+    """Store on a directory shared by the replicas (e.g. a ReadWriteMany volume).
+
+    Snapshots are written to a temporary file and renamed into place, so
+    readers never see a partial file. Leases are small JSON files updated
+    under an fcntl lock.
+    """
+
+    def __init__(self, directory, holder=None, lease_seconds=None):
+        super().__init__(holder, lease_seconds)
+        if fcntl is None:
+            raise RuntimeError('The file snapshot store needs fcntl (POSIX)')
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._loaded = {}
+
+    def _path(self, name, suffix):
+        return os.path.join(self.directory, f"{name}{suffix}")
+
+    def acquire_lease(self, name):
+        with open(self._path(name, '.lock'), 'a+') as lock_file:
+            fcntl.lockf(lock_file, fcntl.LOCK_EX)
+            try:
+                try:
+                    with open(self._path(name, '.lease')) as f:
+                        lease = json.load(f)
+                except (OSError, ValueError):
+                    lease = {}
+                now = time.time()
+                if lease.get('holder') not in (None, self.holder) and lease.get('expires', 0) > now:
+                    return False
+                self._write(self._path(name, '.lease'),
+                            json.dumps({'holder': self.holder, 'expires': now + self.lease_seconds}).encode())
+                return True
+            finally:
+                fcntl.lockf(lock_file, fcntl.LOCK_UN)
+
+    def release_lease(self, name):
+        with open(self._path(name, '.lock'), 'a+') as lock_file:
+            fcntl.lockf(lock_file, fcntl.LOCK_EX)
+            try:
+                with open(self._path(name, '.lease')) as f:
+                    if json.load(f).get('holder') == self.holder:
+                        os.remove(self._path(name, '.lease'))
+            except (OSError, ValueError):
+                pass
+            finally:
+                fcntl.lockf(lock_file, fcntl.LOCK_UN)
+
+    def _write(self, path, body):
+        tmp_path = f"{path}.{self.holder.replace(':', '-')}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+
+    def publish(self, name, document, built_at):
+        self._write(self._path(name, '.json'), _encode({'built_at': built_at, 'document': document}))
+
+    def load(self, name):
+        path = self._path(name, '.json')
+        try:
+            modified = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        cached = self._loaded.get(name)
+        if cached and cached[0] == modified:
+            return cached[1]
+        with open(path, 'rb') as f:
+            payload = _decode(f.read())
+        published = (payload['document'], payload['built_at'])
+        self._loaded[name] = (modified, published)
+        return published
+
+
+class RedisSnapshotStore(SnapshotStore):
+    """Store on a Redis-compatible server; needs the redis package"""
+
+    # Renew or release the lease only if this replica still holds it
+    _RENEW = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('pexpire', KEYS[1], ARGV[2]) end return 0"
+    _RELEASE = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+
+    def __init__(self, url, holder=None, lease_seconds=None, prefix=None):
+        super().__init__(holder, lease_seconds)
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('The redis snapshot store needs the redis package')
+        self.client = redis.Redis.from_url(url)
+        self.errors = (OSError, redis.RedisError)
+        self.prefix = prefix or f"nkp-cluster-visualizer:{Config.CLUSTER_NAME}"
+        self._renew = self.client.register_script(self._RENEW)
+        self._release = self.client.register_script(self._RELEASE)
+        self._loaded = {}
+
+    def _key(self, name, kind):
+        return f"{self.prefix}:{name}:{kind}"
+
+    def acquire_lease(self, name):
+        key = self._key(name, 'lease')
+        ttl_ms = int(self.lease_seconds * 1000)
+        if self.client.set(key, self.holder, nx=True, px=ttl_ms):
+            return True
+        return bool(self._renew(keys=[key], args=[self.holder, ttl_ms]))
+
+    def release_lease(self, name):
+        self._release(keys=[self._key(name, 'lease')], args=[self.holder])
+
+    def publish(self, name, document, built_at):
+        pipeline = self.client.pipeline(transaction=True)
+        pipeline.set(self._key(name, 'document'), _encode(document))
+        pipeline.set(self._key(name, 'built_at'), repr(built_at))
+        pipeline.execute()
+
+    def load(self, name):
+        built_at = self.client.get(self._key(name, 'built_at'))
+        if built_at is None:
+            return None
+        built_at = float(built_at)
+        cached = self._loaded.get(name)
+        if cached and cached[1] == built_at:
+            return cached
+        body = self.client.get(self._key(name, 'document'))
+        if body is None:
+            return None
+        # Another publish may land between the two reads; the next load catches up
+        published = (_decode(body), built_at)
+        self._loaded[name] = published
+        return published
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_snapshot_store():
+    """Return the process-wide store selected by SNAPSHOT_STORE (memory, file or redis)"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            backend = Config.SNAPSHOT_STORE
+            if backend == 'file':
+                _store = FileSnapshotStore(Config.SNAPSHOT_STORE_PATH)
+            elif backend == 'redis':
+                _store = RedisSnapshotStore(Config.SNAPSHOT_STORE_URL)
+            else:
+                if backend != 'memory':
+                    print(f"Unknown SNAPSHOT_STORE '{backend}', using memory")
+                _store = MemorySnapshotStore()
+            print(f"Snapshot store: {type(_store).__name__} as {_store.holder}")
+        return _store
@@ -0,0 +1,202 @@
+"""
+Request tracing: nested spans, an OTLP/JSON file exporter and Server-Timing headers
+"""
+import contextvars
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from config import Config
+
+SERVICE_NAME = 'nkp-cluster-visualizer'
+
+# OTLP span kinds and status codes
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+STATUS_ERROR = 2
+
+_current = contextvars.ContextVar('current_span', default=None)
+
+
+class Span:
+    """One timed operation; its children are the spans started while it was current"""
+
+    __slots__ = ('name', 'kind', 'trace_id', 'span_id', 'parent_id', 'start_ns', 'end_ns',
+                 'attributes', 'children', 'error')
+
+    def __init__(self, name, parent=None, kind=SPAN_KIND_INTERNAL, attributes=None, start_ns=None):
+        self.name = name
+        self.kind = kind
+        self.trace_id = parent.trace_id if parent is not None else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent is not None else None
+        self.start_ns = start_ns if start_ns is not None else time.time_ns()
+        self.end_ns = None
+        self.attributes = {key: value for key, value in (attributes or {}).items() if value is not None}
+        self.children = []
+        self.error = None
+        if parent is not None:
+            parent.children.append(self)
+
+    @property
+    def duration(self):
+        """Seconds from start to end, or to now while the span is open"""
+        end_ns = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end_ns - self.start_ns) / 1e9
+
+    def walk(self):
+        """Yield this span and all its descendants, depth first"""
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+
+def current_span():
+    return _current.get()
+
+
+def _wall_ns(perf):
+    """Convert a time.perf_counter() reading to Unix nanoseconds"""
+    return time.time_ns() - int((time.perf_counter() - perf) * 1e9)
+
+
+@contextmanager
+def span(name, kind=SPAN_KIND_INTERNAL, **attributes):
+    """Time the block as a child of the current span; a span without a parent is exported when it ends"""
+    parent = _current.get()
+    current = Span(name, parent, kind, attributes)
+    token = _current.set(current)
+    try:
+        yield current
+    except Exception as e:
+        current.error = str(e)
+        raise
+    finally:
+        _current.reset(token)
+        current.end_ns = time.time_ns()
+        if parent is None:
+            export(current)
+
+
+def record_span(name, started, ended=None, kind=SPAN_KIND_INTERNAL, adopt_from=None, **attributes):
+    """Add a finished child to the current span, if there is one.
+
+    started and ended are time.perf_counter() readings (ended defaults to
+    now). With adopt_from, the children the current span gained from that
+    index on are moved under the new span, so consecutive phases nest the
+    calls made during them.
+    """
+    parent = _current.get()
+    if parent is None:
+        return None
+    ended = time.perf_counter() if ended is None else ended
+    adopted = []
+    if adopt_from is not None:
+        adopted = parent.children[adopt_from:]
+        del parent.children[adopt_from:]
+    recorded = Span(name, parent, kind, attributes, start_ns=_wall_ns(started))
+    recorded.end_ns = recorded.start_ns + int((ended - started) * 1e9)
+    for child in adopted:
+        child.parent_id = recorded.span_id
+    recorded.children = adopted
+    return recorded
+
+
+def child_count():
+    """Number of children of the current span, for record_span(adopt_from=...)"""
+    parent = _current.get()
+    return len(parent.children) if parent is not None else 0
+
+
+def _attribute(key, value):
+    if isinstance(value, bool):
+        return {'key': key, 'value': {'boolValue': value}}
+    if isinstance(value, int):
+        return {'key': key, 'value': {'intValue': str(value)}}
+    if isinstance(value, float):
+        return {'key': key, 'value': {'doubleValue': value}}
+    return {'key': key, 'value': {'stringValue': str(value)}}
+
+
+def _otlp_span(item):
+    encoded = {
+        'traceId': item.trace_id,
+        'spanId': item.span_id,
+        'name': item.name,
+        'kind': item.kind,
+        'startTimeUnixNano': str(item.start_ns),
+        'endTimeUnixNano': str(item.end_ns if item.end_ns is not None else time.time_ns()),
+        'attributes': [_attribute(key, value) for key, value in item.attributes.items()],
+    }
+    if item.parent_id:
+        encoded['parentSpanId'] = item.parent_id
+    if item.error:
+        encoded['status'] = {'code': STATUS_ERROR, 'message': item.error}
+    return encoded
+
+
+def otlp_document(root):
+    """Encode a finished trace as an OTLP/JSON ExportTraceServiceRequest"""
+    return {'resourceSpans': [{
+        'resource': {'attributes': [_attribute('service.name', SERVICE_NAME),
+                                    _attribute('process.pid', os.getpid())]},
+        'scopeSpans': [{
+            'scope': {'name': SERVICE_NAME},
+            'spans': [_otlp_span(item) for item in root.walk()],
+        }],
+    }]}
+
+
+class FileSpanExporter:
+    """Appends each finished trace to a file, one OTLP/JSON request per line"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, root):
+        line = json.dumps(otlp_document(root), separators=(',', ':'))
+        with self._lock, open(self.path, 'a') as f:
+            f.write(line + '\n')
+
+
+_exporter = None
+_exporter_lock = threading.Lock()
+
+
+def get_exporter():
+    """Return the exporter configured by TRACE_EXPORT_PATH, or None when exporting is off"""
+    global _exporter
+    if not Config.TRACE_EXPORT_PATH:
+        return None
+    with _exporter_lock:
+        if _exporter is None or _exporter.path != Config.TRACE_EXPORT_PATH:
+            _exporter = FileSpanExporter(Config.TRACE_EXPORT_PATH)
+        return _exporter
+
+
+def export(root):
+    """Export a finished trace that took at least TRACE_EXPORT_MIN_MS"""
+    exporter = get_exporter()
+    if exporter is None or root.duration * 1000 < Config.TRACE_EXPORT_MIN_MS:
+        return
+    try:
+        exporter.export(root)
+    except Exception as e:
+        print(f"Error exporting trace {root.trace_id}: {e}")
+
+
+_NON_TOKEN = re.compile(r"[^A-Za-z0-9!#$%&'*+.^_`|~-]")
+
+
+def server_timing(root, limit):
+    """Server-Timing header value: the request total and its longest spans in start order"""
+    longest = sorted((item for item in root.walk() if item is not root),
+                     key=lambda item: item.duration, reverse=True)[:limit]
+    longest.sort(key=lambda item: item.start_ns)
+    entries = [f'total;dur={root.duration * 1000:.1f}']
+    entries.extend(f'{_NON_TOKEN.sub("-", item.name)};dur={item.duration * 1000:.1f}' for item in longest)
+    return ', '.join(entries)
@@ -0,0 +1,6 @@
+"""
+Benchmarks and load-testing tools run against synthetic or recorded clusters
+
+    python -m benchmarks.run --scale 50:5000 --scale 500:50000
+    python -m benchmarks.fake_apiserver serve --synthetic 500:50000 --latency-ms 20
+"""
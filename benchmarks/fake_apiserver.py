@@ -0,0 +1,550 @@
+"""
+Local stand-in for the Kubernetes API server, replaying a recorded or synthetic cluster
+
+    # Record the cluster the current kubeconfig points at (configmap and secret values are blanked)
+    python -m benchmarks.fake_apiserver record --output cluster-dump.json.gz
+
+    # Serve a recording, or a generated cluster, adding 20ms +/- 10ms to every request
+    python -m benchmarks.fake_apiserver serve --dump cluster-dump.json.gz --latency-ms 20 --jitter-ms 10
+    python -m benchmarks.fake_apiserver serve --synthetic 500:50000 --churn 20
+
+    # Run the dashboard against it through the kubeconfig the server writes
+    KUBECONFIG=fake-kubeconfig.yaml gunicorn -c gunicorn.conf.py wsgi:app
+
+LIST (with limit/continue), GET, WATCH (with bookmarks, and 410 Gone for
+expired resourceVersions) and PATCH (JSON, merge and strategic merge
+patches, the latter applied as merge patches) are served for every kind in
+cluster_api.RESOURCE_KINDS, cluster-wide and per namespace.
+"""
+import argparse
+import copy
+import gzip
+import json
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+# kind -> (API path prefix, resource, namespaced)
+API_RESOURCES = {
+    'nodes': ('/api/v1', 'nodes', False),
+    'pods': ('/api/v1', 'pods', True),
+    'services': ('/api/v1', 'services', True),
+    'configmaps': ('/api/v1', 'configmaps', True),
+    'secrets': ('/api/v1', 'secrets', True),
+    'serviceaccounts': ('/api/v1', 'serviceaccounts', True),
+    'pvcs': ('/api/v1', 'persistentvolumeclaims', True),
+    'pvs': ('/api/v1', 'persistentvolumes', False),
+    'endpoints': ('/api/v1', 'endpoints', True),
+    'namespaces': ('/api/v1', 'namespaces', False),
+    'limitranges': ('/api/v1', 'limitranges', True),
+    'resourcequotas': ('/api/v1', 'resourcequotas', True),
+    'endpointslices': ('/apis/discovery.k8s.io/v1', 'endpointslices', True),
+    'deployments': ('/apis/apps/v1', 'deployments', True),
+    'statefulsets': ('/apis/apps/v1', 'statefulsets', True),
+    'daemonsets': ('/apis/apps/v1', 'daemonsets', True),
+    'replicasets': ('/apis/apps/v1', 'replicasets', True),
+    'cronjobs': ('/apis/batch/v1', 'cronjobs', True),
+    'jobs': ('/apis/batch/v1', 'jobs', True),
+    'ingresses': ('/apis/networking.k8s.io/v1', 'ingresses', True),
+    'networkpolicies': ('/apis/networking.k8s.io/v1', 'networkpolicies', True),
+    'roles': ('/apis/rbac.authorization.k8s.io/v1', 'roles', True),
+    'rolebindings': ('/apis/rbac.authorization.k8s.io/v1', 'rolebindings', True),
+    'clusterroles': ('/apis/rbac.authorization.k8s.io/v1', 'clusterroles', False),
+    'clusterrolebindings': ('/apis/rbac.authorization.k8s.io/v1', 'clusterrolebindings', False),
+    'storageclasses': ('/apis/storage.k8s.io/v1', 'storageclasses', False),
+    'horizontalpodautoscalers': ('/apis/autoscaling/v1', 'horizontalpodautoscalers', True),
+    'poddisruptionbudgets': ('/apis/policy/v1', 'poddisruptionbudgets', True),
+    'volumesnapshots': ('/apis/snapshot.storage.k8s.io/v1', 'volumesnapshots', True),
+    'volumesnapshotcontents': ('/apis/snapshot.storage.k8s.io/v1', 'volumesnapshotcontents', False),
+    'applications': ('/apis/dataservices.nutanix.com/v1alpha1', 'applications', True),
+    'applicationsnapshots': ('/apis/dataservices.nutanix.com/v1alpha1', 'applicationsnapshots', True),
+    'appprotectionplans': ('/apis/dataservices.nutanix.com/v1alpha1', 'appprotectionplans', True),
+    'applicationsnapshotrestores': ('/apis/dataservices.nutanix.com/v1alpha1', 'applicationsnapshotrestores', True),
+}
+
+_ROUTES = {(prefix, resource): kind for kind, (prefix, resource, _) in API_RESOURCES.items()}
+_API_VERSIONS = {prefix: prefix.split('/', 2)[2] for prefix, _, _ in API_RESOURCES.values()}
+_PREFIXES = sorted({prefix for prefix, _, _ in API_RESOURCES.values()}, key=len, reverse=True)
+
+# Kinds whose values the dashboard never shows; recordings keep only their keys
+_PAYLOAD_KINDS = {'configmaps', 'secrets'}
+_PAYLOAD_FIELDS = ('data', 'binaryData', 'stringData')
+_LAST_APPLIED_ANNOTATION = 'kubectl.kubernetes.io/last-applied-configuration'
+
+# Replicas fields a workload controller would bring in line with spec.replicas
+_CONVERGED_STATUS = {
+    'deployments': ('replicas', 'readyReplicas', 'availableReplicas', 'updatedReplicas'),
+    'statefulsets': ('replicas', 'readyReplicas', 'currentReplicas', 'updatedReplicas'),
+    'replicasets': ('replicas', 'readyReplicas', 'availableReplicas'),
+}
+
+
+def _dumps(payload):
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(',', ':')).encode()
+
+
+def _loads(body):
+    return orjson.loads(body) if orjson is not None else json.loads(body)
+
+
+def _flag(value):
+    # The Python client sends booleans as True/False
+    return (value or '').lower() in ('true', '1')
+
+
+def merge_patch(target, patch):
+    """Apply a JSON merge patch (RFC 7386) and return the result"""
+    if not isinstance(patch, dict):
+        return copy.deepcopy(patch)
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = merge_patch(result.get(key), value)
+    return result
+
+
+def json_patch(target, operations):
+    """Apply the add/replace/remove operations of a JSON patch (RFC 6902) and return the result"""
+    result = copy.deepcopy(target)
+    for operation in operations:
+        *parents, last = [part.replace('~1', '/').replace('~0', '~') for part in operation['path'].split('/')[1:]]
+        container = result
+        for part in parents:
+            container = container[int(part)] if isinstance(container, list) else container.setdefault(part, {})
+        op = operation['op']
+        if isinstance(container, list):
+            index = len(container) if last == '-' else int(last)
+            if op == 'add':
+                container.insert(index, operation['value'])
+            elif op == 'replace':
+                container[index] = operation['value']
+            elif op == 'remove':
+                del container[index]
+            else:
+                raise ValueError(f"Unsupported JSON patch operation '{op}'")
+        elif op in ('add', 'replace'):
+            container[last] = operation['value']
+        elif op == 'remove':
+            container.pop(last, None)
+        else:
+            raise ValueError(f"Unsupported JSON patch operation '{op}'")
+    return result
+
+
+class ResourceStore:
+    """Objects by kind, kept as encoded JSON, with a bounded watch event log per kind.
+
+    Every object is stamped with a resourceVersion from one counter, as the
+    API server does. A watch from a resourceVersion older than the oldest
+    logged event of its kind is answered with 410 Gone.
+    """
+
+    def __init__(self, documents, event_log_size=10000):
+        self.resource_version = 0
+        self._objects = {}
+        self._events = {}
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        for kind in API_RESOURCES:
+            objects = {}
+            for obj in documents.get(kind) or ():
+                metadata = obj.setdefault('metadata', {})
+                self.resource_version += 1
+                metadata['resourceVersion'] = str(self.resource_version)
+                objects[(metadata.get('namespace'), metadata.get('name'))] = _dumps(obj)
+            self._objects[kind] = objects
+            self._events[kind] = deque(maxlen=event_log_size)
+        self._floor = dict.fromkeys(API_RESOURCES, self.resource_version)
+
+    def count(self, kind=None):
+        with self._lock:
+            if kind is not None:
+                return len(self._objects[kind])
+            return sum(len(objects) for objects in self._objects.values())
+
+    def keys(self, kind):
+        with self._lock:
+            return list(self._objects[kind])
+
+    def list(self, kind, namespace=None, limit=None, continue_token=None):
+        """Return (encoded items, continue token, collection resourceVersion)"""
+        with self._lock:
+            objects = self._objects[kind]
+            if namespace is None:
+                bodies = list(objects.values())
+            else:
+                bodies = [body for (obj_namespace, _), body in objects.items() if obj_namespace == namespace]
+            resource_version = self.resource_version
+        start = int(continue_token or 0)
+        end = min(len(bodies), start + limit) if limit else len(bodies)
+        return bodies[start:end], (str(end) if end < len(bodies) else None), resource_version
+
+    def get(self, kind, namespace, name):
+        with self._lock:
+            return self._objects[kind].get((namespace, name))
+
+    def modify(self, kind, namespace, name, change):
+        """Replace an object with change(object), log a MODIFIED event and return the new encoding"""
+        with self._lock:
+            body = self._objects[kind].get((namespace, name))
+            if body is None:
+                raise KeyError(name)
+            obj = change(_loads(body))
+            self.resource_version += 1
+            metadata = obj.setdefault('metadata', {})
+            metadata.update(name=name, resourceVersion=str(self.resource_version))
+            if namespace is not None:
+                metadata['namespace'] = namespace
+            body = _dumps(obj)
+            self._objects[kind][(namespace, name)] = body
+            events = self._events[kind]
+            if len(events) == events.maxlen:
+                self._floor[kind] = events[0][0]
+            events.append((self.resource_version, namespace, b'{"type":"MODIFIED","object":' + body + b'}'))
+            self._changed.notify_all()
+            return body
+
+    def events_since(self, kind, resource_version):
+        """Return (events after resource_version, current resourceVersion), or None if it has expired"""
+        with self._lock:
+            if resource_version < self._floor[kind]:
+                return None
+            events = [event for event in self._events[kind] if event[0] > resource_version]
+            return events, self.resource_version
+
+    def wait(self, timeout):
+        """Block until an object changes or timeout seconds pass"""
+        with self._changed:
+            self._changed.wait(timeout)
+
+
+class APIRequestHandler(BaseHTTPRequestHandler):
+    """Serves one request against server.store, after server.latency() seconds"""
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'fake-apiserver'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_PATCH(self):
+        self._handle('PATCH')
+
+    def _handle(self, method):
+        url = urlsplit(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        time.sleep(self.server.latency())
+        if url.path in ('/healthz', '/readyz', '/livez'):
+            return self._send(200, b'ok', 'text/plain')
+        if url.path == '/version':
+            return self._send_json(200, {'major': '1', 'minor': '29', 'gitVersion': 'v1.29.0-fake', 'platform': 'linux/amd64'})
+        route = self._route(url.path)
+        if route is None:
+            return self._send_status(404, 'NotFound', f'the server could not find the requested resource ({url.path})')
+        kind, namespace, name = route
+        if method == 'PATCH':
+            if name is None:
+                return self._send_status(405, 'MethodNotAllowed', 'PATCH needs an object name')
+            return self._patch(kind, namespace, name)
+        if name is not None:
+            body = self.server.store.get(kind, namespace, name)
+            if body is None:
+                return self._send_status(404, 'NotFound', f'{API_RESOURCES[kind][1]} "{name}" not found')
+            return self._send(200, body)
+        if _flag(params.get('watch')):
+            return self._watch(kind, namespace, params)
+        return self._list(kind, namespace, params)
+
+    def _route(self, path):
+        """Return (kind, namespace, name) for an object or collection path, or None"""
+        for prefix in _PREFIXES:
+            if path.startswith(prefix + '/'):
+                parts = path[len(prefix) + 1:].split('/')
+                break
+        else:
+            return None
+        namespace = None
+        if len(parts) >= 3 and parts[0] == 'namespaces':
+            namespace, parts = parts[1], parts[2:]
+        kind = _ROUTES.get((prefix, parts[0]))
+        if kind is None or len(parts) > 2:
+            return None
+        if namespace is not None and not API_RESOURCES[kind][2]:
+            return None
+        return kind, namespace, parts[1] if len(parts) == 2 else None
+
+    def _list(self, kind, namespace, params):
+        try:
+            limit = int(params['limit']) if params.get('limit') else None
+            items, continue_token, resource_version = self.server.store.list(kind, namespace, limit, params.get('continue'))
+        except ValueError:
+            return self._send_status(400, 'BadRequest', 'invalid limit or continue token')
+        metadata = {'resourceVersion': str(resource_version)}
+        if continue_token:
+            metadata['continue'] = continue_token
+        body = (b'{"apiVersion":' + _dumps(_API_VERSIONS[API_RESOURCES[kind][0]]) +
+                b',"kind":"List","metadata":' + _dumps(metadata) + b',"items":[' + b','.join(items) + b']}')
+        self._send(200, body)
+
+    def _patch(self, kind, namespace, name):
+        content_type = (self.headers.get('Content-Type') or '').split(';')[0]
+        try:
+            patch = _loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)))
+        except ValueError:
+            return self._send_status(400, 'BadRequest', 'the patch is not valid JSON')
+
+        def change(obj):
+            if content_type == 'application/json-patch+json':
+                obj = json_patch(obj, patch)
+            else:
+                # Strategic merge patches are applied as merge patches: lists are replaced
+                obj = merge_patch(obj, patch)
+            replicas = obj.get('spec', {}).get('replicas')
+            if kind in _CONVERGED_STATUS and replicas is not None:
+                status = obj.setdefault('status', {})
+                status.update(dict.fromkeys(_CONVERGED_STATUS[kind], replicas))
+            return obj
+
+        if self.server.store.get(kind, namespace, name) is None:
+            return self._send_status(404, 'NotFound', f'{API_RESOURCES[kind][1]} "{name}" not found')
+        try:
+            body = self.server.store.modify(kind, namespace, name, change)
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            return self._send_status(422, 'Invalid', f'the patch could not be applied: {e}')
+        self._send(200, body)
+
+    def _watch(self, kind, namespace, params):
+        store = self.server.store
+        timeout = min(int(params.get('timeoutSeconds') or 1800), 1800)
+        bookmarks = _flag(params.get('allowWatchBookmarks'))
+        requested = params.get('resourceVersion')
+        since = int(requested) if requested and requested != '0' else store.resource_version
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        deadline = time.monotonic() + timeout
+        next_bookmark = time.monotonic() + self.server.bookmark_seconds
+        try:
+            while True:
+                result = store.events_since(kind, since)
+                if result is None:
+                    self._write_chunk(_dumps({'type': 'ERROR', 'object': {
+                        'kind': 'Status', 'apiVersion': 'v1', 'status': 'Failure', 'reason': 'Expired', 'code': 410,
+                        'message': f'too old resource version: {since}'}}) + b'\n')
+                    break
+                events, since = result
+                for _, event_namespace, event in events:
+                    if namespace is None or event_namespace == namespace:
+                        self._write_chunk(event + b'\n')
+                now = time.monotonic()
+                if now >= deadline:
+                    break
+                if bookmarks and now >= next_bookmark:
+                    self._write_chunk(_dumps({'type': 'BOOKMARK', 'object': {
+                        'kind': 'Bookmark', 'metadata': {'resourceVersion': str(since)}}}) + b'\n')
+                    next_bookmark = now + self.server.bookmark_seconds
+                store.wait(min(deadline, next_bookmark) - now)
+            self._write_chunk(b'')
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    def _write_chunk(self, data):
+        self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+        self.wfile.flush()
+
+    def _send(self, code, body, content_type='application/json'):
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, code, payload):
+        self._send(code, _dumps(payload))
+
+    def _send_status(self, code, reason, message):
+        self._send_json(code, {'kind': 'Status', 'apiVersion': 'v1', 'metadata': {}, 'status': 'Failure',
+                               'reason': reason, 'message': message, 'code': code})
+
+
+class FakeAPIServer(ThreadingHTTPServer):
+    """HTTP server over a ResourceStore, with injected latency and optional pod churn"""
+
+    daemon_threads = True
+
+    def __init__(self, store, host='127.0.0.1', port=0, latency_ms=0, jitter_ms=0, bookmark_seconds=30, verbose=False):
+        super().__init__((host, port), APIRequestHandler)
+        self.store = store
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.bookmark_seconds = bookmark_seconds
+        self.verbose = verbose
+        self._random = random.Random(0)
+        self._stopped = threading.Event()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def latency(self):
+        """Seconds to hold each request, standing in for API server and network time"""
+        jitter = self._random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0
+        return max(0.0, self.latency_ms + jitter) / 1000
+
+    def write_kubeconfig(self, path):
+        """Write a kubeconfig pointing at this server"""
+        with open(path, 'w') as f:
+            f.write(KUBECONFIG_TEMPLATE.format(server=self.url))
+
+    def start(self):
+        """Serve on a background thread"""
+        threading.Thread(target=self.serve_forever, name='fake-apiserver', daemon=True).start()
+        return self
+
+    def start_churn(self, per_second, kind='pods'):
+        """Modify per_second random objects of a kind every second, to keep watches busy"""
+        def bump_restarts(obj):
+            statuses = obj.setdefault('status', {}).setdefault('containerStatuses', [{'name': 'app'}])
+            statuses[0]['restartCount'] = statuses[0].get('restartCount', 0) + 1
+            return obj
+
+        def run():
+            keys = self.store.keys(kind)
+            churn = random.Random(1)
+            while keys and not self._stopped.wait(1 / per_second):
+                namespace, name = churn.choice(keys)
+                self.store.modify(kind, namespace, name, bump_restarts)
+
+        threading.Thread(target=run, name='fake-apiserver-churn', daemon=True).start()
+
+    def shutdown(self):
+        self._stopped.set()
+        super().shutdown()
+
+
+KUBECONFIG_TEMPLATE = """apiVersion: v1
+kind: Config
+clusters:
+- name: fake-apiserver
+  cluster:
+    server: {server}
+contexts:
+- name: fake-apiserver
+  context:
+    cluster: fake-apiserver
+    user: fake-apiserver
+current-context: fake-apiserver
+users:
+- name: fake-apiserver
+  user:
+    token: fake
+"""
+
+
+def _redact(kind, obj):
+    """Drop payload values, managed fields and last-applied annotations from a recorded object"""
+    metadata = obj.get('metadata', {})
+    metadata.pop('managedFields', None)
+    if metadata.get('annotations'):
+        metadata['annotations'].pop(_LAST_APPLIED_ANNOTATION, None)
+    if kind in _PAYLOAD_KINDS:
+        for field in _PAYLOAD_FIELDS:
+            if obj.get(field):
+                obj[field] = dict.fromkeys(obj[field], '')
+    return obj
+
+
+def _open(path, mode):
+    return gzip.open(path, mode) if path.endswith('.gz') else open(path, mode)
+
+
+def record(output):
+    """List every kind the dashboard reads from the current cluster into a dump file"""
+    import cluster_api
+    from config import Config
+
+    kinds = {}
+    for kind, list_func in cluster_api.RESOURCE_KINDS.items():
+        items = []
+        try:
+            for page in cluster_api.iter_pages(list_func, raw=True, kind=kind):
+                items.extend(_redact(kind, obj) for obj in page.get('items') or [])
+        except Exception as e:
+            print(f"Skipping {kind}: {e}")
+        kinds[kind] = items
+        print(f"Recorded {len(items)} {kind}")
+    dump = {'cluster_name': Config.CLUSTER_NAME, 'recorded_at': datetime.now(timezone.utc).isoformat(), 'kinds': kinds}
+    with _open(output, 'wb') as f:
+        f.write(_dumps(dump))
+    print(f"Wrote {sum(len(items) for items in kinds.values())} objects to {output}")
+
+
+def load_documents(dump=None, synthetic=None):
+    """Return {kind: objects} from a recorded dump or a NODES:PODS synthetic cluster"""
+    if dump:
+        with _open(dump, 'rb') as f:
+            return _loads(f.read())['kinds']
+    from benchmarks.synthetic_cluster import SyntheticCluster
+
+    nodes, _, pods = synthetic.partition(':')
+    cluster = SyntheticCluster(int(nodes), int(pods))
+    return {kind: list(cluster.items(kind)) for kind in cluster.counts}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Fake Kubernetes API server replaying a recorded or synthetic cluster')
+    commands = parser.add_subparsers(dest='command', required=True)
+    record_parser = commands.add_parser('record', help='dump the cluster of the current kubeconfig')
+    record_parser.add_argument('--output', default='cluster-dump.json.gz', help='dump file (.gz to compress)')
+    serve_parser = commands.add_parser('serve', help='serve a dump or a synthetic cluster')
+    source = serve_parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--dump', help='dump written by record')
+    source.add_argument('--synthetic', metavar='NODES:PODS', help='generate a cluster (see benchmarks.synthetic_cluster)')
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=8001)
+    serve_parser.add_argument('--latency-ms', type=float, default=0, help='added to every request')
+    serve_parser.add_argument('--jitter-ms', type=float, default=0, help='random +/- variation of the latency')
+    serve_parser.add_argument('--churn', type=float, default=0, help='pod modifications per second sent to watches')
+    serve_parser.add_argument('--kubeconfig', default='fake-kubeconfig.yaml', help='kubeconfig to write for the dashboard')
+    serve_parser.add_argument('--verbose', action='store_true', help='log every request')
+    args = parser.parse_args(argv)
+
+    if args.command == 'record':
+        record(args.output)
+        return
+
+    store = ResourceStore(load_documents(args.dump, args.synthetic))
+    server = FakeAPIServer(store, args.host, args.port, args.latency_ms, args.jitter_ms, verbose=args.verbose)
+    server.write_kubeconfig(args.kubeconfig)
+    if args.churn:
+        server.start_churn(args.churn)
+    print(f"Serving {store.count()} objects on {server.url}; KUBECONFIG={args.kubeconfig}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,309 @@
+"""
+Time the /api/cluster and /api/resources snapshot builds phase by phase on synthetic clusters
+
+    python -m benchmarks.run                                  # default scale points
+    python -m benchmarks.run --scale 500:50000 --repeat 5
+    python -m benchmarks.run --models                         # decode into kubernetes models
+    python -m benchmarks.run --baseline bench_results.json    # compare with an earlier run
+
+Each scale point is NODES:PODS; the other kinds are sized from the pod
+count (see SyntheticCluster). Phases, timed separately on the same data:
+
+    list      LIST every kind the endpoint reads, decoded as cluster_api does
+              (raw JSON projections, or models with --models); the time
+              spent rendering the synthetic API responses is excluded
+    build     get_cluster_data() / build_resources() on the listed objects
+    build.*   the PhaseTimer phases of that build (build.nodes, build.pods,
+              build.configmaps, ...), read from its trace spans
+    entities  flatten the cluster document for the stream diff (cluster only)
+    diff      diff the entities against those of the cluster grown by 1% of
+              its pods, as a refresh does for /api/cluster?since= and the
+              stream (cluster only)
+    delta_frame, snapshot_frame
+              encode the stream's delta and snapshot events (cluster only)
+    index     wrap the resources document in a ResourceSnapshot (resources only)
+    query_*   filtered, sorted, paginated /api/resources queries
+    encode    serialize the response body and its ETag
+    gzip, br  compress the serialized body
+
+Results are written as JSON (--output); with --baseline, phases slower
+than the baseline by more than --tolerance are reported and the exit
+status is 1.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import contextmanager, redirect_stdout
+from datetime import datetime, timezone
+
+from config import Config
+
+# Lists must go to the synthetic API, not to informer stores
+Config.INFORMERS_ENABLED = False
+
+import cluster_api
+from app.routes import main
+from app.utils.resource_query import ResourceQuery, ResourceSnapshot
+from app.utils.responses import EncodedJSON, brotli
+from app.utils import tracing
+from benchmarks.synthetic_cluster import SyntheticAPI, SyntheticCluster
+from cluster_stream import cluster_entities, diff_entities, sse_frame
+
+DEFAULT_SCALES = ('50:5000', '500:50000', '5000:150000')
+
+CLUSTER_KINDS = ('nodes', 'pods', 'deployments', 'statefulsets', 'services')
+
+RESOURCE_QUERIES = {
+    'query_namespace': {'namespace': 'team-1', 'sort': '-name', 'limit': '100'},
+    'query_orphaned': {'orphaned': 'true', 'pendingDeletion': 'true', 'limit': '100'},
+    'query_search': {'kind': 'pods,configmaps,secrets', 'search': 'app-1', 'limit': '100'},
+}
+
+ENCODINGS = ('gzip', 'br') if brotli is not None else ('gzip',)
+
+
+def summarize(samples):
+    return {'best': min(samples), 'median': statistics.median(samples), 'runs': len(samples)}
+
+
+@contextmanager
+def quiet():
+    """Discard the per-object log lines the builds print"""
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        yield
+
+
+def timed(fn, repeat, setup=None):
+    """Run fn repeat times and return (last result, timing summary); setup() is not timed"""
+    samples = []
+    result = None
+    for _ in range(repeat):
+        argument = setup() if setup else None
+        gc.collect()
+        with quiet():
+            started = time.perf_counter()
+            result = fn(argument) if setup else fn()
+            samples.append(time.perf_counter() - started)
+    return result, summarize(samples)
+
+
+def timed_phases(fn, repeat, prefix):
+    """Like timed(), also summarizing the phases fn records, as {prefix.phase: timing}"""
+    samples = []
+    by_phase = {}
+    result = None
+    for _ in range(repeat):
+        gc.collect()
+        with quiet(), tracing.span('benchmark') as root:
+            started = time.perf_counter()
+            result = fn()
+            samples.append(time.perf_counter() - started)
+        for child in root.children:
+            # Phase spans are named <target>.<phase>
+            phase = f"{prefix}.{child.name.partition('.')[2]}"
+            by_phase.setdefault(phase, []).append(child.duration)
+    return result, summarize(samples), {phase: summarize(durations) for phase, durations in by_phase.items()}
+
+
+def list_kinds(api, kinds, repeat):
+    """List each kind through cluster_api; return (objects by kind, total timing, timing by kind)"""
+    fetched = {}
+    by_kind = {}
+    for kind in kinds:
+        samples = []
+        for _ in range(repeat):
+            gc.collect()
+            with quiet():
+                served = api.serve_seconds
+                started = time.perf_counter()
+                objects = cluster_api.list_kind(kind)
+                samples.append(time.perf_counter() - started - (api.serve_seconds - served))
+        fetched[kind] = objects
+        by_kind[kind] = summarize(samples)
+    total = {key: sum(timing[key] for timing in by_kind.values()) for key in ('best', 'median')}
+    total['runs'] = repeat
+    return fetched, total, by_kind
+
+
+@contextmanager
+def prefetched(fetched):
+    """Serve cluster_api and the resources build from already listed objects"""
+    saved = cluster_api.list_kind, cluster_api.iter_kind, main.fetch_kinds
+    cluster_api.list_kind = lambda kind: list(fetched[kind])
+    cluster_api.iter_kind = lambda kind: iter(fetched[kind])
+    main.fetch_kinds = lambda kinds: ({kind: list(fetched[kind]) for kind in kinds}, {})
+    try:
+        yield
+    finally:
+        cluster_api.list_kind, cluster_api.iter_kind, main.fetch_kinds = saved
+
+
+def time_encoding(document, volatile_keys, repeat, phases, sizes):
+    """Add encode and compression phases and body sizes for a response document"""
+    encoded, phases['encode'] = timed(lambda: EncodedJSON(document, volatile_keys).body(), repeat)
+    sizes['identity'] = len(encoded)
+    for encoding in ENCODINGS:
+        def prepare():
+            prepared = EncodedJSON(document, volatile_keys)
+            prepared.body()
+            return prepared
+        body, phases[encoding] = timed(lambda prepared: prepared.body(encoding), repeat, setup=prepare)
+        sizes[encoding] = len(body)
+
+
+def churned_cluster(api, fetched):
+    """Build the cluster document again after 1% more pods were created"""
+    counts = api.cluster.counts
+    pods = counts['pods']
+    counts['pods'] = pods + max(1, pods // 100)
+    try:
+        with quiet():
+            grown = dict(fetched, pods=cluster_api.list_kind('pods'))
+        with prefetched(grown), quiet():
+            return cluster_api.get_cluster_data()
+    finally:
+        counts['pods'] = pods
+
+
+def bench_cluster(api, repeat):
+    phases = {}
+    sizes = {}
+    fetched, phases['list'], list_by_kind = list_kinds(api, CLUSTER_KINDS, repeat)
+    with prefetched(fetched):
+        data, phases['build'], build_phases = timed_phases(cluster_api.get_cluster_data, repeat, 'build')
+    if 'error' in data:
+        raise RuntimeError(f"get_cluster_data failed: {data['error']}")
+    phases.update(build_phases)
+    entities, phases['entities'] = timed(lambda: cluster_entities(data), repeat)
+    churned = cluster_entities(churned_cluster(api, fetched))
+    changes, phases['diff'] = timed(lambda: diff_entities(entities, churned), repeat)
+    _, phases['delta_frame'] = timed(lambda: sse_frame('delta', {'version': 'bench:2', 'changes': changes}), repeat)
+    _, phases['snapshot_frame'] = timed(lambda: sse_frame('snapshot', {'version': 'bench:1', 'data': data}), repeat)
+    time_encoding(data, main.CLUSTER_VOLATILE_KEYS, repeat, phases, sizes)
+    return {
+        'phases': phases,
+        'list_by_kind': list_by_kind,
+        'bytes': sizes,
+        'objects': {'pods': data['total_pods'], 'workloads': len(data['deployments']),
+                    'services': len(data['services']), 'entities': len(entities), 'changes': len(changes)},
+    }
+
+
+def bench_resources(api, repeat):
+    phases = {}
+    sizes = {}
+    fetched, phases['list'], list_by_kind = list_kinds(api, main.RESOURCE_API_KINDS, repeat)
+    with prefetched(fetched):
+        document, phases['build'], build_phases = timed_phases(main.build_resources, repeat, 'build')
+    phases.update(build_phases)
+    snapshot, phases['index'] = timed(lambda: ResourceSnapshot(document), repeat)
+    for name, args in RESOURCE_QUERIES.items():
+        query = ResourceQuery.from_args(args)
+        _, phases[name] = timed(lambda: snapshot.query(query), repeat)
+    time_encoding(document, ('last_updated',), repeat, phases, sizes)
+    return {
+        'phases': phases,
+        'list_by_kind': list_by_kind,
+        'bytes': sizes,
+        'objects': {kind: len(rows) for kind, rows in document.items() if isinstance(rows, list)},
+    }
+
+
+def run_scale_point(scale, repeat):
+    nodes, _, pods = scale.partition(':')
+    cluster = SyntheticCluster(int(nodes), int(pods))
+    api = SyntheticAPI(cluster)
+    print(f"Scale {cluster.name}: {sum(cluster.counts.values())} objects")
+    result = {'name': cluster.name, 'counts': cluster.counts}
+    with api.serve():
+        for target, bench in (('cluster', bench_cluster), ('resources', bench_resources)):
+            result[target] = bench(api, repeat)
+            print_phases(target, result[target]['phases'])
+    return result
+
+
+def print_phases(target, phases):
+    print(f"  {target:<10}" + '  '.join(f"{phase} {timing['best'] * 1000:.1f}ms" for phase, timing in phases.items()))
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Per-kind build phases can take well under a millisecond, where run-to-run
+# noise exceeds any tolerance; those are reported but never flagged
+NOISE_FLOOR_SECONDS = 0.001
+
+
+def compare(results, baseline, tolerance):
+    """Print phase timings against a baseline run; return the phases that regressed"""
+    regressions = []
+    if baseline.get('settings', {}).get('raw_json_fetch') != results['settings']['raw_json_fetch']:
+        print('Note: the baseline was run with a different decode mode (--models)')
+    previous_points = {point['name']: point for point in baseline.get('scale_points', [])}
+    for point in results['scale_points']:
+        previous = previous_points.get(point['name'])
+        if previous is None:
+            continue
+        print(f"Scale {point['name']} vs baseline {baseline.get('commit') or ''}")
+        for target in ('cluster', 'resources'):
+            for phase, timing in point[target]['phases'].items():
+                before = previous.get(target, {}).get('phases', {}).get(phase)
+                if not before or not before['best']:
+                    continue
+                ratio = timing['best'] / before['best']
+                flag = ' REGRESSION' if ratio > tolerance and timing['best'] >= NOISE_FLOOR_SECONDS else ''
+                print(f"  {target}.{phase}: {before['best'] * 1000:.1f}ms -> {timing['best'] * 1000:.1f}ms ({ratio:.2f}x){flag}")
+                if flag:
+                    regressions.append({'scale': point['name'], 'phase': f'{target}.{phase}', 'ratio': ratio})
+    return regressions
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the cluster and resources snapshot builds on synthetic clusters')
+    parser.add_argument('--scale', action='append', help=f"NODES:PODS scale point, repeatable (default: {', '.join(DEFAULT_SCALES)})")
+    parser.add_argument('--repeat', type=int, default=3, help='runs per phase; the best and median are reported')
+    parser.add_argument('--models', action='store_true', help='decode LIST responses into kubernetes models (RAW_JSON_FETCH=false)')
+    parser.add_argument('--output', default='bench_results.json', help='where to write the JSON results')
+    parser.add_argument('--baseline', help='earlier results to compare with')
+    parser.add_argument('--tolerance', type=float, default=1.25, help='slowdown ratio reported as a regression')
+    args = parser.parse_args(argv)
+
+    Config.RAW_JSON_FETCH = not args.models
+    results = {
+        'created': datetime.now(timezone.utc).isoformat(),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'settings': {
+            'raw_json_fetch': Config.RAW_JSON_FETCH,
+            'list_page_size': Config.LIST_PAGE_SIZE,
+            'orjson': cluster_api._json_loads is not json.loads,
+            'brotli': brotli is not None,
+            'repeat': args.repeat,
+        },
+        'scale_points': [run_scale_point(scale, args.repeat) for scale in args.scale or DEFAULT_SCALES],
+    }
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            results['regressions'] = compare(results, json.load(f), args.tolerance)
+        status = 1 if results['regressions'] else 0
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main_cli())
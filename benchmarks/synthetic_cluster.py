@@ -0,0 +1,540 @@
+"""
+Deterministic synthetic clusters, served through stand-ins for the kubernetes client's LIST calls
+"""
+import json
+import threading
+import time
+from contextlib import contextmanager
+from kubernetes.client import ApiClient
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+CREATED = '2025-01-01T00:00:00Z'
+
+# List types the kubernetes client deserializes each kind into; the
+# remaining kinds are custom resources, which it returns as plain dicts
+MODEL_LIST_TYPES = {
+    'nodes': 'V1NodeList',
+    'pods': 'V1PodList',
+    'services': 'V1ServiceList',
+    'configmaps': 'V1ConfigMapList',
+    'secrets': 'V1SecretList',
+    'serviceaccounts': 'V1ServiceAccountList',
+    'pvcs': 'V1PersistentVolumeClaimList',
+    'pvs': 'V1PersistentVolumeList',
+    'endpoints': 'V1EndpointsList',
+    'endpointslices': 'V1EndpointSliceList',
+    'namespaces': 'V1NamespaceList',
+    'limitranges': 'V1LimitRangeList',
+    'resourcequotas': 'V1ResourceQuotaList',
+    'deployments': 'V1DeploymentList',
+    'statefulsets': 'V1StatefulSetList',
+    'daemonsets': 'V1DaemonSetList',
+    'replicasets': 'V1ReplicaSetList',
+    'cronjobs': 'V1CronJobList',
+    'jobs': 'V1JobList',
+    'ingresses': 'V1IngressList',
+    'networkpolicies': 'V1NetworkPolicyList',
+    'roles': 'V1RoleList',
+    'rolebindings': 'V1RoleBindingList',
+    'clusterroles': 'V1ClusterRoleList',
+    'clusterrolebindings': 'V1ClusterRoleBindingList',
+    'storageclasses': 'V1StorageClassList',
+    'horizontalpodautoscalers': 'V1HorizontalPodAutoscalerList',
+    'poddisruptionbudgets': 'V1PodDisruptionBudgetList',
+}
+
+
+def _dumps(payload):
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(',', ':')).encode()
+
+
+def _hash(i, modulo):
+    """Spread consecutive indexes over range(modulo) without a random generator"""
+    return (i * 2654435761) % modulo
+
+
+def _metadata(name, namespace=None, labels=None, **extra):
+    metadata = {'name': name, 'uid': f"{namespace or '-'}-{name}", 'resourceVersion': '1', 'creationTimestamp': CREATED}
+    if namespace:
+        metadata['namespace'] = namespace
+    if labels:
+        metadata['labels'] = labels
+    metadata.update(extra)
+    return metadata
+
+
+def _ref(kind, name, api_version='apps/v1'):
+    return [{'apiVersion': api_version, 'kind': kind, 'name': name, 'uid': f'{kind}-{name}', 'controller': True}]
+
+
+class SyntheticCluster:
+    """A cluster of N nodes and M pods, with every other kind sized from them.
+
+    Objects are plain API JSON (camelCase, as the API server sends them) and
+    are generated from their index alone, so the same sizes always give the
+    same cluster and any page can be produced without holding the others.
+
+    Pods belong round-robin to W workloads (deployments with their
+    replicasets, statefulsets and daemonsets). Workload w runs in namespace
+    team-<w mod namespaces>, mounts configmap app-<w>-config and secret
+    app-<w>-secret and is selected by service app-<w>, so configmaps,
+    secrets and services beyond W are orphans, as are a share of the RBAC
+    objects, volumes and custom resources.
+    """
+
+    def __init__(self, nodes, pods, workloads=None, services=None, configs=None):
+        self.nodes = max(1, nodes)
+        self.pods = pods
+        self.workloads = workloads or max(1, pods // 10)
+        self.services = services if services is not None else self.workloads
+        self.configs = configs if configs is not None else max(1, pods // 5)
+        self.namespaces = max(4, pods // 500)
+        self.control_planes = min(3, self.nodes)
+        self.statefulsets = self.workloads // 5
+        self.daemonsets = min(self.workloads // 20, 20)
+        self.deployments = self.workloads - self.statefulsets - self.daemonsets
+        self.counts = {
+            'nodes': self.nodes,
+            'pods': self.pods,
+            'deployments': self.deployments,
+            'replicasets': self.deployments,
+            'statefulsets': self.statefulsets,
+            'daemonsets': self.daemonsets,
+            'jobs': self.workloads // 20,
+            'cronjobs': self.workloads // 40,
+            'services': self.services,
+            'endpoints': self.services,
+            'endpointslices': self.services,
+            'ingresses': self.services // 10,
+            'configmaps': self.configs,
+            'secrets': self.configs,
+            'serviceaccounts': self.namespaces + self.workloads // 4,
+            'pvcs': self.statefulsets,
+            'pvs': self.statefulsets + self.statefulsets // 10,
+            'storageclasses': 3,
+            'namespaces': self.namespaces,
+            'limitranges': self.namespaces,
+            'resourcequotas': self.namespaces,
+            'networkpolicies': self.namespaces,
+            'roles': 2 * self.namespaces,
+            'rolebindings': 2 * self.namespaces,
+            'clusterroles': 40,
+            'clusterrolebindings': 40,
+            'horizontalpodautoscalers': self.workloads // 10,
+            'poddisruptionbudgets': self.workloads // 10,
+            'volumesnapshots': self.statefulsets // 2,
+            'volumesnapshotcontents': self.statefulsets // 2,
+            'applications': self.namespaces,
+            'applicationsnapshots': 2 * self.namespaces,
+            'appprotectionplans': self.namespaces,
+            'applicationsnapshotrestores': self.namespaces // 2,
+        }
+        self._builders = {kind: getattr(self, f'_{kind}') for kind in self.counts}
+
+    @property
+    def name(self):
+        return f'{self.nodes}:{self.pods}'
+
+    def item(self, kind, i):
+        """Return object i of a kind as API JSON"""
+        return self._builders[kind](i)
+
+    def items(self, kind):
+        for i in range(self.counts[kind]):
+            yield self.item(kind, i)
+
+    def page(self, kind, limit=None, continue_token=None):
+        """Return one LIST response of a kind as API JSON, paginated like the API server"""
+        start = int(continue_token or 0)
+        end = min(self.counts[kind], start + limit) if limit else self.counts[kind]
+        more = end < self.counts[kind]
+        return {
+            'apiVersion': 'v1',
+            'kind': 'List',
+            'metadata': {'resourceVersion': '1', 'continue': str(end) if more else None},
+            'items': [self.item(kind, i) for i in range(start, end)],
+        }
+
+    def document(self, kind):
+        """Return every object of a kind as one unpaginated LIST response"""
+        return self.page(kind)
+
+    def models(self, kind):
+        """Return every object of a kind as kubernetes model objects (dicts for custom resources)"""
+        list_type = MODEL_LIST_TYPES.get(kind)
+        if list_type is None:
+            return self.document(kind)['items']
+        return ApiClient().deserialize(_Response(_dumps(self.document(kind))), list_type).items
+
+    # Placement helpers
+
+    def _namespace(self, i):
+        return f'team-{i % self.namespaces}'
+
+    def _node_name(self, i):
+        if i < self.control_planes:
+            return f'control-plane-{i}'
+        return f'nkp-worker-pool-{i}'
+
+    def _workload_kind(self, w):
+        if w < self.deployments:
+            return 'Deployment'
+        if w < self.deployments + self.statefulsets:
+            return 'StatefulSet'
+        return 'DaemonSet'
+
+    def _replicaset_name(self, w):
+        return f'app-{w}-{_hash(w, 16 ** 8):08x}'
+
+    def _pod_spec(self, w):
+        spec = {
+            'serviceAccountName': f'app-{w}' if w % 4 == 0 else 'default',
+            'containers': [{
+                'name': 'app',
+                'image': f'registry.example.com/app-{w % 50}:1.{w % 7}',
+                'resources': {'requests': {'cpu': f'{100 + w % 4 * 50}m', 'memory': f'{128 << w % 3}Mi'}},
+                'env': [{'name': 'MODE', 'value': 'production'}],
+            }],
+            'volumes': [],
+        }
+        if w < self.configs:
+            spec['containers'][0]['envFrom'] = [{'configMapRef': {'name': f'app-{w}-config'}}]
+            spec['volumes'].append({'name': 'credentials', 'secret': {'secretName': f'app-{w}-secret'}})
+        if self._workload_kind(w) == 'StatefulSet':
+            spec['volumes'].append({'name': 'data', 'persistentVolumeClaim': {'claimName': f'data-app-{w}-0'}})
+        return spec
+
+    def _workload(self, w, replicas):
+        labels = {'app': f'app-{w}'}
+        return {
+            'metadata': _metadata(f'app-{w}', self._namespace(w), labels),
+            'spec': {
+                'replicas': replicas,
+                'selector': {'matchLabels': labels},
+                'template': {'metadata': {'labels': labels}, 'spec': self._pod_spec(w)},
+            },
+        }
+
+    def _replicas(self, w):
+        return len(range(w, self.pods, self.workloads))
+
+    # One builder per kind
+
+    def _nodes(self, i):
+        role = 'control-plane' if i < self.control_planes else 'worker'
+        return {
+            'metadata': _metadata(self._node_name(i), labels={f'node-role.kubernetes.io/{role}': ''}),
+            'status': {
+                'conditions': [{'type': 'Ready', 'status': 'False' if i % 97 == 96 else 'True'}],
+                'nodeInfo': {
+                    'kubeletVersion': 'v1.29.6', 'osImage': 'Ubuntu 22.04.4 LTS', 'containerRuntimeVersion': 'containerd://1.7.13',
+                    'architecture': 'amd64', 'bootID': f'boot-{i}', 'kernelVersion': '5.15.0', 'kubeProxyVersion': 'v1.29.6',
+                    'machineID': f'machine-{i}', 'operatingSystem': 'linux', 'systemUUID': f'uuid-{i}',
+                },
+                'capacity': {'cpu': '16', 'memory': '65842964Ki', 'pods': '110'},
+                'addresses': [{'type': 'InternalIP', 'address': f'10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}'},
+                              {'type': 'Hostname', 'address': self._node_name(i)}],
+            },
+        }
+
+    def _pods(self, p):
+        w = p % self.workloads
+        ordinal = p // self.workloads
+        kind = self._workload_kind(w)
+        if kind == 'Deployment':
+            name, owner = f'{self._replicaset_name(w)}-{_hash(p, 16 ** 5):05x}', _ref('ReplicaSet', self._replicaset_name(w))
+        elif kind == 'StatefulSet':
+            name, owner = f'app-{w}-{ordinal}', _ref('StatefulSet', f'app-{w}')
+        else:
+            name, owner = f'app-{w}-{_hash(p, 16 ** 5):05x}', _ref('DaemonSet', f'app-{w}')
+        workers = self.nodes - self.control_planes
+        node = self._node_name(self.control_planes + p % workers if workers else p % self.nodes)
+        phase = 'Pending' if p % 50 == 49 else 'Succeeded' if p % 97 == 0 else 'Failed' if p % 89 == 0 else 'Running'
+        spec = self._pod_spec(w)
+        if phase != 'Pending':
+            spec['nodeName'] = node
+        return {
+            'metadata': _metadata(name, self._namespace(w), {'app': f'app-{w}'}, ownerReferences=owner),
+            'spec': spec,
+            'status': {
+                'phase': phase,
+                'podIP': f'192.{p >> 16 & 255}.{p >> 8 & 255}.{p & 255}' if phase != 'Pending' else None,
+                'containerStatuses': [{'name': 'app', 'ready': phase == 'Running', 'restartCount': p % 3,
+                                       'image': spec['containers'][0]['image'], 'imageID': f'sha256:{p:064x}'}],
+            },
+        }
+
+    def _deployments(self, w):
+        deployment = self._workload(w, self._replicas(w))
+        deployment['status'] = {'replicas': self._replicas(w), 'readyReplicas': self._replicas(w), 'availableReplicas': self._replicas(w)}
+        return deployment
+
+    def _replicasets(self, w):
+        replicaset = self._workload(w, self._replicas(w))
+        replicaset['metadata'] = _metadata(self._replicaset_name(w), self._namespace(w), {'app': f'app-{w}'},
+                                           ownerReferences=_ref('Deployment', f'app-{w}'))
+        replicaset['status'] = {'replicas': self._replicas(w), 'readyReplicas': self._replicas(w)}
+        return replicaset
+
+    def _statefulsets(self, i):
+        w = self.deployments + i
+        statefulset = self._workload(w, self._replicas(w))
+        statefulset['spec']['serviceName'] = f'app-{w}'
+        statefulset['status'] = {'replicas': self._replicas(w), 'readyReplicas': self._replicas(w)}
+        return statefulset
+
+    def _daemonsets(self, i):
+        w = self.deployments + self.statefulsets + i
+        daemonset = self._workload(w, None)
+        del daemonset['spec']['replicas']
+        daemonset['status'] = {'desiredNumberScheduled': self._replicas(w), 'currentNumberScheduled': self._replicas(w),
+                               'numberReady': self._replicas(w), 'numberMisscheduled': 0}
+        return daemonset
+
+    def _jobs(self, i):
+        return {
+            'metadata': _metadata(f'batch-{i}', self._namespace(i)),
+            'spec': {'completions': 1, 'template': {'spec': {'containers': [{'name': 'batch', 'image': 'busybox'}]}}},
+            'status': {'succeeded': 1} if i % 3 else {'active': 1},
+        }
+
+    def _cronjobs(self, i):
+        return {
+            'metadata': _metadata(f'cron-{i}', self._namespace(i)),
+            'spec': {'schedule': f'{i % 60} * * * *', 'suspend': i % 5 == 0,
+                     'jobTemplate': {'spec': {'template': {'spec': {'containers': [{'name': 'cron', 'image': 'busybox'}]}}}}},
+            'status': {'lastScheduleTime': CREATED},
+        }
+
+    def _services(self, s):
+        service_type = 'NodePort' if s % 10 == 0 else 'LoadBalancer' if s % 25 == 1 else 'ClusterIP'
+        port = {'name': 'http', 'port': 80, 'targetPort': 8080, 'protocol': 'TCP'}
+        if service_type != 'ClusterIP':
+            port['nodePort'] = 30000 + s % 2768
+        status = {'loadBalancer': {}}
+        if service_type == 'LoadBalancer':
+            status['loadBalancer']['ingress'] = [{'ip': f'172.16.{s >> 8 & 255}.{s & 255}'}]
+        return {
+            'metadata': _metadata(f'app-{s}', self._namespace(s)),
+            'spec': {'type': service_type, 'clusterIP': f'10.96.{s >> 8 & 255}.{s & 255}',
+                     'selector': {'app': f'app-{s}'}, 'ports': [port]},
+            'status': status,
+        }
+
+    def _endpoints(self, s):
+        addresses = [{'ip': f'192.0.{s & 255}.{k}'} for k in range(min(3, self._replicas(s)) if s < self.workloads else 0)]
+        return {
+            'metadata': _metadata(f'app-{s}', self._namespace(s)),
+            'subsets': [{'addresses': addresses, 'ports': [{'name': 'http', 'port': 8080, 'protocol': 'TCP'}]}] if addresses else None,
+        }
+
+    def _endpointslices(self, s):
+        ready = s < self.workloads
+        return {
+            'metadata': _metadata(f'app-{s}-{_hash(s, 16 ** 5):05x}', self._namespace(s), {'kubernetes.io/service-name': f'app-{s}'}),
+            'addressType': 'IPv4',
+            'endpoints': [{'addresses': [f'192.0.{s & 255}.1'], 'conditions': {'ready': ready}}],
+        }
+
+    def _ingresses(self, i):
+        return {
+            'metadata': _metadata(f'app-{i * 10}', self._namespace(i * 10)),
+            'spec': {'ingressClassName': 'nginx', 'rules': [{'host': f'app-{i * 10}.example.com', 'http': {'paths': [{
+                'path': '/', 'pathType': 'Prefix', 'backend': {'service': {'name': f'app-{i * 10}', 'port': {'number': 80}}}}]}}]},
+        }
+
+    def _configmaps(self, j):
+        name = f'app-{j}-config' if j < self.workloads else f'unused-{j}-config'
+        return {'metadata': _metadata(name, self._namespace(j)), 'data': {'settings.yaml': f'replicas: {j % 5}\n', 'LOG_LEVEL': 'info'}}
+
+    def _secrets(self, j):
+        name = f'app-{j}-secret' if j < self.workloads else f'unused-{j}-secret'
+        return {'metadata': _metadata(name, self._namespace(j)), 'type': 'Opaque', 'data': {'password': 'c2VjcmV0'}}
+
+    def _serviceaccounts(self, i):
+        if i < self.namespaces:
+            return {'metadata': _metadata('default', self._namespace(i))}
+        w = (i - self.namespaces) * 4
+        return {'metadata': _metadata(f'app-{w}', self._namespace(w))}
+
+    def _pvcs(self, i):
+        w = self.deployments + i
+        return {
+            'metadata': _metadata(f'data-app-{w}-0', self._namespace(w)),
+            'spec': {'accessModes': ['ReadWriteOnce'], 'storageClassName': 'nutanix-volume', 'volumeName': f'pv-{i}',
+                     'resources': {'requests': {'storage': '10Gi'}}},
+            'status': {'phase': 'Bound', 'capacity': {'storage': '10Gi'}},
+        }
+
+    def _pvs(self, i):
+        bound = i < self.statefulsets
+        w = self.deployments + i
+        spec = {'capacity': {'storage': '10Gi'}, 'accessModes': ['ReadWriteOnce'],
+                'persistentVolumeReclaimPolicy': 'Delete', 'storageClassName': 'nutanix-volume'}
+        if bound:
+            spec['claimRef'] = {'kind': 'PersistentVolumeClaim', 'name': f'data-app-{w}-0', 'namespace': self._namespace(w)}
+        return {'metadata': _metadata(f'pv-{i}'), 'spec': spec, 'status': {'phase': 'Bound' if bound else 'Available'}}
+
+    def _storageclasses(self, i):
+        return {'metadata': _metadata(['nutanix-volume', 'nutanix-files', 'local-path'][i]), 'provisioner': 'csi.nutanix.com',
+                'reclaimPolicy': 'Delete', 'volumeBindingMode': 'WaitForFirstConsumer'}
+
+    def _namespaces(self, i):
+        return {'metadata': _metadata(self._namespace(i), labels={'kubernetes.io/metadata.name': self._namespace(i)}),
+                'status': {'phase': 'Active'}}
+
+    def _limitranges(self, i):
+        return {'metadata': _metadata('defaults', self._namespace(i)),
+                'spec': {'limits': [{'type': 'Container', 'default': {'cpu': '500m', 'memory': '512Mi'}}]}}
+
+    def _resourcequotas(self, i):
+        return {'metadata': _metadata('quota', self._namespace(i)),
+                'spec': {'hard': {'pods': '1000', 'requests.cpu': '200'}}, 'status': {'used': {'pods': '10'}}}
+
+    def _networkpolicies(self, i):
+        return {'metadata': _metadata('default-deny', self._namespace(i)),
+                'spec': {'podSelector': {}, 'policyTypes': ['Ingress'], 'ingress': [{'from': [{'podSelector': {}}]}]}}
+
+    def _roles(self, i):
+        return {'metadata': _metadata(f'role-{i // self.namespaces}', self._namespace(i)),
+                'rules': [{'apiGroups': [''], 'resources': ['configmaps'], 'verbs': ['get', 'list']}]}
+
+    def _rolebindings(self, i):
+        # Every other binding points at a role that does not exist
+        role = f'role-{i // self.namespaces}' if i % 4 < 2 else f'missing-{i}'
+        return {
+            'metadata': _metadata(f'binding-{i // self.namespaces}', self._namespace(i)),
+            'roleRef': {'apiGroup': 'rbac.authorization.k8s.io', 'kind': 'Role', 'name': role},
+            'subjects': [{'kind': 'ServiceAccount', 'name': 'default', 'namespace': self._namespace(i)}],
+        }
+
+    def _clusterroles(self, i):
+        return {'metadata': _metadata(f'cluster-role-{i}'), 'rules': [{'apiGroups': ['*'], 'resources': ['pods'], 'verbs': ['get']}]}
+
+    def _clusterrolebindings(self, i):
+        return {
+            'metadata': _metadata(f'cluster-binding-{i}'),
+            'roleRef': {'apiGroup': 'rbac.authorization.k8s.io', 'kind': 'ClusterRole', 'name': f'cluster-role-{i * 2}'},
+            'subjects': [{'kind': 'ServiceAccount', 'name': 'default', 'namespace': self._namespace(i)}],
+        }
+
+    def _horizontalpodautoscalers(self, i):
+        w = i * 10
+        return {
+            'metadata': _metadata(f'app-{w}', self._namespace(w)),
+            'spec': {'scaleTargetRef': {'apiVersion': 'apps/v1', 'kind': self._workload_kind(w), 'name': f'app-{w}'},
+                     'minReplicas': 1, 'maxReplicas': 10, 'targetCPUUtilizationPercentage': 80},
+            'status': {'currentReplicas': self._replicas(w), 'desiredReplicas': self._replicas(w)},
+        }
+
+    def _poddisruptionbudgets(self, i):
+        w = i * 10 + 5
+        return {
+            'metadata': _metadata(f'app-{w}', self._namespace(w)),
+            'spec': {'minAvailable': 1, 'selector': {'matchLabels': {'app': f'app-{w}'}}},
+            'status': {'currentHealthy': 1, 'desiredHealthy': 1, 'disruptionsAllowed': 0, 'expectedPods': 1},
+        }
+
+    def _custom(self, kind, name, namespace, api_version, spec=None, status=None):
+        resource = {'apiVersion': api_version, 'kind': kind, 'metadata': _metadata(name, namespace)}
+        if spec is not None:
+            resource['spec'] = spec
+        if status is not None:
+            resource['status'] = status
+        return resource
+
+    def _volumesnapshots(self, i):
+        w = self.deployments + i * 2
+        return self._custom('VolumeSnapshot', f'data-app-{w}-0-snapshot', self._namespace(w), 'snapshot.storage.k8s.io/v1',
+                            {'source': {'persistentVolumeClaimName': f'data-app-{w}-0'}}, {'readyToUse': True})
+
+    def _volumesnapshotcontents(self, i):
+        w = self.deployments + i * 2
+        return self._custom('VolumeSnapshotContent', f'snapcontent-{i}', None, 'snapshot.storage.k8s.io/v1',
+                            {'volumeSnapshotRef': {'name': f'data-app-{w}-0-snapshot', 'namespace': self._namespace(w)},
+                             'deletionPolicy': 'Delete'}, {'readyToUse': True})
+
+    def _applications(self, i):
+        return self._custom('Application', f'app-{i}', self._namespace(i), 'dataservices.nutanix.com/v1alpha1',
+                            {'applicationSelector': {}}, {'conditions': [{'type': 'Active', 'status': 'True'}]})
+
+    def _applicationsnapshots(self, i):
+        return self._custom('ApplicationSnapshot', f'app-{i // 2}-snapshot-{i % 2}', self._namespace(i // 2),
+                            'dataservices.nutanix.com/v1alpha1', {'source': {'applicationRef': {'name': f'app-{i // 2}'}}},
+                            {'readyToUse': i % 2 == 0})
+
+    def _appprotectionplans(self, i):
+        return self._custom('AppProtectionPlan', f'plan-{i}', self._namespace(i), 'dataservices.nutanix.com/v1alpha1',
+                            {'applicationName': f'app-{i}', 'retentionPolicy': {'retentionCount': 7}})
+
+    def _applicationsnapshotrestores(self, i):
+        return self._custom('ApplicationSnapshotRestore', f'restore-{i}', self._namespace(i), 'dataservices.nutanix.com/v1alpha1',
+                            {'applicationSnapshotName': f'app-{i}-snapshot-0'}, {'completed': True, 'conditions': []})
+
+
+class _Response:
+    """The parts of a urllib3 response that cluster_api and ApiClient.deserialize read"""
+
+    status = 200
+
+    def __init__(self, data):
+        self.data = data
+
+    def getheaders(self):
+        return {}
+
+    def release_conn(self):
+        pass
+
+
+class SyntheticAPI:
+    """Serves a SyntheticCluster through list functions shaped like the kubernetes client's.
+
+    A list function returns kubernetes models (or dicts for custom
+    resources) by default, and the undecoded response when called with
+    _preload_content=False, as the generated client does. Rendering pages
+    stands in for the API server and network: its duration accumulates in
+    serve_seconds so callers can subtract it from client-side timings.
+    """
+
+    def __init__(self, cluster):
+        self.cluster = cluster
+        self.serve_seconds = 0.0
+        self.calls = 0
+        self._api_client = ApiClient()
+        self._lock = threading.Lock()
+
+    def list_function(self, kind):
+        def list_objects(limit=None, _continue=None, _preload_content=True, **kwargs):
+            started = time.perf_counter()
+            body = _dumps(self.cluster.page(kind, limit, _continue))
+            with self._lock:
+                self.serve_seconds += time.perf_counter() - started
+                self.calls += 1
+            response = _Response(body)
+            if not _preload_content:
+                return response
+            list_type = MODEL_LIST_TYPES.get(kind)
+            if list_type is None:
+                return json.loads(body)
+            return self._api_client.deserialize(response, list_type)
+        list_objects.__name__ = f'list_{kind}'
+        return list_objects
+
+    @contextmanager
+    def serve(self):
+        """Route cluster_api's LIST calls for every kind to this cluster"""
+        import cluster_api
+
+        saved = dict(cluster_api.RESOURCE_KINDS)
+        cluster_api.RESOURCE_KINDS.update({kind: self.list_function(kind) for kind in saved})
+        try:
+            yield self
+        finally:
+            cluster_api.RESOURCE_KINDS.update(saved)
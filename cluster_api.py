@@ -3,10 +3,25 @@ Kubernetes cluster data retrieval functions
 """
 import os
 import json
+import contextvars
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 import pytz
-from kubernetes import client, config
+from kubernetes import client, config, watch
+from kubernetes.client.exceptions import ApiException
+from config import Config
+from app.utils.indexes import LabelIndex, compile_selector
+from app.utils.cluster_records import LabelSets, Node, NodePod, Service, ServicePort, Workload, WorkloadPod, intern
+from app.utils.metrics import PhaseTimer, DECODE_SECONDS, WATCH_EVENTS, observe_api_request
+from app.utils.tracing import record_span
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:  # pragma: no cover - orjson is optional
+    _json_loads = json.loads
 
 # Load Kubernetes config
 try:
@@ -22,61 +37,630 @@ except Exception as e:
 
 v1 = client.CoreV1Api()
 apps_v1 = client.AppsV1Api()
+batch_v1 = client.BatchV1Api()
+networking_v1 = client.NetworkingV1Api()
+discovery_v1 = client.DiscoveryV1Api()
+rbac_v1 = client.RbacAuthorizationV1Api()
+storage_v1 = client.StorageV1Api()
+autoscaling_v1 = client.AutoscalingV1Api()
+policy_v1 = client.PolicyV1Api()
+custom_api = client.CustomObjectsApi()
+
+
+def _custom_object_lister(group, version, plural):
+    """Build a cluster-wide list function for a custom resource"""
+    def list_custom_objects(**kwargs):
+        return custom_api.list_cluster_custom_object(group, version, plural, **kwargs)
+    return list_custom_objects
+
+
+# Cluster-wide list calls for every resource kind the dashboard reads
+RESOURCE_KINDS = {
+    'nodes': v1.list_node,
+    'pods': v1.list_pod_for_all_namespaces,
+    'services': v1.list_service_for_all_namespaces,
+    'configmaps': v1.list_config_map_for_all_namespaces,
+    'secrets': v1.list_secret_for_all_namespaces,
+    'serviceaccounts': v1.list_service_account_for_all_namespaces,
+    'pvcs': v1.list_persistent_volume_claim_for_all_namespaces,
+    'pvs': v1.list_persistent_volume,
+    'endpoints': v1.list_endpoints_for_all_namespaces,
+    'endpointslices': discovery_v1.list_endpoint_slice_for_all_namespaces,
+    'namespaces': v1.list_namespace,
+    'limitranges': v1.list_limit_range_for_all_namespaces,
+    'resourcequotas': v1.list_resource_quota_for_all_namespaces,
+    'deployments': apps_v1.list_deployment_for_all_namespaces,
+    'statefulsets': apps_v1.list_stateful_set_for_all_namespaces,
+    'daemonsets': apps_v1.list_daemon_set_for_all_namespaces,
+    'replicasets': apps_v1.list_replica_set_for_all_namespaces,
+    'cronjobs': batch_v1.list_cron_job_for_all_namespaces,
+    'jobs': batch_v1.list_job_for_all_namespaces,
+    'ingresses': networking_v1.list_ingress_for_all_namespaces,
+    'networkpolicies': networking_v1.list_network_policy_for_all_namespaces,
+    'roles': rbac_v1.list_role_for_all_namespaces,
+    'rolebindings': rbac_v1.list_role_binding_for_all_namespaces,
+    'clusterroles': rbac_v1.list_cluster_role,
+    'clusterrolebindings': rbac_v1.list_cluster_role_binding,
+    'storageclasses': storage_v1.list_storage_class,
+    'horizontalpodautoscalers': autoscaling_v1.list_horizontal_pod_autoscaler_for_all_namespaces,
+    'poddisruptionbudgets': policy_v1.list_pod_disruption_budget_for_all_namespaces,
+    'volumesnapshots': _custom_object_lister('snapshot.storage.k8s.io', 'v1', 'volumesnapshots'),
+    'volumesnapshotcontents': _custom_object_lister('snapshot.storage.k8s.io', 'v1', 'volumesnapshotcontents'),
+    'applications': _custom_object_lister('dataservices.nutanix.com', 'v1alpha1', 'applications'),
+    'applicationsnapshots': _custom_object_lister('dataservices.nutanix.com', 'v1alpha1', 'applicationsnapshots'),
+    'appprotectionplans': _custom_object_lister('dataservices.nutanix.com', 'v1alpha1', 'appprotectionplans'),
+    'applicationsnapshotrestores': _custom_object_lister('dataservices.nutanix.com', 'v1alpha1', 'applicationsnapshotrestores'),
+}
+
+
+def _result_items(result):
+    """Return the items of a list response (model or custom object dict)"""
+    if isinstance(result, dict):
+        return result.get('items', [])
+    return result.items or []
+
+
+def _result_resource_version(result):
+    """Return the collection resourceVersion of a list response"""
+    if isinstance(result, dict):
+        return result.get('metadata', {}).get('resourceVersion')
+    return result.metadata.resource_version
+
+
+def _result_continue(result):
+    """Return the continue token of a list response, if more pages follow"""
+    if isinstance(result, dict):
+        return result.get('metadata', {}).get('continue')
+    return result.metadata._continue
+
+
+def _object_key(obj):
+    """Return the (namespace, name) store key of a model or custom object dict"""
+    if isinstance(obj, dict):
+        metadata = obj.get('metadata', {})
+        return (metadata.get('namespace'), metadata.get('name'))
+    return (obj.metadata.namespace, obj.metadata.name)
+
+
+def _object_resource_version(obj):
+    """Return the resourceVersion of a model or custom object dict"""
+    if isinstance(obj, dict):
+        return obj.get('metadata', {}).get('resourceVersion')
+    return obj.metadata.resource_version
+
+
+# Kinds whose payload values are never displayed - only the number of keys is
+_PAYLOAD_KINDS = {'configmaps', 'secrets'}
+_LAST_APPLIED_ANNOTATION = 'kubectl.kubernetes.io/last-applied-configuration'
+
+
+class RawObject:
+    """Lightweight stand-in for a kubernetes model, built from raw JSON.
+
+    Only projected fields are set. Any other model attribute reads as None,
+    the same as an unset field on the generated model classes, so the
+    formatting code can't tell the two apart.
+    """
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return None
+
+
+_METADATA_FIELDS = {
+    'name': True, 'namespace': True, 'labels': True, 'annotations': True,
+    'owner_references': True, 'creation_timestamp': True, 'deletion_timestamp': True,
+    'finalizers': True, 'resource_version': True
+}
+_WORKLOAD_FIELDS = {
+    'metadata': _METADATA_FIELDS,
+    'spec': {'replicas': True, 'selector': True, 'template': {'spec': {'image_pull_secrets': True}}},
+    'status': True
+}
+
+# Model type and the fields the formatters read, per kind (python attribute names)
+_RAW_PROJECTIONS = {
+    'nodes': ('V1Node', {
+        'metadata': _METADATA_FIELDS,
+        'status': {'conditions': True, 'node_info': True, 'capacity': True, 'addresses': True}
+    }),
+    'pods': ('V1Pod', {
+        'metadata': _METADATA_FIELDS,
+        'spec': {
+            'node_name': True, 'service_account_name': True, 'image_pull_secrets': True, 'volumes': True,
+            'containers': {'name': True, 'resources': True, 'env': True, 'env_from': True},
+            'init_containers': {'name': True, 'env': True, 'env_from': True}
+        },
+        'status': {'phase': True, 'pod_ip': True, 'container_statuses': {'ready': True, 'restart_count': True}}
+    }),
+    'services': ('V1Service', {
+        'metadata': _METADATA_FIELDS,
+        'spec': {'type': True, 'cluster_ip': True, 'external_i_ps': True, 'ports': True, 'selector': True},
+        'status': True
+    }),
+    'configmaps': ('V1ConfigMap', {'metadata': _METADATA_FIELDS, 'data': True}),
+    'secrets': ('V1Secret', {'metadata': _METADATA_FIELDS, 'type': True, 'data': True}),
+    'serviceaccounts': ('V1ServiceAccount', {'metadata': _METADATA_FIELDS, 'secrets': True, 'image_pull_secrets': True}),
+    'pvcs': ('V1PersistentVolumeClaim', {
+        'metadata': _METADATA_FIELDS,
+        'spec': {'volume_name': True, 'storage_class_name': True},
+        'status': {'phase': True, 'capacity': True}
+    }),
+    'pvs': ('V1PersistentVolume', {
+        'metadata': _METADATA_FIELDS,
+        'spec': {'capacity': True, 'access_modes': True, 'persistent_volume_reclaim_policy': True,
+                 'claim_ref': True, 'storage_class_name': True},
+        'status': {'phase': True}
+    }),
+    'endpoints': ('V1Endpoints', {'metadata': _METADATA_FIELDS, 'subsets': True}),
+    'endpointslices': ('V1EndpointSlice', {'metadata': _METADATA_FIELDS, 'endpoints': {'addresses': True, 'conditions': True}}),
+    'namespaces': ('V1Namespace', {'metadata': _METADATA_FIELDS, 'status': True}),
+    'limitranges': ('V1LimitRange', {'metadata': _METADATA_FIELDS, 'spec': True}),
+    'resourcequotas': ('V1ResourceQuota', {'metadata': _METADATA_FIELDS, 'spec': {'hard': True}}),
+    'deployments': ('V1Deployment', _WORKLOAD_FIELDS),
+    'statefulsets': ('V1StatefulSet', _WORKLOAD_FIELDS),
+    'daemonsets': ('V1DaemonSet', {
+        'metadata': _METADATA_FIELDS,
+        'spec': {'selector': True, 'template': {'spec': {'image_pull_secrets': True}}},
+        'status': True
+    }),
+    'replicasets': ('V1ReplicaSet', _WORKLOAD_FIELDS),
+    'cronjobs': ('V1CronJob', {
+        'metadata': _METADATA_FIELDS,
+        'spec': {'schedule': True, 'suspend': True},
+        'status': {'last_schedule_time': True}
+    }),
+    'jobs': ('V1Job', {
+        'metadata': _METADATA_FIELDS,
+        'spec': {'completions': True},
+        'status': {'succeeded': True, 'failed': True}
+    }),
+    'ingresses': ('V1Ingress', {
+        'metadata': _METADATA_FIELDS,
+        'spec': {'ingress_class_name': True, 'rules': {'host': True}}
+    }),
+    'networkpolicies': ('V1NetworkPolicy', {
+        'metadata': _METADATA_FIELDS,
+        'spec': {'pod_selector': True, 'ingress': True, 'egress': True}
+    }),
+    'roles': ('V1Role', {'metadata': _METADATA_FIELDS, 'rules': True}),
+    'rolebindings': ('V1RoleBinding', {'metadata': _METADATA_FIELDS, 'role_ref': True, 'subjects': True}),
+    'clusterroles': ('V1ClusterRole', {'metadata': _METADATA_FIELDS, 'rules': True, 'aggregation_rule': True}),
+    'clusterrolebindings': ('V1ClusterRoleBinding', {'metadata': _METADATA_FIELDS, 'role_ref': True, 'subjects': True}),
+    'storageclasses': ('V1StorageClass', {
+        'metadata': _METADATA_FIELDS, 'provisioner': True, 'reclaim_policy': True, 'volume_binding_mode': True
+    }),
+    'horizontalpodautoscalers': ('V1HorizontalPodAutoscaler', {'metadata': _METADATA_FIELDS, 'spec': True, 'status': True}),
+    'poddisruptionbudgets': ('V1PodDisruptionBudget', {'metadata': _METADATA_FIELDS, 'spec': True, 'status': True}),
+}
+
+_PASSTHROUGH_TYPES = {'str', 'int', 'float', 'bool', 'object', 'date'}
+_model_field_cache = {}
+
+
+def _model_fields(type_name):
+    """Return (openapi_types, json key -> attribute) for a kubernetes model class"""
+    fields = _model_field_cache.get(type_name)
+    if fields is None:
+        model = getattr(client.models, type_name)
+        json_to_attr = {key: attr for attr, key in model.attribute_map.items()}
+        fields = (model.openapi_types, model.attribute_map, json_to_attr)
+        _model_field_cache[type_name] = fields
+    return fields
+
+
+def _parse_datetime(value):
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        from dateutil.parser import isoparse
+        return isoparse(value)
+
+
+def _project(value, type_name, fields=True):
+    """Convert raw JSON into RawObjects shaped like the kubernetes model type.
+
+    fields is True to keep the whole subtree, or a dict of attribute names
+    to project (each mapping to True or a nested dict).
+    """
+    if value is None:
+        return None
+    if type_name.startswith('list['):
+        item_type = type_name[5:-1]
+        return [_project(item, item_type, fields) for item in value]
+    if type_name.startswith('dict('):
+        value_type = type_name[type_name.index(',') + 1:-1].strip()
+        if value_type in _PASSTHROUGH_TYPES:
+            return value
+        return {key: _project(item, value_type, fields) for key, item in value.items()}
+    if type_name == 'datetime':
+        return _parse_datetime(value)
+    if type_name in _PASSTHROUGH_TYPES:
+        return value
+    openapi_types, attribute_map, json_to_attr = _model_fields(type_name)
+    obj = RawObject()
+    attrs = obj.__dict__
+    if fields is True:
+        for key, item in value.items():
+            attr = json_to_attr.get(key)
+            if attr is not None and item is not None:
+                attrs[attr] = _project(item, openapi_types[attr])
+    else:
+        for attr, sub_fields in fields.items():
+            item = value.get(attribute_map[attr])
+            if item is not None:
+                attrs[attr] = _project(item, openapi_types[attr], sub_fields)
+    return obj
+
+
+def _decode_object(kind, obj):
+    """Turn a listed or watched object into the form the stores retain"""
+    if isinstance(obj, dict) and kind in _RAW_PROJECTIONS:
+        type_name, fields = _RAW_PROJECTIONS[kind]
+        obj = _project(obj, type_name, fields)
+    return _prune_object(kind, obj)
+
+
+def _prune_object(kind, obj):
+    """Drop bulky fields the dashboard never reads before an object is retained"""
+    if isinstance(obj, dict):
+        metadata = obj.get('metadata', {})
+        metadata.pop('managedFields', None)
+        annotations = metadata.get('annotations')
+        if annotations:
+            annotations.pop(_LAST_APPLIED_ANNOTATION, None)
+        return obj
+    metadata = obj.metadata
+    if metadata is not None:
+        metadata.managed_fields = None
+        if metadata.annotations:
+            metadata.annotations.pop(_LAST_APPLIED_ANNOTATION, None)
+    if kind in _PAYLOAD_KINDS:
+        if obj.data:
+            obj.data = dict.fromkeys(obj.data)
+        if kind == 'configmaps':
+            obj.binary_data = None
+    return obj
+
+
+def _list_raw(list_func, kind=None, **kwargs):
+    """Call a LIST function without model deserialization and decode the JSON body"""
+    started = time.perf_counter()
+    response = list_func(_preload_content=False, **kwargs)
+    try:
+        body = response.data
+    finally:
+        response.release_conn()
+    fetched = time.perf_counter()
+    result = _json_loads(body)
+    decoded = time.perf_counter()
+    DECODE_SECONDS.observe(decoded - fetched)
+    observe_api_request('LIST', kind, fetched - started, len(result.get('items') or []), len(body), started=started)
+    record_span(f'k8s.decode.{kind or "unknown"}', fetched, decoded)
+    return result
+
+
+def iter_pages(list_func, page_size=None, raw=False, kind=None, **kwargs):
+    """Yield the responses of a LIST call one page at a time using limit/continue.
+
+    With raw=True each page is the decoded JSON dict rather than a model.
+    kind labels the request metrics.
+    """
+    page_size = page_size or Config.LIST_PAGE_SIZE
+    continue_token = None
+    while True:
+        if raw:
+            result = _list_raw(list_func, kind, limit=page_size, _continue=continue_token, **kwargs)
+        else:
+            started = time.perf_counter()
+            result = list_func(limit=page_size, _continue=continue_token, **kwargs)
+            # The client deserializes into models before returning, so that is included
+            observe_api_request('LIST', kind, time.perf_counter() - started, len(_result_items(result)), started=started)
+        yield result
+        continue_token = _result_continue(result)
+        if not continue_token:
+            break
+
+
+def iter_objects(kind, page_size=None):
+    """Yield every object of a kind straight from the API server, page by page"""
+    for page in iter_pages(RESOURCE_KINDS[kind], page_size, raw=Config.RAW_JSON_FETCH, kind=kind):
+        for obj in _result_items(page):
+            yield _decode_object(kind, obj)
+
+
+_change_listeners = []
+
+
+def add_change_listener(callback):
+    """Call callback(kind) whenever an informer store is relisted or receives a watch event"""
+    _change_listeners.append(callback)
+
+
+def _notify_change(kind):
+    for callback in list(_change_listeners):
+        try:
+            callback(kind)
+        except Exception as e:
+            print(f"Change listener failed for {kind}: {e}")
+
+
+class Informer:
+    """Long-lived list+watch cache for one resource kind.
+
+    The informer lists the kind once, then follows a watch from the returned
+    resourceVersion so the in-memory store stays current. When the watch
+    expires (410 Gone) the kind is relisted and the store is replaced.
+    An informer whose store has not been read for INFORMER_IDLE_SECONDS
+    stops after its current watch; the next read starts a new one.
+    """
+
+    def __init__(self, kind, list_func):
+        self.kind = kind
+        self.list_func = list_func
+        self.resource_version = None
+        self.last_error = None
+        self._store = {}
+        self._lock = threading.Lock()
+        self._synced = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._last_read = time.monotonic()
+
+    def start(self):
+        """Start the background list+watch thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"informer-{self.kind}", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Ask the background thread to stop after its current watch"""
+        self._stopped.set()
+
+    def wait_for_sync(self, timeout=None):
+        """Block until the initial list has been stored"""
+        return self._synced.wait(timeout)
+
+    @property
+    def synced(self):
+        return self._synced.is_set()
+
+    def list(self):
+        """Return a snapshot of every object currently in the store"""
+        self._last_read = time.monotonic()
+        with self._lock:
+            return list(self._store.values())
+
+    @property
+    def stopped(self):
+        return self._stopped.is_set()
+
+    def _run(self):
+        backoff = 1
+        while not self._stopped.is_set():
+            if time.monotonic() - self._last_read > Config.INFORMER_IDLE_SECONDS:
+                print(f"Informer {self.kind}: not read for {Config.INFORMER_IDLE_SECONDS}s, stopping")
+                self.stop()
+                break
+            try:
+                if self.resource_version is None:
+                    self._relist()
+                started = time.monotonic()
+                self._watch()
+                if time.monotonic() - started < 1:
+                    # Watch closed immediately - don't hammer the API server
+                    self._stopped.wait(1)
+                backoff = 1
+            except ApiException as e:
+                if e.status == 410:
+                    print(f"Informer {self.kind}: resourceVersion expired, relisting")
+                    self.resource_version = None
+                    continue
+                if e.status in (403, 404):
+                    # Kind is not served or not permitted - publish an empty store and retry rarely
+                    self.last_error = f"{e.status} {e.reason}"
+                    with self._lock:
+                        self._store = {}
+                    self._synced.set()
+                    self._stopped.wait(Config.INFORMER_RETRY_SECONDS)
+                    continue
+                self.last_error = str(e)
+                print(f"Informer {self.kind}: API error: {e}")
+                self._stopped.wait(backoff)
+                backoff = min(backoff * 2, 60)
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Informer {self.kind}: error: {e}")
+                self._stopped.wait(backoff)
+                backoff = min(backoff * 2, 60)
+
+    def _relist(self):
+        store = {}
+        resource_version = None
+        for page in iter_pages(self.list_func, raw=Config.RAW_JSON_FETCH, kind=self.kind):
+            for obj in _result_items(page):
+                store[_object_key(obj)] = _decode_object(self.kind, obj)
+            resource_version = _result_resource_version(page)
+        with self._lock:
+            self._store = store
+        self.resource_version = resource_version
+        self.last_error = None
+        self._synced.set()
+        _notify_change(self.kind)
+
+    def _watch(self):
+        w = watch.Watch()
+        list_func = self.list_func
+        if Config.RAW_JSON_FETCH:
+            # Watch only deserializes into models when it can find the return
+            # type in the function's docstring - hide it to get raw dicts
+            def list_func(**kwargs):
+                return self.list_func(**kwargs)
+        stream = w.stream(
+            list_func,
+            resource_version=self.resource_version,
+            timeout_seconds=Config.WATCH_TIMEOUT_SECONDS,
+            allow_watch_bookmarks=True
+        )
+        for event in stream:
+            if self._stopped.is_set():
+                w.stop()
+                break
+            event_type = event['type']
+            obj = event['object']
+            WATCH_EVENTS.labels(self.kind, event_type).inc()
+            if event_type == 'BOOKMARK':
+                self.resource_version = event['raw_object']['metadata']['resourceVersion']
+                continue
+            obj = _decode_object(self.kind, obj)
+            key = _object_key(obj)
+            with self._lock:
+                if event_type == 'DELETED':
+                    self._store.pop(key, None)
+                else:
+                    self._store[key] = obj
+            self.resource_version = _object_resource_version(obj)
+            _notify_change(self.kind)
+
+
+_informers = {}
+_informers_lock = threading.Lock()
+
+
+def get_informer(kind):
+    """Return the running informer for a kind, starting it on first use"""
+    with _informers_lock:
+        informer = _informers.get(kind)
+        if informer is None or informer.stopped:
+            informer = Informer(kind, RESOURCE_KINDS[kind])
+            _informers[kind] = informer
+            informer.start()
+    return informer
+
+
+def iter_kind(kind):
+    """Iterate all objects of a kind from the informer store, or page by page from the API server"""
+    if Config.INFORMERS_ENABLED and kind in Config.INFORMER_KINDS:
+        informer = get_informer(kind)
+        if informer.wait_for_sync(Config.INFORMER_SYNC_TIMEOUT):
+            return iter(informer.list())
+        print(f"Informer {kind} not synced after {Config.INFORMER_SYNC_TIMEOUT}s, listing directly")
+    return iter_objects(kind)
+
+
+def list_kind(kind):
+    """Return all objects of a kind, served from the informer store when possible"""
+    return list(iter_kind(kind))
+
+
+def fetch_kinds(kinds):
+    """List several kinds concurrently on a bounded thread pool.
+
+    Returns a (results, errors) pair of dicts keyed by kind. A kind that
+    fails gets an empty list in results and its error message in errors,
+    so one slow or broken API group doesn't hold up or sink the others.
+    """
+    results = {}
+    errors = {}
+    workers = max(1, min(Config.FETCH_CONCURRENCY, len(kinds)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='fetch') as pool:
+        # Each LIST runs in a copy of the caller's context so its spans join the caller's trace
+        futures = {pool.submit(contextvars.copy_context().run, list_kind, kind): kind for kind in kinds}
+        for future in as_completed(futures):
+            kind = futures[future]
+            try:
+                results[kind] = future.result()
+            except Exception as e:
+                print(f"Error listing {kind}: {e}")
+                results[kind] = []
+                errors[kind] = str(e)
+    return results, errors
+
+
+def namespaced_name(obj):
+    """Sort key of namespaced objects: the order in which the API server lists them"""
+    return (obj.metadata.namespace, obj.metadata.name)
+
 
 def get_cluster_data():
+    """Build the /api/cluster document.
+
+    Nodes are ordered by name, their pods, workloads (Deployments first)
+    and services by namespace and name - the API server's LIST order, which
+    informer stores don't keep. The dashboard sorts the same way when it
+    applies deltas.
+    """
     try:
+        phases = PhaseTimer('cluster')
+        
         # Get nodes
-        nodes = v1.list_node()
+        nodes = sorted(list_kind('nodes'), key=lambda node: node.metadata.name)
         
-        # Get pods
-        pods = v1.list_pod_for_all_namespaces()
+        # Get pods (consumed page by page in a single pass below)
+        pods = iter_kind('pods')
         
         # Get deployments
-        deployments = apps_v1.list_deployment_for_all_namespaces()
+        deployments = sorted(list_kind('deployments'), key=namespaced_name)
         
         # Get statefulsets
-        statefulsets = apps_v1.list_stateful_set_for_all_namespaces()
+        statefulsets = sorted(list_kind('statefulsets'), key=namespaced_name)
         
         # Get services
-        services = v1.list_service_for_all_namespaces()
+        services = sorted(list_kind('services'), key=namespaced_name)
+        phases.mark('list')
         
-        # Process nodes
+        # Process nodes, building name -> node_info and name -> IP maps
+        # that pod placement and NodePort resolution look up by node name
         master_nodes = []
         worker_nodes = []
         worker_pools = {}
+        node_by_name = {}
+        node_name_to_ip = {}
+        all_node_ips = []
+        ready_nodes = 0
         
-        for node in nodes.items:
-            node_info = {
-                'name': node.metadata.name,
-                'status': 'Ready' if any(condition.type == 'Ready' and condition.status == 'True' 
-                                       for condition in node.status.conditions) else 'NotReady',
-                'roles': [],
-                'version': node.status.node_info.kubelet_version,
-                'os': node.status.node_info.os_image,
-                'container_runtime': node.status.node_info.container_runtime_version,
-                'cpu_capacity': node.status.capacity.get('cpu', 'Unknown'),
-                'memory_capacity': node.status.capacity.get('memory', 'Unknown'),
-                'pods': [],
-                'internal_ip': None,
-                'external_ip': None
-            }
+        for node in nodes:
+            node_info = Node(
+                name=intern(node.metadata.name),
+                status='Ready' if any(condition.type == 'Ready' and condition.status == 'True' 
+                                      for condition in node.status.conditions) else 'NotReady',
+                roles=[],
+                version=intern(node.status.node_info.kubelet_version),
+                os=intern(node.status.node_info.os_image),
+                container_runtime=intern(node.status.node_info.container_runtime_version),
+                cpu_capacity=intern(node.status.capacity.get('cpu', 'Unknown')),
+                memory_capacity=intern(node.status.capacity.get('memory', 'Unknown')),
+                pods=[],
+                internal_ip=None,
+                external_ip=None
+            )
             
             # Get node IPs
             if node.status.addresses:
                 for addr in node.status.addresses:
                     if addr.type == 'InternalIP':
-                        node_info['internal_ip'] = addr.address
+                        node_info.internal_ip = addr.address
                     elif addr.type == 'ExternalIP':
-                        node_info['external_ip'] = addr.address
+                        node_info.external_ip = addr.address
+                # Prefer external IP, but use internal if external not available
+                node_ip = node_info.external_ip or node_info.internal_ip
+                if node_ip:
+                    node_name_to_ip[node_info.name] = node_ip
+                    all_node_ips.append(node_ip)
+            
+            if node_info.status == 'Ready':
+                ready_nodes += 1
             
             # Determine node roles
             if node.metadata.labels:
                 if 'node-role.kubernetes.io/control-plane' in node.metadata.labels or \
                    'node-role.kubernetes.io/master' in node.metadata.labels:
-                    node_info['roles'].append('control-plane')
+                    node_info.roles.append('control-plane')
                     master_nodes.append(node_info)
+                    node_by_name[node_info.name] = node_info
                 else:
-                    node_info['roles'].append('worker')
+                    node_info.roles.append('worker')
                     
                     # Group worker nodes by pool based on node name patterns
                     pool_name = 'default-pool'
@@ -90,134 +674,93 @@ def get_cluster_data():
                     if pool_name not in worker_pools:
                         worker_pools[pool_name] = []
                     worker_pools[pool_name].append(node_info)
+                    node_by_name[node_info.name] = node_info
+        phases.mark('nodes')
         
-        # Add pods to nodes
-        for pod in pods.items:
-            if pod.spec.node_name and pod.status.phase not in ['Succeeded', 'Failed']:
-                pod_info = {
-                    'name': pod.metadata.name,
-                    'namespace': pod.metadata.namespace,
-                    'status': pod.status.phase,
-                    'cpu_request': '0',
-                    'memory_request': '0',
-                    'labels': pod.metadata.labels or {}
-                }
+        # Stream pods once: attach them to their nodes and index a compact record
+        # of every active pod by its labels for workload and service matching,
+        # so full pod objects are never all held at the same time. Pods with the
+        # same labels (replicas of one workload) share one interned label dict.
+        pod_index = LabelIndex()
+        label_sets = LabelSets()
+        running_pods = 0
+        for pod in pods:
+            if pod.status.phase in ['Succeeded', 'Failed']:
+                continue
+            if pod.status.phase == 'Running':
+                running_pods += 1
+            namespace = intern(pod.metadata.namespace)
+            phase = intern(pod.status.phase)
+            node_name = intern(pod.spec.node_name)
+            labels = label_sets.get(pod.metadata.labels)
+            pod_index.add(namespace, labels, WorkloadPod(pod.metadata.name, namespace, phase, node_name, pod.status.pod_ip))
+            
+            if node_name:
+                cpu_request = '0'
+                memory_request = '0'
                 
                 # Calculate resource requests
                 if pod.spec.containers:
                     for container in pod.spec.containers:
                         if container.resources and container.resources.requests:
                             if 'cpu' in container.resources.requests:
-                                pod_info['cpu_request'] = container.resources.requests['cpu']
+                                cpu_request = container.resources.requests['cpu']
                             if 'memory' in container.resources.requests:
-                                pod_info['memory_request'] = container.resources.requests['memory']
-                
-                # Add pod to appropriate node
-                for master in master_nodes:
-                    if master['name'] == pod.spec.node_name:
-                        master['pods'].append(pod_info)
-                        break
+                                memory_request = container.resources.requests['memory']
                 
-                for pool_nodes in worker_pools.values():
-                    for worker in pool_nodes:
-                        if worker['name'] == pod.spec.node_name:
-                            worker['pods'].append(pod_info)
-                            break
+                # Add pod to its node
+                node_info = node_by_name.get(node_name)
+                if node_info is not None:
+                    node_info.pods.append(NodePod(pod.metadata.name, namespace, phase, intern(cpu_request),
+                                                  intern(memory_request), labels))
+        for node_info in node_by_name.values():
+            node_info.pods.sort(key=lambda pod: (pod.namespace, pod.name))
+        # Pods are listed page by page during this phase unless informers serve them
+        phases.mark('pods')
         
-        # Process deployments
+        # Process deployments and statefulsets; matched pods are shared records, not copies
         deployment_info = []
-        for deployment in deployments.items:
-            dep_info = {
-                'name': deployment.metadata.name,
-                'namespace': deployment.metadata.namespace,
-                'replicas': deployment.spec.replicas or 0,
-                'ready_replicas': deployment.status.ready_replicas or 0,
-                'available_replicas': deployment.status.available_replicas or 0,
-                'labels': deployment.metadata.labels or {},
-                'selector': deployment.spec.selector.match_labels or {},
-                'type': 'Deployment',
-                'pods': []
-            }
-            
-            # Match pods to this deployment
-            selector = deployment.spec.selector.match_labels or {}
-            for pod in pods.items:
-                if pod.metadata.namespace == deployment.metadata.namespace and pod.status.phase not in ['Succeeded', 'Failed']:
-                    # Check if pod labels match deployment selector
-                    if selector and pod.metadata.labels:
-                        if all(pod.metadata.labels.get(k) == v for k, v in selector.items()):
-                            dep_info['pods'].append({
-                                'name': pod.metadata.name,
-                                'namespace': pod.metadata.namespace,
-                                'status': pod.status.phase,
-                                'node': pod.spec.node_name,
-                                'ip': pod.status.pod_ip
-                            })
-            
-            deployment_info.append(dep_info)
-        
-        # Process statefulsets
-        for statefulset in statefulsets.items:
-            sts_info = {
-                'name': statefulset.metadata.name,
-                'namespace': statefulset.metadata.namespace,
-                'replicas': statefulset.spec.replicas or 0,
-                'ready_replicas': statefulset.status.ready_replicas or 0,
-                'available_replicas': statefulset.status.ready_replicas or 0,  # StatefulSets don't have available_replicas
-                'labels': statefulset.metadata.labels or {},
-                'selector': statefulset.spec.selector.match_labels or {},
-                'type': 'StatefulSet',
-                'pods': []
-            }
-            
-            # Match pods to this statefulset
-            selector = statefulset.spec.selector.match_labels or {}
-            for pod in pods.items:
-                if pod.metadata.namespace == statefulset.metadata.namespace and pod.status.phase not in ['Succeeded', 'Failed']:
-                    # Check if pod labels match statefulset selector
-                    if selector and pod.metadata.labels:
-                        if all(pod.metadata.labels.get(k) == v for k, v in selector.items()):
-                            sts_info['pods'].append({
-                                'name': pod.metadata.name,
-                                'namespace': pod.metadata.namespace,
-                                'status': pod.status.phase,
-                                'node': pod.spec.node_name,
-                                'ip': pod.status.pod_ip
-                            })
-            
-            deployment_info.append(sts_info)
+        for workloads, workload_type in ((deployments, 'Deployment'), (statefulsets, 'StatefulSet')):
+            for workload in workloads:
+                # Match pods to this workload (matchLabels and matchExpressions) via the label index
+                selector = workload.spec.selector
+                namespace = intern(workload.metadata.namespace)
+                ready_replicas = workload.status.ready_replicas or 0
+                deployment_info.append(Workload(
+                    name=workload.metadata.name,
+                    namespace=namespace,
+                    replicas=workload.spec.replicas or 0,
+                    ready_replicas=ready_replicas,
+                    # StatefulSets don't have available_replicas
+                    available_replicas=(workload.status.available_replicas or 0) if workload_type == 'Deployment' else ready_replicas,
+                    labels=workload.metadata.labels or {},
+                    selector=selector.match_labels or {},
+                    type=workload_type,
+                    pods=pod_index.match(namespace, selector) if compile_selector(selector) else []
+                ))
+        phases.mark('workloads')
         
         # Process services
         service_info = []
-        for service in services.items:
-            svc_info = {
-                'name': service.metadata.name,
-                'namespace': service.metadata.namespace,
-                'type': service.spec.type,
-                'cluster_ip': service.spec.cluster_ip,
-                'external_ips': service.spec.external_i_ps or [],
-                'ports': [],
-                'selector': service.spec.selector or {},
-                'load_balancer_ip': None,
-                'node_ips': []  # Will be populated for NodePort services
-            }
-            
-            # Get ports
-            if service.spec.ports:
-                for port in service.spec.ports:
-                    svc_info['ports'].append({
-                        'name': port.name,
-                        'port': port.port,
-                        'target_port': port.target_port,
-                        'node_port': port.node_port,
-                        'protocol': port.protocol
-                    })
+        for service in services:
+            svc_info = Service(
+                name=service.metadata.name,
+                namespace=intern(service.metadata.namespace),
+                type=intern(service.spec.type),
+                cluster_ip=service.spec.cluster_ip,
+                external_ips=service.spec.external_i_ps or [],
+                ports=[ServicePort(port.name, port.port, port.target_port, port.node_port, intern(port.protocol))
+                       for port in service.spec.ports or []],
+                selector=service.spec.selector or {},
+                load_balancer_ip=None,
+                node_ips=[]  # Will be populated for NodePort services
+            )
             
             # Get LoadBalancer IP
             if service.status.load_balancer and service.status.load_balancer.ingress:
                 for ingress in service.status.load_balancer.ingress:
                     if ingress.ip:
-                        svc_info['load_balancer_ip'] = ingress.ip
+                        svc_info.load_balancer_ip = ingress.ip
                         break
             
             # Get node IPs for NodePort services
@@ -225,59 +768,29 @@ def get_cluster_data():
                 # First, find pods that match this service's selector
                 pod_node_names = set()
                 if service.spec.selector:
-                    for pod in pods.items:
-                        if pod.metadata.namespace == service.metadata.namespace and pod.status.phase == 'Running':
-                            # Check if pod labels match service selector
-                            if pod.metadata.labels and all(pod.metadata.labels.get(k) == v for k, v in service.spec.selector.items()):
-                                if pod.spec.node_name:
-                                    pod_node_names.add(pod.spec.node_name)
-                
-                # Build a map of node names to IPs
-                node_name_to_ip = {}
-                all_node_ips = []
-                for node in nodes.items:
-                    if node.status.addresses:
-                        external_ip = None
-                        internal_ip = None
-                        for addr in node.status.addresses:
-                            if addr.type == 'ExternalIP':
-                                external_ip = addr.address
-                            elif addr.type == 'InternalIP':
-                                internal_ip = addr.address
-                        # Prefer external IP, but use internal if external not available
-                        node_ip = external_ip or internal_ip
-                        if node_ip:
-                            node_name_to_ip[node.metadata.name] = node_ip
-                            all_node_ips.append(node_ip)
-                
-                # Prioritize IPs of nodes where pods are running
-                prioritized_ips = []
-                for node_name in pod_node_names:
-                    if node_name in node_name_to_ip:
-                        ip = node_name_to_ip[node_name]
-                        if ip not in prioritized_ips:
-                            prioritized_ips.append(ip)
+                    for pod in pod_index.match(service.metadata.namespace, service.spec.selector):
+                        if pod.status == 'Running' and pod.node:
+                            pod_node_names.add(pod.node)
                 
-                # Add remaining node IPs
-                for ip in all_node_ips:
-                    if ip not in prioritized_ips:
-                        prioritized_ips.append(ip)
+                # Prioritize IPs of nodes where pods are running, then add the
+                # remaining node IPs (dict keys keep first-seen order, no duplicates)
+                prioritized_ips = dict.fromkeys(
+                    node_name_to_ip[node_name] for node_name in pod_node_names if node_name in node_name_to_ip
+                )
+                prioritized_ips.update(dict.fromkeys(all_node_ips))
                 
-                svc_info['node_ips'] = prioritized_ips
+                svc_info.node_ips = list(prioritized_ips)
             
             service_info.append(svc_info)
+        phases.mark('services')
         
         # Calculate totals
-        total_nodes = len(nodes.items)
-        ready_nodes = sum(1 for node in nodes.items 
-                        if any(condition.type == 'Ready' and condition.status == 'True' 
-                              for condition in node.status.conditions))
-        total_pods = len([pod for pod in pods.items if pod.status.phase not in ['Succeeded', 'Failed']])
-        running_pods = len([pod for pod in pods.items if pod.status.phase == 'Running'])
+        total_nodes = len(nodes)
+        total_pods = len(pod_index.items)
         
         return {
             'cluster_name': os.environ.get('CLUSTER_NAME', 'nkp-dev01'),
-            'kubernetes_version': nodes.items[0].status.node_info.kubelet_version if nodes.items else 'Unknown',
+            'kubernetes_version': nodes[0].status.node_info.kubelet_version if nodes else 'Unknown',
             'total_nodes': total_nodes,
             'ready_nodes': ready_nodes,
             'total_pods': total_pods,
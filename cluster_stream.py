@@ -0,0 +1,300 @@
+"""
+Versioned cluster snapshot shared by /api/cluster, its ?since= deltas and /api/cluster/stream
+
+One background thread recomputes the cluster snapshot when the informers
+report changes (or on a fallback interval), diffs it against the previous
+snapshot entity by entity, records the changes in a bounded log and fans
+the encoded delta out to every connected subscriber.
+"""
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from config import Config
+from app.utils.snapshot_cache import SnapshotCache
+from app.utils.metrics import PhaseTimer
+from app.utils.cluster_records import PlacedPod, json_default, load_cluster, record_fields
+from cluster_api import get_cluster_data, add_change_listener
+
+try:
+    import orjson
+    _json_dumps = orjson.dumps
+except ImportError:  # pragma: no cover - orjson is optional
+    def _json_dumps(value):
+        return json.dumps(value, separators=(',', ':'), default=json_default).encode()
+
+# Informer kinds that feed get_cluster_data
+STREAM_KINDS = ('nodes', 'pods', 'deployments', 'statefulsets', 'services')
+
+# Top-level scalars sent as the 'summary' entity
+SUMMARY_FIELDS = ('cluster_name', 'kubernetes_version', 'total_nodes', 'ready_nodes',
+                  'total_pods', 'running_pods', 'error')
+
+# Frames a subscriber may fall behind before it is dropped and has to reconnect
+SUBSCRIBER_QUEUE_SIZE = 64
+
+# Order in which entity kinds are applied, so nodes exist before their pods
+ENTITY_KINDS = ('summary', 'node', 'pod', 'deployment', 'service')
+
+
+def cluster_entities(data):
+    """Flatten get_cluster_data() output into {entity key: (kind, value)}.
+
+    Nodes carry their pool ('control-plane' for master nodes) but not their
+    pods; each pod placed on a node is its own entity carrying the node name.
+    Workloads keep their matched pods. Values share the document's records.
+    """
+    entities = {'summary': ('summary', {field: data.get(field) for field in SUMMARY_FIELDS})}
+    placed_pods = []
+    pools = [('control-plane', data.get('master_nodes', []))] + list(data.get('worker_pools', {}).items())
+    for pool_name, nodes in pools:
+        for node in nodes:
+            entities[f"node/{node.name}"] = ('node', {'pool': pool_name, 'node': record_fields(node, exclude=('pods',))})
+            placed_pods.extend((node.name, pod) for pod in node.pods)
+    for node_name, pod in placed_pods:
+        entities[f"pod/{pod.namespace}/{pod.name}"] = ('pod', PlacedPod(node_name, pod))
+    for workload in data.get('deployments', []):
+        entities[f"{workload.type}/{workload.namespace}/{workload.name}"] = ('deployment', workload)
+    for service in data.get('services', []):
+        entities[f"service/{service.namespace}/{service.name}"] = ('service', service)
+    return entities
+
+
+def diff_entities(old, new):
+    """Return the add/update/remove changes turning entity map old into new"""
+    changes = []
+    for key, (kind, value) in new.items():
+        previous = old.get(key)
+        if previous is None:
+            changes.append({'op': 'add', 'kind': kind, 'key': key, 'value': value})
+        elif previous[1] != value:
+            changes.append({'op': 'update', 'kind': kind, 'key': key, 'value': value})
+    for key, (kind, _) in old.items():
+        if key not in new:
+            changes.append({'op': 'remove', 'kind': kind, 'key': key})
+    return changes
+
+
+def merge_changes(change_lists):
+    """Collapse consecutive change lists into one net change per entity.
+
+    An entity added and later removed disappears; one removed and added
+    again counts as updated.
+    """
+    merged = {}
+    for changes in change_lists:
+        for change in changes:
+            previous = merged.get(change['key'])
+            if previous is None:
+                merged[change['key']] = change
+            elif change['op'] == 'remove':
+                if previous['op'] == 'add':
+                    del merged[change['key']]
+                else:
+                    merged[change['key']] = change
+            else:
+                op = 'add' if previous['op'] == 'add' else 'update'
+                merged[change['key']] = dict(change, op=op)
+    return sorted(merged.values(), key=lambda change: ENTITY_KINDS.index(change['kind']))
+
+
+def sse_frame(event, payload):
+    """Encode one Server-Sent Events frame"""
+    return b'event: ' + event.encode() + b'\ndata: ' + _json_dumps(payload) + b'\n\n'
+
+
+class Subscription:
+    """One connected stream client; receives pre-encoded frames"""
+
+    def __init__(self):
+        self.frames = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.closed = False
+
+    def push(self, frame):
+        try:
+            self.frames.put_nowait(frame)
+        except queue.Full:
+            # Too far behind to catch up
+            self.closed = True
+
+    def close(self):
+        """End the subscription, waking a reader blocked in next_frame"""
+        self.closed = True
+        try:
+            self.frames.put_nowait(b'')
+        except queue.Full:
+            pass
+
+    def next_frame(self, timeout):
+        """Return the next frame, or None if nothing arrived within timeout"""
+        try:
+            return self.frames.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class ClusterFeed:
+    """Versioned cluster snapshot shared by all requests and stream subscribers"""
+
+    def __init__(self):
+        # Versions are "<epoch>:<n>": the epoch identifies this feed (process),
+        # so a 'since' from another worker, replica or restart gets a full snapshot
+        self.epoch = os.urandom(4).hex()
+        self._counter = 0
+        self.data = None
+        self._entities = {}
+        self._log = deque(maxlen=Config.CLUSTER_CHANGE_LOG_SIZE)
+        self._cache = SnapshotCache('cluster', self._build, Config.SNAPSHOT_TTL_SECONDS, wrap=self._apply)
+        self._snapshot_frame = None
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._changed = threading.Event()
+        self._thread = None
+        self._listening = False
+
+    def _on_change(self, kind):
+        if kind in STREAM_KINDS:
+            self._changed.set()
+
+    def _build(self):
+        data = get_cluster_data()
+        if 'error' in data:
+            # Keep the last good snapshot (and its entities) instead of replacing
+            # it with an empty one; SnapshotCache backs off and retries
+            raise RuntimeError(data['error'])
+        return data
+
+    def _apply(self, data):
+        """Diff newly built (or loaded) cluster data against the last one and return (version, data).
+
+        A new version is recorded and broadcast only if some entity changed.
+        Runs under the snapshot cache's build lock, one call at a time.
+        """
+        phases = PhaseTimer('cluster_feed')
+        # Documents loaded from a shared store come back as plain JSON
+        data = load_cluster(data)
+        entities = cluster_entities(data)
+        changes = diff_entities(self._entities, entities)
+        phases.mark('diff')
+        with self._lock:
+            self.data = data
+            first = self._counter == 0
+            if not changes and not first:
+                # Same entities but a newer last_updated: the snapshot sent to
+                # new subscribers is re-encoded when next asked for
+                self._snapshot_frame = None
+                return self.version, data
+            self._entities = entities
+            self._counter += 1
+            self._log.append((self._counter, changes))
+            version = self.version
+            self._snapshot_frame = sse_frame('snapshot', {'version': self.version, 'data': data})
+            delta_frame = sse_frame('delta', {
+                'version': self.version,
+                'last_updated': data.get('last_updated'),
+                'changes': changes
+            })
+            phases.mark('encode')
+            # Nobody holds an earlier snapshot to apply the first delta to
+            subscribers = [] if first else list(self._subscribers)
+        for subscription in subscribers:
+            subscription.push(delta_frame)
+        return version, data
+
+    def refresh(self):
+        """Recompute now and return the Snapshot holding (version, data)"""
+        return self._cache.refresh()
+
+    def current(self):
+        """Return the cached Snapshot holding (version, data), see SnapshotCache.get"""
+        return self._cache.get()
+
+    def invalidate(self):
+        """Expire the cached snapshot so it is rebuilt"""
+        self._cache.invalidate()
+
+    @property
+    def version(self):
+        """Version token of the current snapshot: <epoch>:<n>"""
+        return f'{self.epoch}:{self._counter}'
+
+    def changes_since(self, version):
+        """Return the net changes after a version token, or None if it is unknown
+        (another epoch, malformed) or the log no longer covers it"""
+        epoch, _, counter = str(version).partition(':')
+        if epoch != self.epoch or not counter.isdigit():
+            return None
+        since = int(counter)
+        with self._lock:
+            if since == self._counter:
+                return []
+            if since > self._counter or not self._log or self._log[0][0] > since + 1:
+                return None
+            change_lists = [changes for logged, changes in self._log if logged > since]
+        return merge_changes(change_lists)
+
+    def snapshot_frame(self):
+        """Return the encoded current snapshot"""
+        self.current()
+        with self._lock:
+            frame = self._snapshot_frame
+            if frame is not None:
+                return frame
+            version, data = self.version, self.data
+        frame = sse_frame('snapshot', {'version': version, 'data': data})
+        with self._lock:
+            if self.data is data:
+                self._snapshot_frame = frame
+        return frame
+
+    def subscribe(self):
+        """Register a client and make sure the update thread is running"""
+        subscription = Subscription()
+        with self._lock:
+            self._subscribers.add(subscription)
+            if not self._listening:
+                add_change_listener(self._on_change)
+                self._listening = True
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='cluster-feed', daemon=True)
+                self._thread.start()
+        return subscription
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def close_all(self):
+        """Close every subscription, e.g. before the worker shuts down"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.close()
+
+    def _run(self):
+        while True:
+            # Informer events wake the thread early; otherwise refresh on the fallback interval
+            self._changed.wait(Config.STREAM_POLL_SECONDS)
+            with self._lock:
+                if not self._subscribers:
+                    self._thread = None
+                    return
+            # Coalesce bursts of events into one recomputation
+            self._changed.clear()
+            if Config.STREAM_COALESCE_SECONDS > 0:
+                time.sleep(Config.STREAM_COALESCE_SECONDS)
+                self._changed.clear()
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Cluster feed refresh failed: {e}")
+
+
+cluster_feed = ClusterFeed()
@@ -28,6 +28,89 @@ class Config:
     # Cluster configuration
     CLUSTER_NAME = os.getenv('CLUSTER_NAME', 'nkp-dev01')
     
+    # Informer cache configuration (list+watch stores behind the API endpoints)
+    INFORMERS_ENABLED = os.getenv('INFORMERS_ENABLED', 'true').lower() == 'true'
+    INFORMER_SYNC_TIMEOUT = int(os.getenv('INFORMER_SYNC_TIMEOUT', '30'))
+    INFORMER_RETRY_SECONDS = int(os.getenv('INFORMER_RETRY_SECONDS', '300'))
+    # Kinds kept in informers; every informer holds all objects of its kind in
+    # each worker process, so by default only the cluster view's kinds are
+    # watched and the rest are listed when the resources snapshot is built.
+    # An informer that is not read for INFORMER_IDLE_SECONDS (e.g. on a replica
+    # that lost the snapshot lease) stops and frees its store.
+    INFORMER_KINDS = [kind.strip() for kind in os.getenv(
+        'INFORMER_KINDS', 'nodes,pods,deployments,statefulsets,services').split(',') if kind.strip()]
+    INFORMER_IDLE_SECONDS = int(os.getenv('INFORMER_IDLE_SECONDS', '900'))
+    WATCH_TIMEOUT_SECONDS = int(os.getenv('WATCH_TIMEOUT_SECONDS', '300'))
+    
+    # Objects per LIST page (limit/continue) when listing from the API server
+    LIST_PAGE_SIZE = int(os.getenv('LIST_PAGE_SIZE', '500'))
+    
+    # Decode LIST/WATCH responses from raw JSON into lightweight records
+    # instead of kubernetes model objects
+    RAW_JSON_FETCH = os.getenv('RAW_JSON_FETCH', 'true').lower() == 'true'
+    
+    # Maximum number of concurrent LIST calls when fetching resource kinds
+    FETCH_CONCURRENCY = int(os.getenv('FETCH_CONCURRENCY', '8'))
+    
+    # Live updates (/api/cluster/stream): informer events are coalesced for
+    # STREAM_COALESCE_SECONDS; without events the snapshot is recomputed every
+    # STREAM_POLL_SECONDS; idle connections get a keepalive comment
+    STREAM_COALESCE_SECONDS = float(os.getenv('STREAM_COALESCE_SECONDS', '1.0'))
+    STREAM_POLL_SECONDS = int(os.getenv('STREAM_POLL_SECONDS', '15'))
+    STREAM_KEEPALIVE_SECONDS = int(os.getenv('STREAM_KEEPALIVE_SECONDS', '15'))
+    
+    # Seconds a computed /api/cluster or /api/resources snapshot is served to
+    # every request before it is rebuilt (POST /api/refresh rebuilds at once)
+    SNAPSHOT_TTL_SECONDS = float(os.getenv('SNAPSHOT_TTL_SECONDS', '10'))
+    
+    # Background refresh: expired snapshots are served immediately while a
+    # thread rebuilds them every SNAPSHOT_TTL_SECONDS; a build that takes t
+    # seconds delays the next one to at least t * SNAPSHOT_REFRESH_DURATION_FACTOR,
+    # failures back off exponentially, both capped at SNAPSHOT_MAX_REFRESH_SECONDS.
+    # The thread stops after SNAPSHOT_IDLE_SECONDS without requests.
+    SNAPSHOT_BACKGROUND_REFRESH = os.getenv('SNAPSHOT_BACKGROUND_REFRESH', 'true').lower() == 'true'
+    SNAPSHOT_REFRESH_DURATION_FACTOR = float(os.getenv('SNAPSHOT_REFRESH_DURATION_FACTOR', '3'))
+    SNAPSHOT_MAX_REFRESH_SECONDS = float(os.getenv('SNAPSHOT_MAX_REFRESH_SECONDS', '120'))
+    SNAPSHOT_IDLE_SECONDS = float(os.getenv('SNAPSHOT_IDLE_SECONDS', '300'))
+    
+    # Where built snapshots are shared between replicas: memory (this process
+    # only), file (a directory on a shared volume) or redis. The replica holding
+    # a snapshot's lease builds it; the others load what it published. A lease
+    # not renewed for SNAPSHOT_LEASE_SECONDS passes to another replica.
+    SNAPSHOT_STORE = os.getenv('SNAPSHOT_STORE', 'memory').lower()
+    SNAPSHOT_STORE_PATH = os.getenv('SNAPSHOT_STORE_PATH', '/var/run/nkp-cluster-visualizer/snapshots')
+    SNAPSHOT_STORE_URL = os.getenv('SNAPSHOT_STORE_URL', 'redis://localhost:6379/0')
+    SNAPSHOT_LEASE_SECONDS = float(os.getenv('SNAPSHOT_LEASE_SECONDS', '150'))
+    # A follower waits this long for the leader's first published snapshot
+    # before building one itself
+    SNAPSHOT_FOLLOWER_WAIT_SECONDS = float(os.getenv('SNAPSHOT_FOLLOWER_WAIT_SECONDS', '15'))
+    
+    # Snapshot versions kept for /api/cluster?since=<version> deltas
+    CLUSTER_CHANGE_LOG_SIZE = int(os.getenv('CLUSTER_CHANGE_LOG_SIZE', '256'))
+    
+    # Request tracing for the API endpoints: traces taking at least
+    # TRACE_EXPORT_MIN_MS are appended to TRACE_EXPORT_PATH as OTLP/JSON lines
+    # (empty disables exporting); responses carry a Server-Timing header with
+    # the total and the SERVER_TIMING_PHASES longest spans
+    TRACE_EXPORT_PATH = os.getenv('TRACE_EXPORT_PATH', '')
+    TRACE_EXPORT_MIN_MS = float(os.getenv('TRACE_EXPORT_MIN_MS', '0'))
+    SERVER_TIMING_ENABLED = os.getenv('SERVER_TIMING_ENABLED', 'true').lower() == 'true'
+    SERVER_TIMING_PHASES = int(os.getenv('SERVER_TIMING_PHASES', '8'))
+    
+    # Production server (gunicorn -c gunicorn.conf.py wsgi:app): worker processes,
+    # threads per worker (one per open /api/cluster/stream), keep-alive, worker
+    # timeout and how long SIGTERM waits for in-flight requests
+    WEB_WORKERS = int(os.getenv('WEB_WORKERS', '1'))
+    WEB_THREADS = int(os.getenv('WEB_THREADS', '32'))
+    # Open /api/cluster/stream connections per worker; each holds a thread, so
+    # keep this below WEB_THREADS to leave threads for API requests and probes.
+    # Past the limit the stream answers 503 and dashboards poll instead.
+    STREAM_MAX_CONNECTIONS = int(os.getenv('STREAM_MAX_CONNECTIONS', str(max(1, WEB_THREADS - 8))))
+    WEB_KEEPALIVE_SECONDS = int(os.getenv('WEB_KEEPALIVE_SECONDS', '5'))
+    WEB_TIMEOUT_SECONDS = int(os.getenv('WEB_TIMEOUT_SECONDS', '120'))
+    WEB_GRACEFUL_TIMEOUT_SECONDS = int(os.getenv('WEB_GRACEFUL_TIMEOUT_SECONDS', '30'))
+    WEB_WARM_CACHES = os.getenv('WEB_WARM_CACHES', 'true').lower() == 'true'
+    
     @staticmethod
     def init_app(app):
         """Initialize application with configuration"""
@@ -0,0 +1,68 @@
+"""
+Gunicorn configuration for NKP Cluster Visualizer
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Every setting comes from the environment through config.Config (WEB_*).
+Threaded workers (gthread) are used because /api/cluster/stream keeps a
+connection - and a thread - open per dashboard. STREAM_MAX_CONNECTIONS caps
+the streams below WEB_THREADS so API requests and probes always find a free
+thread; dashboards past the cap poll instead. Each worker process keeps its
+own informers and snapshot caches, so prefer more threads over more workers.
+With WEB_WORKERS > 1, set PROMETHEUS_MULTIPROC_DIR so /metrics reports all
+of them rather than whichever worker answers the scrape.
+"""
+import glob
+import os
+import signal
+from config import Config
+
+bind = f"0.0.0.0:{os.environ.get('BIND_PORT', '9090')}"
+worker_class = 'gthread'
+workers = Config.WEB_WORKERS
+threads = Config.WEB_THREADS
+keepalive = Config.WEB_KEEPALIVE_SECONDS
+timeout = Config.WEB_TIMEOUT_SECONDS
+graceful_timeout = Config.WEB_GRACEFUL_TIMEOUT_SECONDS
+
+# Informer and refresher threads do not survive fork - load the app per worker
+preload_app = False
+
+accesslog = '-'
+errorlog = '-'
+capture_output = True
+
+
+def on_starting(server):
+    """Start from an empty PROMETHEUS_MULTIPROC_DIR; files of a previous run would be summed in"""
+    directory = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        for path in glob.glob(os.path.join(directory, '*.db')):
+            os.remove(path)
+
+
+def child_exit(server, worker):
+    """Drop the live gauges of a worker that exited"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def post_worker_init(worker):
+    """Warm the snapshot caches; on SIGTERM release leases and end open streams first"""
+    import wsgi
+
+    if Config.WEB_WARM_CACHES:
+        wsgi.start_cache_warmup()
+
+    # gunicorn drains in-flight requests on SIGTERM for up to graceful_timeout;
+    # streams never finish by themselves, so close them before it starts waiting
+    handle_exit = signal.getsignal(signal.SIGTERM)
+
+    def handle_term(signum, frame):
+        wsgi.prepare_shutdown()
+        handle_exit(signum, frame)
+
+    signal.signal(signal.SIGTERM, handle_term)
+    worker.log.info(f"Worker {worker.pid} ready ({threads} threads)")
@@ -42,10 +42,13 @@ kubectl apply -f "${SCRIPT_DIR}/clusterrolebinding.yaml"
 echo "4. Creating ConfigMap..."
 kubectl apply -f "${SCRIPT_DIR}/configmap.yaml"
 
-echo "5. Creating Deployment..."
+echo "5. Creating shared snapshot store (Redis)..."
+kubectl apply -f "${SCRIPT_DIR}/redis.yaml"
+
+echo "6. Creating Deployment..."
 kubectl apply -f "${SCRIPT_DIR}/deployment.yaml"
 
-echo "6. Creating Services..."
+echo "7. Creating Services..."
 kubectl apply -f "${SCRIPT_DIR}/service.yaml"
 kubectl apply -f "${SCRIPT_DIR}/loadbalancer.yaml"
 
@@ -0,0 +1,27 @@
+"""
+Shared fixtures: a synthetic cluster served in place of the Kubernetes API and an in-process snapshot store
+"""
+import pytest
+
+from config import Config
+from app.utils.snapshot_store import MemorySnapshotStore
+from benchmarks.synthetic_cluster import SyntheticAPI, SyntheticCluster
+
+
+@pytest.fixture
+def synthetic_cluster():
+    return SyntheticCluster(nodes=4, pods=60)
+
+
+@pytest.fixture
+def synthetic_api(synthetic_cluster, monkeypatch):
+    """List from the synthetic cluster instead of informer stores"""
+    monkeypatch.setattr(Config, 'INFORMERS_ENABLED', False)
+    api = SyntheticAPI(synthetic_cluster)
+    with api.serve():
+        yield api
+
+
+@pytest.fixture
+def memory_store():
+    return MemorySnapshotStore(holder='test:1')
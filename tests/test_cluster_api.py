@@ -0,0 +1,43 @@
+"""
+get_cluster_data output order and informer lifetime
+"""
+import cluster_api
+
+
+def test_cluster_document_is_ordered_like_the_api_server_lists(synthetic_api, monkeypatch):
+    # Informer stores hand objects back in arrival order; reverse them to check nothing relies on it
+    iter_kind = cluster_api.iter_kind
+    monkeypatch.setattr(cluster_api, 'iter_kind', lambda kind: reversed(list(iter_kind(kind))))
+    data = cluster_api.get_cluster_data()
+
+    nodes = data['master_nodes'] + [node for nodes in data['worker_pools'].values() for node in nodes]
+    for pool in [data['master_nodes'], *data['worker_pools'].values()]:
+        assert [node.name for node in pool] == sorted(node.name for node in pool)
+    for node in nodes:
+        assert [(pod.namespace, pod.name) for pod in node.pods] == sorted((pod.namespace, pod.name) for pod in node.pods)
+    assert sum(len(node.pods) for node in nodes) > 0
+    workloads = [(workload.type != 'Deployment', workload.namespace, workload.name) for workload in data['deployments']]
+    assert workloads == sorted(workloads)
+    services = [(service.namespace, service.name) for service in data['services']]
+    assert services == sorted(services)
+
+
+def test_only_informer_kinds_are_watched(synthetic_api, monkeypatch):
+    monkeypatch.setattr(cluster_api.Config, 'INFORMERS_ENABLED', True)
+    monkeypatch.setattr(cluster_api.Config, 'INFORMER_KINDS', ['nodes'])
+    started = []
+    monkeypatch.setattr(cluster_api, 'get_informer', lambda kind: started.append(kind))
+    assert len(cluster_api.list_kind('configmaps')) == synthetic_api.cluster.counts['configmaps']
+    assert started == []
+
+
+def test_idle_informer_stops_and_is_replaced(monkeypatch):
+    monkeypatch.setattr(cluster_api.Config, 'INFORMER_IDLE_SECONDS', -1)
+    monkeypatch.setitem(cluster_api.RESOURCE_KINDS, 'test', lambda **kwargs: None)
+    informer = cluster_api.get_informer('test')
+    informer._thread.join(5)
+    assert informer.stopped
+    replacement = cluster_api.get_informer('test')
+    assert replacement is not informer
+    replacement._thread.join(5)
+    cluster_api._informers.pop('test', None)
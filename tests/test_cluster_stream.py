@@ -0,0 +1,106 @@
+"""
+ClusterFeed versions, change log and delta broadcast
+"""
+from collections import deque
+
+import pytest
+
+import cluster_stream
+from config import Config
+from cluster_stream import ClusterFeed, merge_changes
+
+
+@pytest.fixture
+def feed(memory_store, synthetic_api, monkeypatch):
+    # Rebuild only when the test asks for it
+    monkeypatch.setattr(Config, 'SNAPSHOT_BACKGROUND_REFRESH', False)
+    feed = ClusterFeed()
+    feed._cache._store = memory_store
+    return feed
+
+
+def test_failed_build_keeps_previous_snapshot_and_pushes_no_delta(feed, monkeypatch):
+    version, data = feed.current().value
+    subscription = cluster_stream.Subscription()
+    feed._subscribers.add(subscription)  # without starting the update thread
+
+    def unreachable():
+        return {'error': 'connection refused', 'master_nodes': [], 'worker_pools': {},
+                'deployments': [], 'services': []}
+
+    monkeypatch.setattr(cluster_stream, 'get_cluster_data', unreachable)
+    with pytest.raises(RuntimeError, match='connection refused'):
+        feed.refresh()
+
+    assert feed.current().value == (version, data)
+    assert feed.changes_since(version) == []
+    assert subscription.next_frame(0) is None
+
+
+def test_versions_from_another_process_get_the_full_snapshot(feed, synthetic_cluster):
+    version, _ = feed.current().value
+    epoch, counter = version.split(':')
+    assert epoch == feed.epoch
+    assert feed.changes_since(version) == []
+    other = ClusterFeed()
+    assert other.epoch != feed.epoch
+    assert feed.changes_since(f'{other.epoch}:{counter}') is None
+    assert feed.changes_since('12345') is None
+    assert feed.changes_since(f'{epoch}:{int(counter) + 1}') is None
+
+
+def test_unchanged_rebuild_refreshes_the_snapshot_sent_to_new_subscribers(feed):
+    version, _ = feed.current().value
+    feed.snapshot_frame()
+    _, data = feed.refresh().value
+    assert feed.version == version
+    assert data['last_updated'].encode() in feed.snapshot_frame()
+
+
+def pod_changes(changes):
+    return {change['key']: change['op'] for change in changes if change['kind'] == 'pod'}
+
+
+def test_merge_changes_nets_out_each_entity():
+    pod = {'kind': 'pod', 'key': 'pod/default/a'}
+    node = {'kind': 'node', 'key': 'node/n1'}
+    merged = merge_changes([
+        [dict(pod, op='add', value=1), dict(node, op='remove')],
+        [dict(pod, op='update', value=2), dict(node, op='add', value=3)],
+    ])
+    assert [(change['key'], change['op'], change.get('value')) for change in merged] == [
+        ('node/n1', 'update', 3), ('pod/default/a', 'add', 2)]
+    assert merge_changes([[dict(pod, op='add', value=1)], [dict(pod, op='remove')]]) == []
+
+
+def test_entity_added_then_deleted_is_absent_from_changes_since(feed, synthetic_cluster):
+    version, _ = feed.current().value
+    synthetic_cluster.counts['pods'] += 1
+    feed.refresh()
+    assert list(pod_changes(feed.changes_since(version)).values()) == ['add']
+    synthetic_cluster.counts['pods'] -= 1
+    feed.refresh()
+    assert pod_changes(feed.changes_since(version)) == {}
+
+
+def test_entity_deleted_then_added_again_is_an_update(feed, synthetic_cluster):
+    version, _ = feed.current().value
+    synthetic_cluster.counts['pods'] -= 1
+    feed.refresh()
+    middle = feed.version
+    (removed, op), = pod_changes(feed.changes_since(version)).items()
+    assert op == 'remove'
+    synthetic_cluster.counts['pods'] += 1
+    feed.refresh()
+    assert pod_changes(feed.changes_since(version)) == {removed: 'update'}
+    assert pod_changes(feed.changes_since(middle)) == {removed: 'add'}
+
+
+def test_versions_older_than_the_change_log_get_the_full_snapshot(feed, synthetic_cluster):
+    version, _ = feed.current().value
+    feed._log = deque(maxlen=1)  # keep only the latest change list
+    for _ in range(2):
+        synthetic_cluster.counts['pods'] += 1
+        feed.refresh()
+    assert feed.changes_since(version) is None
+    assert feed.changes_since(feed.version) == []
@@ -0,0 +1,110 @@
+"""
+LabelIndex selector matching against a direct evaluation of each requirement,
+and the pod references collected by ConfigReferenceIndex
+"""
+import pytest
+from kubernetes.client import (V1LabelSelector, V1LabelSelectorRequirement, V1ObjectMeta, V1PersistentVolumeClaimVolumeSource,
+                               V1Pod, V1PodSpec, V1Volume)
+
+from app.utils.indexes import ConfigReferenceIndex, LabelIndex, compile_selector
+
+
+def expression(key, operator, values=None):
+    return V1LabelSelectorRequirement(key=key, operator=operator, values=values)
+
+
+def selector(match_labels=None, *expressions):
+    return V1LabelSelector(match_labels=match_labels, match_expressions=list(expressions) or None)
+
+
+def satisfies(labels, requirements):
+    """Label selector semantics as the API server applies them"""
+    for key, operator, values in requirements:
+        if operator == 'In' and labels.get(key) not in values:
+            return False
+        if operator == 'NotIn' and key in labels and labels[key] in values:
+            return False
+        if operator == 'Exists' and key not in labels:
+            return False
+        if operator == 'DoesNotExist' and key in labels:
+            return False
+    return True
+
+
+@pytest.fixture
+def pods(synthetic_cluster):
+    """Synthetic pods, every other one with a tier label and every third one with a track label"""
+    pods = []
+    for i, pod in enumerate(synthetic_cluster.items('pods')):
+        labels = dict(pod['metadata']['labels'])
+        if i % 2:
+            labels['tier'] = 'web' if i % 4 == 1 else 'db'
+        if i % 3 == 0:
+            labels['track'] = 'canary'
+        pods.append((pod['metadata']['namespace'], labels, pod['metadata']['name']))
+    return pods
+
+
+@pytest.fixture
+def index(pods):
+    index = LabelIndex()
+    for namespace, labels, name in pods:
+        index.add(namespace, labels, name)
+    return index
+
+
+SELECTORS = [
+    {'app': 'app-0'},
+    selector({'app': 'app-1'}),
+    selector(None, expression('tier', 'In', ['web', 'db'])),
+    selector(None, expression('tier', 'NotIn', ['web'])),
+    selector(None, expression('track', 'Exists')),
+    selector(None, expression('track', 'DoesNotExist')),
+    selector(None, expression('tier', 'Exists'), expression('track', 'DoesNotExist')),
+    selector({'app': 'app-0'}, expression('tier', 'NotIn', ['db']), expression('track', 'Exists')),
+    selector(None, expression('tier', 'In', ['missing'])),
+]
+
+
+@pytest.mark.parametrize('label_selector', SELECTORS)
+def test_match_agrees_with_selector_semantics(index, pods, label_selector):
+    requirements = compile_selector(label_selector)
+    for namespace in sorted({namespace for namespace, _, _ in pods}):
+        expected = [name for pod_namespace, labels, name in pods
+                    if pod_namespace == namespace and satisfies(labels, requirements)]
+        assert index.match(namespace, label_selector) == expected
+        assert index.has_match(namespace, label_selector) == bool(expected)
+
+
+def test_not_in_and_does_not_exist_match_objects_without_the_key():
+    index = LabelIndex()
+    index.add('default', {'app': 'a'}, 'unlabelled')
+    index.add('default', {'app': 'a', 'tier': 'web'}, 'web')
+    assert index.match('default', selector(None, expression('tier', 'NotIn', ['web']))) == ['unlabelled']
+    assert index.match('default', selector(None, expression('tier', 'DoesNotExist'))) == ['unlabelled']
+    assert index.match('other', selector(None, expression('tier', 'DoesNotExist'))) == []
+
+
+def test_unknown_operator_matches_nothing():
+    index = LabelIndex()
+    index.add('default', {'app': 'a'}, 'pod')
+    assert index.match('default', selector(None, expression('app', 'Gt', ['1']))) == []
+
+
+def test_compile_selector_is_canonical():
+    first = compile_selector(selector({'b': '2', 'a': '1'}, expression('tier', 'In', ['web', 'db'])))
+    second = compile_selector(selector({'a': '1', 'b': '2'}, expression('tier', 'In', ['db', 'web'])))
+    assert first is second
+    assert compile_selector({'a': '1'}) == compile_selector(selector({'a': '1'}))
+    assert compile_selector(None) == ()
+
+
+def test_claims_are_indexed_per_namespace():
+    pod = V1Pod(metadata=V1ObjectMeta(name='db-0', namespace='prod'), spec=V1PodSpec(containers=[], volumes=[
+        V1Volume(name='data', persistent_volume_claim=V1PersistentVolumeClaimVolumeSource(claim_name='data-db-0')),
+        V1Volume(name='scratch'),
+    ]))
+    references = ConfigReferenceIndex([pod, V1Pod(metadata=V1ObjectMeta(name='bare', namespace='prod'), spec=V1PodSpec(containers=[]))])
+    assert references.is_claim_used('prod', 'data-db-0')
+    assert not references.is_claim_used('dev', 'data-db-0')
+    assert not references.is_claim_used('prod', 'scratch')
@@ -0,0 +1,63 @@
+"""
+/metrics aggregation across gunicorn workers (PROMETHEUS_MULTIPROC_DIR)
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+WORKER = '''
+import sys, time
+from app.utils.metrics import CACHE_REQUESTS, record_snapshot_built
+CACHE_REQUESTS.labels('snapshot', 'cluster', 'hit').inc()
+record_snapshot_built('cluster', time.time() - float(sys.argv[1]))
+print('ready', flush=True)
+time.sleep(30)
+'''
+
+SCRAPE = '''
+from app.utils.metrics import render_metrics
+print(render_metrics()[0].decode())
+'''
+
+
+def run(script, env):
+    return subprocess.run([sys.executable, '-c', script], env=env, check=True, capture_output=True, text=True).stdout
+
+
+def test_scrape_reports_every_worker(tmp_path):
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path), PYTHONPATH=str(ROOT))
+    workers = [subprocess.Popen([sys.executable, '-c', WORKER, age], env=env, stdout=subprocess.PIPE, text=True)
+               for age in ('5', '50')]
+    try:
+        for worker in workers:
+            assert worker.stdout.readline().strip() == 'ready'
+        text = run(SCRAPE, env)
+    finally:
+        for worker in workers:
+            worker.kill()
+            worker.wait()
+    assert 'nkp_visualizer_cache_requests_total{cache="snapshot",name="cluster",result="hit"} 2.0' in text
+    age = [line for line in text.splitlines() if line.startswith('nkp_visualizer_snapshot_age_seconds{')]
+    assert len(age) == 1
+    # The oldest snapshot any live worker serves
+    assert 50 <= float(age[0].split()[-1]) < 60
+
+
+def test_grouped_phases_are_one_observation():
+    from prometheus_client import REGISTRY
+    from app.utils.metrics import PhaseTimer
+
+    def count(phase):
+        return REGISTRY.get_sample_value('nkp_visualizer_phase_duration_seconds_count',
+                                         {'target': 'test', 'phase': phase}) or 0
+
+    phases = PhaseTimer('test')
+    phases.mark('fetch')
+    for kind in ('pods', 'services', 'secrets'):
+        phases.mark(kind, group='rows')
+    phases.finish()
+    phases.finish()
+    assert (count('fetch'), count('rows'), count('pods')) == (1, 1, 0)
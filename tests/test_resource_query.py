@@ -0,0 +1,132 @@
+"""
+/api/resources filtering, sorting and continue tokens
+"""
+import pytest
+
+from app.utils.resource_query import ContinueTokenExpired, ResourceQuery, ResourceSnapshot
+
+
+@pytest.fixture
+def snapshot(synthetic_api):
+    from app.routes.main import build_resources
+    return ResourceSnapshot(build_resources())
+
+
+def names(rows):
+    return [row['name'] for row in rows]
+
+
+def resources(built, count=5):
+    return {
+        'last_updated': built,
+        'pods': [{'name': f'pod-{n}', 'namespace': 'default'} for n in range(count)],
+    }
+
+
+def next_page(snapshot, token, **args):
+    return snapshot.query(ResourceQuery.from_args(dict(args, kind='pods', limit='2', **{'continue': token})))
+
+
+def test_continue_token_pages_through_its_snapshot():
+    snapshot = ResourceSnapshot(resources('2024-01-01T00:00:00'))
+    first = snapshot.query(ResourceQuery.from_args({'kind': 'pods', 'limit': '2'}))
+    second = next_page(snapshot, first['pagination']['pods']['continue'])
+    assert [row['name'] for row in first['pods'] + second['pods']] == ['pod-0', 'pod-1', 'pod-2', 'pod-3']
+
+
+def test_continue_token_expires_with_its_snapshot():
+    snapshot = ResourceSnapshot(resources('2024-01-01T00:00:00'))
+    token = snapshot.query(ResourceQuery.from_args({'kind': 'pods', 'limit': '2'}))['pagination']['pods']['continue']
+    refreshed = ResourceSnapshot(resources('2024-01-01T00:00:10', count=6))
+    with pytest.raises(ContinueTokenExpired):
+        next_page(refreshed, token)
+
+
+def test_kind_overrides_inherit_the_shared_parameters():
+    query = ResourceQuery.from_args({'namespace': 'team-1', 'orphaned': 'false', 'limit': '5',
+                                     'pods.orphaned': 'true', 'pods.sort': '-age'})
+    pods = query.for_kind('pods')
+    assert (pods.namespace, pods.orphaned, pods.sort, pods.limit) == ('team-1', True, '-age', 5)
+    services = query.for_kind('services')
+    assert services is query
+    assert (services.namespace, services.orphaned, services.sort) == ('team-1', False, None)
+    assert query.active
+
+
+@pytest.mark.parametrize('args', [
+    {'pods.bogus': '1'},
+    {'pods.continue': 'x'},
+    {'limit': '0'},
+    {'limit': 'ten'},
+    {'orphaned': 'maybe'},
+    {'sort': 'name; drop'},
+    {'pods.limit': '-1'},
+])
+def test_invalid_parameters_are_rejected(args):
+    with pytest.raises(ValueError):
+        ResourceQuery.from_args(args)
+
+
+def test_empty_query_is_inactive():
+    assert not ResourceQuery.from_args({}).active
+
+
+def test_filters_match_a_scan_of_the_rows(snapshot):
+    rows = snapshot.resources['pods']
+    args = {'kind': 'pods', 'namespace': 'team-1', 'prefix': 'app-', 'search': 'APP-1', 'sort': '-name'}
+    result = snapshot.query(ResourceQuery.from_args(args))
+    expected = sorted((row for row in rows if row['namespace'] == 'team-1' and row['name'].startswith('app-')
+                       and 'app-1' in row['name'].lower()), key=lambda row: row['name'].lower(), reverse=True)
+    assert expected
+    assert names(result['pods']) == names(expected)
+    assert result['pagination']['pods'] == {'total': len(expected), 'unfiltered': len(rows), 'continue': None}
+
+
+def test_orphaned_and_pending_deletion_together_match_either(snapshot):
+    rows = snapshot.resources['configmaps']
+    result = snapshot.query(ResourceQuery.from_args({'kind': 'configmaps', 'orphaned': 'true', 'pendingDeletion': 'true'}))
+    expected = [row for row in rows if row['orphaned'] or row['pendingDeletion']]
+    assert expected
+    assert names(result['configmaps']) == names(expected)
+
+
+def test_kind_override_applies_to_that_kind_only(snapshot):
+    result = snapshot.query(ResourceQuery.from_args({'kind': 'pods,configmaps', 'configmaps.orphaned': 'true'}))
+    assert len(result['pods']) == len(snapshot.resources['pods'])
+    assert result['configmaps'] and all(row['orphaned'] for row in result['configmaps'])
+
+
+def test_sort_orders_numbers_before_strings_and_missing_values_last():
+    rows = [{'name': 'missing'}, {'name': 'text', 'restarts': 'n/a'}, {'name': 'two', 'restarts': 2},
+            {'name': 'one', 'restarts': 1}]
+    snapshot = ResourceSnapshot({'pods': rows})
+    result = snapshot.query(ResourceQuery.from_args({'kind': 'pods', 'sort': 'restarts'}))
+    assert names(result['pods']) == ['one', 'two', 'text', 'missing']
+
+
+def test_pages_cover_every_row_once(snapshot):
+    args = {'kind': 'pods', 'sort': 'name', 'limit': '7'}
+    page = snapshot.query(ResourceQuery.from_args(args))
+    collected = list(page['pods'])
+    while page['pagination']['pods']['continue']:
+        page = snapshot.query(ResourceQuery.from_args(dict(args, **{'continue': page['pagination']['pods']['continue']})))
+        collected.extend(page['pods'])
+    everything = snapshot.query(ResourceQuery.from_args({'kind': 'pods', 'sort': 'name'}))['pods']
+    assert names(collected) == names(everything)
+    assert len(collected) == len(snapshot.resources['pods'])
+
+
+def test_continue_token_is_bound_to_its_filters(snapshot):
+    first = snapshot.query(ResourceQuery.from_args({'kind': 'pods', 'limit': '5'}))
+    token = first['pagination']['pods']['continue']
+    with pytest.raises(ValueError, match='does not match'):
+        snapshot.query(ResourceQuery.from_args({'kind': 'pods', 'limit': '5', 'namespace': 'team-0', 'continue': token}))
+    with pytest.raises(ValueError, match='Invalid'):
+        snapshot.query(ResourceQuery.from_args({'kind': 'pods', 'continue': 'not-a-token'}))
+
+
+def test_unknown_kinds_are_rejected(snapshot):
+    with pytest.raises(ValueError, match='widgets'):
+        snapshot.query(ResourceQuery.from_args({'kind': 'widgets'}))
+    with pytest.raises(ValueError, match='gadgets'):
+        snapshot.query(ResourceQuery.from_args({'gadgets.limit': '1'}))
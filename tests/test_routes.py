@@ -0,0 +1,46 @@
+"""
+API route behaviour that doesn't depend on cluster contents
+"""
+import time
+
+import pytest
+
+from app import create_app
+from config import Config
+
+
+@pytest.fixture
+def client():
+    return create_app().test_client()
+
+
+def test_cluster_stream_rejects_connections_past_the_limit(client, monkeypatch):
+    monkeypatch.setattr(Config, 'STREAM_MAX_CONNECTIONS', 0)
+    response = client.get('/api/cluster/stream')
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '60'
+
+
+def test_cluster_stream_subscribes_only_once_the_response_is_read(client):
+    from cluster_stream import cluster_feed
+    app = client.application
+    with app.test_request_context('/api/cluster/stream'):
+        response = app.full_dispatch_request()
+    assert response.status_code == 200
+    assert cluster_feed.subscriber_count == 0
+    # A response closed before it was ever iterated never subscribed
+    response.close()
+    assert cluster_feed.subscriber_count == 0
+
+
+def test_resources_continue_token_from_an_older_snapshot_is_gone(client, monkeypatch):
+    from app.routes import main
+    from app.utils.snapshot_cache import Snapshot
+    documents = iter([{'last_updated': built, 'pods': [{'name': f'pod-{n}'} for n in range(4)]}
+                      for built in ('2024-01-01T00:00:00', '2024-01-01T00:00:10')])
+    monkeypatch.setattr(main.resources_cache, 'get',
+                        lambda: Snapshot(1, main.ResourceSnapshot(next(documents)), time.monotonic()))
+    first = client.get('/api/resources?kind=pods&limit=2').get_json()
+    token = first['pagination']['pods']['continue']
+    response = client.get(f'/api/resources?kind=pods&limit=2&continue={token}')
+    assert response.status_code == 410
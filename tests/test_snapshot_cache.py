@@ -0,0 +1,133 @@
+"""
+SnapshotCache single-flight rebuilds and stale-while-revalidate serving
+"""
+import threading
+import time
+
+import pytest
+
+from config import Config
+from cluster_api import get_cluster_data
+from app.utils.snapshot_cache import SnapshotCache
+
+
+class GatedBuild:
+    """Builds cluster data from the synthetic API, counting calls and optionally holding them at a gate"""
+
+    def __init__(self):
+        self.calls = 0
+        self.started = threading.Event()
+        self.gate = threading.Event()
+        self.gate.set()
+        self.failing = False
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        self.gate.wait(5)
+        if self.failing:
+            raise RuntimeError('API server unreachable')
+        return get_cluster_data()
+
+
+@pytest.fixture
+def build(synthetic_api):
+    return GatedBuild()
+
+
+@pytest.fixture
+def make_cache(memory_store, monkeypatch):
+    caches = []
+
+    def make(build, ttl, background):
+        monkeypatch.setattr(Config, 'SNAPSHOT_BACKGROUND_REFRESH', background)
+        cache = SnapshotCache('test', build, ttl, store=memory_store)
+        caches.append(cache)
+        return cache
+
+    yield make
+    for cache in caches:
+        # Let a running refresher see the cache as idle and exit
+        cache._last_read = time.monotonic() - Config.SNAPSHOT_IDLE_SECONDS - 1
+        cache._wake.set()
+        if cache._thread is not None:
+            cache._thread.join(5)
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.01)
+
+
+def test_concurrent_misses_share_one_build(build, make_cache):
+    cache = make_cache(build, ttl=60, background=False)
+    build.gate.clear()
+    results = []
+    callers = [threading.Thread(target=lambda: results.append(cache.get())) for _ in range(8)]
+    for caller in callers:
+        caller.start()
+    assert build.started.wait(5)
+    time.sleep(0.05)  # the other callers queue up behind the build
+    build.gate.set()
+    for caller in callers:
+        caller.join(5)
+    assert build.calls == 1
+    assert len(results) == 8
+    assert all(result is results[0] for result in results)
+
+
+def test_fresh_snapshot_is_served_without_building(build, make_cache):
+    cache = make_cache(build, ttl=60, background=False)
+    first = cache.get()
+    assert cache.get() is first
+    assert build.calls == 1
+    cache.invalidate()
+    assert cache.get() is not first
+    assert build.calls == 2
+
+
+def test_expired_snapshot_is_served_while_it_is_rebuilt(build, make_cache):
+    cache = make_cache(build, ttl=0.05, background=True)
+    first = cache.get()
+    wait_for(lambda: build.calls >= 2)  # the refresher keeps it up to date
+    build.gate.clear()
+    build.started.clear()
+    assert build.started.wait(5)
+    # A rebuild is held at the gate: readers get the last snapshot right away
+    started = time.monotonic()
+    stale = cache.get()
+    assert time.monotonic() - started < 0.5
+    assert stale.version >= first.version
+    build.gate.set()
+    wait_for(lambda: cache.peek().version > stale.version)
+    assert cache.get().version > stale.version
+
+
+def test_failed_background_refresh_keeps_the_last_snapshot(build, make_cache):
+    cache = make_cache(build, ttl=0.05, background=True)
+    cache.get()
+    build.failing = True
+    calls = build.calls
+    wait_for(lambda: build.calls > calls + 1)  # at least one refresh failed outright
+    last = cache.peek()
+    assert last is not None
+    assert cache.get() is last
+
+
+def test_follower_refresh_of_an_unchanged_document_is_fresh(build, memory_store, monkeypatch):
+    monkeypatch.setattr(Config, 'SNAPSHOT_BACKGROUND_REFRESH', False)
+    leader = SnapshotCache('test', build, 60, store=memory_store)
+    follower = SnapshotCache('test', build, 60, store=memory_store.replica('test:2'))
+    published = leader.get()
+    snapshot = follower.get()
+    assert build.calls == 1
+    # /api/refresh on the follower reloads the leader's document, which has not changed
+    follower.invalidate()
+    assert follower.refresh() is snapshot
+    fetches = follower._generation
+    assert follower.get() is snapshot
+    assert follower._generation == fetches
+    assert build.calls == 1
+    assert snapshot.version == published.version
@@ -0,0 +1,100 @@
+"""
+Snapshot store leases, follower waits and fallbacks when the backend is down
+"""
+import threading
+import time
+
+import pytest
+
+from config import Config
+from app.utils.snapshot_store import MemorySnapshotStore
+
+
+class UnavailableStore(MemorySnapshotStore):
+    """A store whose backend is down, or (with failing) only fails the given methods"""
+
+    def __init__(self, failing=('acquire_lease', 'load', 'publish')):
+        super().__init__(holder='test:1')
+        self.failing = failing
+
+    def _fail(self, method):
+        if method in self.failing:
+            raise ConnectionRefusedError(f'{method}: connection refused')
+
+    def acquire_lease(self, name):
+        self._fail('acquire_lease')
+        return super().acquire_lease(name)
+
+    def load(self, name):
+        self._fail('load')
+        return super().load(name)
+
+    def publish(self, name, document, built_at):
+        self._fail('publish')
+        super().publish(name, document, built_at)
+
+
+def test_follower_waits_for_the_leaders_first_snapshot(memory_store, monkeypatch):
+    monkeypatch.setattr(Config, 'SNAPSHOT_FOLLOWER_WAIT_SECONDS', 5)
+    follower = memory_store.replica('test:2')
+    follower.poll_interval = 0.01
+    assert memory_store.acquire_lease('cluster')
+    published = threading.Timer(0.1, memory_store.publish, ('cluster', {'from': 'leader'}, 1.0))
+    published.start()
+    try:
+        document, built_at = follower.fetch('cluster', lambda: {'from': 'follower'})
+    finally:
+        published.cancel()
+    assert document == {'from': 'leader'}
+    assert built_at == 1.0
+
+
+def test_follower_builds_locally_once_the_wait_is_over(memory_store, monkeypatch):
+    monkeypatch.setattr(Config, 'SNAPSHOT_FOLLOWER_WAIT_SECONDS', 0.05)
+    follower = memory_store.replica('test:2')
+    follower.poll_interval = 0.01
+    assert memory_store.acquire_lease('cluster')
+    started = time.monotonic()
+    document, _ = follower.fetch('cluster', lambda: {'from': 'follower'})
+    assert document == {'from': 'follower'}
+    assert time.monotonic() - started >= 0.05
+    assert memory_store.load('cluster') is None
+
+
+def test_follower_takes_over_a_lease_released_before_publishing(memory_store, monkeypatch):
+    monkeypatch.setattr(Config, 'SNAPSHOT_FOLLOWER_WAIT_SECONDS', 5)
+    follower = memory_store.replica('test:2')
+    follower.poll_interval = 0.01
+    assert memory_store.acquire_lease('cluster')
+    released = threading.Timer(0.05, memory_store.release_lease, ('cluster',))
+    released.start()
+    document, _ = follower.fetch('cluster', lambda: {'from': 'follower'})
+    assert document == {'from': 'follower'}
+    assert memory_store.load('cluster')[0] == {'from': 'follower'}
+
+
+def test_unavailable_store_builds_locally():
+    store = UnavailableStore()
+    document, built_at = store.fetch('cluster', lambda: {'from': 'local'})
+    assert document == {'from': 'local'}
+    assert built_at <= time.time()
+
+
+def test_failed_publish_still_returns_the_built_document():
+    store = UnavailableStore(failing=('publish',))
+    document, _ = store.fetch('cluster', lambda: {'from': 'leader'})
+    assert document == {'from': 'leader'}
+    assert store.load('cluster') is None
+
+
+def test_build_errors_are_not_mistaken_for_store_errors():
+    store = UnavailableStore(failing=())
+    calls = []
+
+    def build():
+        calls.append(1)
+        raise ConnectionRefusedError('API server unreachable')
+
+    with pytest.raises(ConnectionRefusedError, match='API server'):
+        store.fetch('cluster', build)
+    assert len(calls) == 1
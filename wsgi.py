@@ -0,0 +1,40 @@
+"""
+NKP Cluster Visualizer - Production WSGI Entry Point
+
+Served by gunicorn with the settings in gunicorn.conf.py:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+import threading
+import time
+from app import create_app
+
+app = create_app()
+
+
+def warm_caches():
+    """Build the cluster and resources snapshots so the first dashboard doesn't wait for them"""
+    from app.routes.main import resources_cache
+    from cluster_stream import cluster_feed
+
+    started = time.monotonic()
+    for name, warm in (('cluster', cluster_feed.current), ('resources', resources_cache.get)):
+        try:
+            warm()
+        except Exception as e:
+            print(f"Cache warm-up for {name} failed: {e}")
+    print(f"Caches warmed in {time.monotonic() - started:.1f}s")
+
+
+def start_cache_warmup():
+    """Warm the caches in the background; requests arriving meanwhile share the in-flight builds"""
+    threading.Thread(target=warm_caches, name='cache-warmup', daemon=True).start()
+
+
+def prepare_shutdown():
+    """Hand snapshot leases to another replica and end open /api/cluster/stream
+    responses, so a graceful shutdown isn't held up by them"""
+    from app.utils.snapshot_store import get_snapshot_store
+    from cluster_stream import cluster_feed
+    get_snapshot_store().release_all()
+    cluster_feed.close_all()